@@ -0,0 +1,168 @@
+import math
+
+try:
+    import numpy as np
+except ImportError:  # NumPy が無ければ純 Python で計算
+    np = None
+
+HAS_NUMPY = np is not None
+
+
+# -----------------------------
+# まとめて計算するジオメトリ関数
+# -----------------------------
+# utils.point_in_category / get_rotated_rect_points / RotatingRect.contains_point の
+# 一括版。判定規則と計算順は同じなので結果も一致する。
+# NumPy があれば ndarray、無ければ list を返す（どちらも m[i][j] で参照できる）。
+
+def _polygon_points(polygon):
+    """CategoryShape 等（.points を持つ）でも頂点リストでも受け付ける"""
+    return getattr(polygon, "points", polygon)
+
+
+def _point_in_polygon_py(px, py, pts):
+    """utils.point_in_category と同じレイキャスト"""
+    n = len(pts)
+    if n < 3:
+        return False
+    inside = False
+    x1, y1 = pts[0]
+    for i in range(1, n + 1):
+        x2, y2 = pts[i % n]
+        if (y1 > py) != (y2 > py):
+            dy = y2 - y1
+            if dy != 0:
+                x_intersect = (x2 - x1) * (py - y1) / dy + x1
+                if px < x_intersect:
+                    inside = not inside
+        x1, y1 = x2, y2
+    return inside
+
+
+def points_in_polygons(points, polygons):
+    """
+    points  : N 個の点 [(x, y), ...]（(N,2) 配列も可）
+    polygons: M 個の多角形（CategoryShape か頂点リスト）
+    戻り値  : N x M の所属行列（[i][j] = 点 i が多角形 j の内側か）
+    """
+    polys = [list(_polygon_points(p) or []) for p in polygons]
+
+    if np is None:
+        return [
+            [_point_in_polygon_py(px, py, pts) for pts in polys]
+            for px, py in points
+        ]
+
+    pts_arr = np.asarray(points, dtype=float).reshape(-1, 2)
+    px = pts_arr[:, 0]
+    py = pts_arr[:, 1]
+    result = np.zeros((len(pts_arr), len(polys)), dtype=bool)
+
+    for j, pts in enumerate(polys):
+        n = len(pts)
+        if n < 3:
+            continue
+        inside = result[:, j]
+        x1, y1 = pts[0]
+        for i in range(1, n + 1):
+            x2, y2 = pts[i % n]
+            dy = y2 - y1
+            if dy != 0:
+                crossing = (y1 > py) != (y2 > py)
+                x_intersect = (x2 - x1) * (py - y1) / dy + x1
+                inside ^= crossing & (px < x_intersect)
+            x1, y1 = x2, y2
+    return result
+
+
+def category_membership(points, categories):
+    """各点を含むカテゴリ名リスト（categories_name_containing_rect の一括版）"""
+    matrix = points_in_polygons(points, categories)
+    names = [cat.name for cat in categories]
+    return [
+        [name for name, hit in zip(names, row) if hit]
+        for row in matrix
+    ]
+
+
+def rect_arrays(rects):
+    """RotatingRect のリストから (centers, sizes, angles) を取り出す"""
+    centers = [r.center for r in rects]
+    sizes = [r.size for r in rects]
+    angles = [r.angle for r in rects]
+    return centers, sizes, angles
+
+
+def rotated_rect_corners(centers, sizes, angles):
+    """
+    N 個の回転矩形の4頂点（get_rotated_rect_points と同じ順: 左上から時計回り）
+    戻り値: (N,4,2) 配列 / [[(x, y) x4], ...]
+    """
+    if np is None:
+        result = []
+        for (cx, cy), (w, h), angle_deg in zip(centers, sizes, angles):
+            angle = math.radians(angle_deg)
+            cos_a = math.cos(angle)
+            sin_a = math.sin(angle)
+            hw, hh = w / 2, h / 2
+            result.append([
+                (x * cos_a - y * sin_a + cx, x * sin_a + y * cos_a + cy)
+                for x, y in ((-hw, -hh), (hw, -hh), (hw, hh), (-hw, hh))
+            ])
+        return result
+
+    c = np.asarray(centers, dtype=float).reshape(-1, 2)
+    s = np.asarray(sizes, dtype=float).reshape(-1, 2)
+    angle = np.radians(np.asarray(angles, dtype=float).reshape(-1))
+    cos_a = np.cos(angle)[:, None]
+    sin_a = np.sin(angle)[:, None]
+
+    hw = (s[:, 0] / 2)[:, None]
+    hh = (s[:, 1] / 2)[:, None]
+    sign_x = np.array([-1.0, 1.0, 1.0, -1.0])
+    sign_y = np.array([-1.0, -1.0, 1.0, 1.0])
+    x = sign_x * hw
+    y = sign_y * hh
+
+    out = np.empty((len(c), 4, 2))
+    out[:, :, 0] = x * cos_a - y * sin_a + c[:, 0:1]
+    out[:, :, 1] = x * sin_a + y * cos_a + c[:, 1:2]
+    return out
+
+
+def points_in_rotated_rects(points, centers, sizes, angles):
+    """
+    K 個の点 x N 個の回転矩形の当たり判定（RotatingRect.contains_point の一括版）
+    戻り値: K x N の行列
+    """
+    if np is None:
+        rects = []
+        for (cx, cy), (w, h), angle_deg in zip(centers, sizes, angles):
+            angle = -math.radians(angle_deg)
+            rects.append((cx, cy, w / 2, h / 2, math.cos(angle), math.sin(angle)))
+        result = []
+        for px, py in points:
+            row = []
+            for cx, cy, hw, hh, cos_a, sin_a in rects:
+                dx = px - cx
+                dy = py - cy
+                rx = dx * cos_a - dy * sin_a
+                ry = dx * sin_a + dy * cos_a
+                row.append(-hw <= rx <= hw and -hh <= ry <= hh)
+            result.append(row)
+        return result
+
+    p = np.asarray(points, dtype=float).reshape(-1, 2)
+    c = np.asarray(centers, dtype=float).reshape(-1, 2)
+    s = np.asarray(sizes, dtype=float).reshape(-1, 2)
+    angle = -np.radians(np.asarray(angles, dtype=float).reshape(-1))
+    cos_a = np.cos(angle)[None, :]
+    sin_a = np.sin(angle)[None, :]
+
+    dx = p[:, 0:1] - c[None, :, 0]
+    dy = p[:, 1:2] - c[None, :, 1]
+    rx = dx * cos_a - dy * sin_a
+    ry = dx * sin_a + dy * cos_a
+    hw = s[None, :, 0] / 2
+    hh = s[None, :, 1] / 2
+    return (-hw <= rx) & (rx <= hw) & (-hh <= ry) & (ry <= hh)
@@ -0,0 +1,10 @@
+"""
+ヘッドレスのベンチマーク（python -m bench）
+
+合成会場（bench.venue.generate_venue）で描画・当たり判定・電力集計・CSV 書き出し・
+保存/読込を計り、結果を JSON に書き出す。ウィンドウは SDL の dummy ドライバで作る。
+"""
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
@@ -0,0 +1,82 @@
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import pygame
+
+from bench.suite import run_size
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench", description="合成会場でのヘッドレスベンチマーク")
+    parser.add_argument("--sizes", default="100,1000,5000",
+                        help="rect 数（カンマ区切り、100〜50000 程度）")
+    parser.add_argument("--repeat", type=int, default=5, help="各項目の計測回数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--categories", type=int, default=12, help="カテゴリ数")
+    parser.add_argument("--category-vertices", type=int, default=64, help="カテゴリ1つの頂点数")
+    parser.add_argument("--polylines", type=int, default=20)
+    parser.add_argument("--texts", type=int, default=50)
+    parser.add_argument("--out", default=None, help="結果 JSON の出力先（省略時 bench_<日時>.json）")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    venue_options = {
+        "categories": args.categories,
+        "category_vertices": args.category_vertices,
+        "polylines": args.polylines,
+        "texts": args.texts,
+    }
+
+    pygame.init()
+    screen = pygame.display.set_mode((1280, 720))
+
+    report = {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "git": _git_revision(),
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "venue": venue_options,
+        },
+        "results": {},
+    }
+
+    for n in sizes:
+        start = time.perf_counter()
+        print(f"rects={n} ...", end=" ", file=sys.stderr, flush=True)
+        report["results"][str(n)] = run_size(screen, n, repeat=args.repeat, seed=args.seed, venue_options=venue_options)
+        print(f"{time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    out = args.out or f"bench_{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    # 概要（各項目の中央値 ms）
+    names = [k for k, v in next(iter(report["results"].values())).items() if "median" in v] if sizes else []
+    print(f"{'median ms':<26}" + "".join(f"{n:>12}" for n in sizes))
+    for name in names:
+        print(f"{name:<26}" + "".join(f"{report['results'][str(n)][name]['median']:>12.2f}" for n in sizes))
+    print("->", out)
+
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
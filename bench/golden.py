@@ -0,0 +1,225 @@
+"""
+ゴールデン画像テスト（python -m bench.golden）
+
+bench/fixtures/*.json（DataManager.save_all と同じ形）を map_mode と同じ描画経路で
+1920x1080 に描き、同じ名前の PNG と画素ごとに比べる。キャッシュまわりを速くしたときに
+見た目が変わっていないことを確かめる。
+
+  python -m bench.golden            : 比較（差があれば差分画像を書き出して終了コード 1）
+  python -m bench.golden --update   : 今の描画で PNG を作り直す
+
+あわせてキャッシュの整合も確かめる。描いたあとで属性（name_angle・name・色・大きさ など）を
+変えて描き直した画像が、変えたあとのデータをキャッシュなしで最初から描いた画像と一致するか。
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+
+import config
+
+# フォントファイルの有無で画像が変わらないよう pygame の既定フォントで描く
+# （他のモジュールが font_path を読む前に差し替える）
+config.font_path = None
+
+import pygame
+
+from objects import RotatingRect, TextLabel, CategoryShape, PolygonShape
+from input_trace import model_snapshot
+from text_cache import text_surfaces
+from sprite_cache import rect_sprites
+from bench.suite import MapScene
+
+try:
+    import numpy as np
+except ImportError:  # NumPy が無ければ純 Python で比べる（遅いだけで結果は同じ）
+    np = None
+
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+TOLERANCE = 8            # 1チャンネルの差がこれ以下なら同じ色とみなす
+MAX_BAD_RATIO = 0.0005   # 許容する「違う色」の画素の割合
+
+# 描く場面（名前 -> active にする rect の番号。None は選択なし）
+SCENES = {"idle": None, "active": 1}
+
+# キャッシュ整合の確認で順に加える変更（前の変更は残したまま重ねる）
+MUTATIONS = [
+    ("name_angle", lambda r: setattr(r, "name_angle", r.name_angle + 15)),
+    ("name", lambda r: setattr(r, "name", r.name + "+")),
+    ("name_color", lambda r: setattr(r, "name_color", (0, 0, 255))),
+    ("font_size", lambda r: setattr(r, "font_size", r.font_size + 4)),
+    ("name_pos", lambda r: setattr(r, "name_pos", (r.name_pos[0] + 7, r.name_pos[1] - 5))),
+    ("angle", lambda r: setattr(r, "angle", r.angle + 30)),
+    ("size", lambda r: setattr(r, "size", (r.size[0] + 6, r.size[1] + 4))),
+    ("color", lambda r: setattr(r, "color", tuple(255 - c for c in r.color))),
+    ("name_angle_back", lambda r: setattr(r, "name_angle", r.name_angle - 15)),
+]
+
+
+# -----------------------------
+# 描画
+# -----------------------------
+def load_fixture(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return (
+        [RotatingRect.from_dict(d) for d in data.get("rects", [])],
+        [TextLabel.from_dict(d) for d in data.get("texts", [])],
+        [CategoryShape.from_dict(d) for d in data.get("categories", [])],
+        [PolygonShape.from_dict(d) for d in data.get("polygons", [])],
+    )
+
+
+def _active(scene, index):
+    return scene.rects[index] if index is not None and index < len(scene.rects) else None
+
+
+def render(scene, active_index=None):
+    """MapScene の描画面を描き直してコピーを返す"""
+    scene.frame(active=_active(scene, active_index))
+    return scene.draw_surface.copy()
+
+
+def render_cold(screen, model, active_index=None):
+    """共有キャッシュを空にして、新しく作ったオブジェクトで最初から描く"""
+    text_surfaces.clear()
+    rect_sprites.clear()
+    snapshot = json.loads(json.dumps(model_snapshot(*model)))
+    rects = [RotatingRect.from_dict(d) for d in snapshot["rects"]]
+    texts = [TextLabel.from_dict(d) for d in snapshot["texts"]]
+    categories = [CategoryShape.from_dict(d) for d in snapshot["categories"]]
+    polygons = [PolygonShape.from_dict(d) for d in snapshot["polygons"]]
+    scene = MapScene(screen, rects, texts, categories, polygons)
+    return render(scene, active_index)
+
+
+# -----------------------------
+# 比較
+# -----------------------------
+def compare(expected, actual, tolerance=TOLERANCE):
+    """
+    2枚の画像を画素ごとに比べる。
+    戻り値 (違う画素の数, 最大の差, 差分画像)。大きさが違えば (None, None, None)
+    差分画像は違う画素を赤、それ以外を期待画像の薄い灰色で描く
+    """
+    if expected.get_size() != actual.get_size():
+        return None, None, None
+    size = expected.get_size()
+    a = pygame.image.tobytes(expected, "RGB")
+    b = pygame.image.tobytes(actual, "RGB")
+    if a == b:
+        return 0, 0, None
+
+    if np is not None:
+        ea = np.frombuffer(a, dtype=np.uint8).reshape(-1, 3).astype(np.int16)
+        eb = np.frombuffer(b, dtype=np.uint8).reshape(-1, 3).astype(np.int16)
+        delta = np.abs(ea - eb).max(axis=1)
+        bad = delta > tolerance
+        grey = (ea.mean(axis=1) * 0.3 + 170).astype(np.uint8)
+        out = np.repeat(grey[:, None], 3, axis=1)
+        out[bad] = (255, 0, 0)
+        return int(bad.sum()), int(delta.max()), pygame.image.frombuffer(out.tobytes(), size, "RGB").copy()
+
+    bad_count = 0
+    max_delta = 0
+    out = bytearray(len(a))
+    for i in range(0, len(a), 3):
+        d = max(abs(a[i] - b[i]), abs(a[i + 1] - b[i + 1]), abs(a[i + 2] - b[i + 2]))
+        max_delta = max(max_delta, d)
+        if d > tolerance:
+            bad_count += 1
+            out[i:i + 3] = b"\xff\x00\x00"
+        else:
+            grey = int((a[i] + a[i + 1] + a[i + 2]) / 3 * 0.3 + 170)
+            out[i:i + 3] = bytes((grey, grey, grey))
+    return bad_count, max_delta, pygame.image.frombuffer(bytes(out), size, "RGB").copy()
+
+
+def _passed(bad, size, max_bad_ratio):
+    return bad is not None and bad <= size[0] * size[1] * max_bad_ratio
+
+
+# -----------------------------
+# テスト
+# -----------------------------
+def check_golden(screen, name, model, update=False, diff_dir=None, tolerance=TOLERANCE, max_bad_ratio=MAX_BAD_RATIO):
+    """fixture を場面ごとに描いて PNG と比べる。[(項目, 成否, 説明), ...]"""
+    results = []
+    scene = MapScene(screen, *model)
+    for scene_name, active_index in SCENES.items():
+        image = render(scene, active_index)
+        png = os.path.join(FIXTURE_DIR, f"{name}_{scene_name}.png")
+        label = f"{name}/{scene_name}"
+        if update or not os.path.exists(png):
+            pygame.image.save(image, png)
+            results.append((label, True, "updated" if update else "created"))
+            continue
+        bad, max_delta, diff = compare(pygame.image.load(png), image, tolerance)
+        ok = _passed(bad, image.get_size(), max_bad_ratio)
+        note = "size mismatch" if bad is None else f"{bad} px differ (max delta {max_delta})"
+        if not ok and diff_dir and diff is not None:
+            os.makedirs(diff_dir, exist_ok=True)
+            pygame.image.save(image, os.path.join(diff_dir, f"{name}_{scene_name}_actual.png"))
+            pygame.image.save(diff, os.path.join(diff_dir, f"{name}_{scene_name}_diff.png"))
+        results.append((label, ok, note))
+    return results
+
+
+def check_cache_consistency(screen, model, tolerance=0):
+    """
+    描画後に MUTATIONS を1つずつ加えて描き直した画像と、
+    その時点のデータをキャッシュなしで描いた画像を比べる。[(項目, 成否, 説明), ...]
+    """
+    results = []
+    rects, texts, categories, polygons = model
+    scene = MapScene(screen, rects, texts, categories, polygons)
+    for scene_name, active_index in SCENES.items():
+        render(scene, active_index)
+    for mutation, apply in MUTATIONS:
+        for r in scene.rects:
+            apply(r)
+        for scene_name, active_index in SCENES.items():
+            warm = render(scene, active_index)
+            cold = render_cold(screen, (scene.rects, scene.texts, categories, scene.polygons), active_index)
+            bad, max_delta, _ = compare(cold, warm, tolerance)
+            results.append((f"cache/{mutation}/{scene_name}", bad == 0, f"{bad} px differ (max delta {max_delta})"))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.golden", description="ゴールデン画像テスト")
+    parser.add_argument("--update", action="store_true", help="今の描画で PNG を作り直す")
+    parser.add_argument("--only", default=None, help="この名前の fixture だけ（カンマ区切り）")
+    parser.add_argument("--tolerance", type=int, default=TOLERANCE, help="1チャンネルの許容差")
+    parser.add_argument("--max-bad-ratio", type=float, default=MAX_BAD_RATIO, help="許容する違う画素の割合")
+    parser.add_argument("--diff-dir", default="golden_diff", help="差があったときの画像の出力先")
+    parser.add_argument("--no-cache-check", action="store_true", help="キャッシュ整合の確認をしない")
+    args = parser.parse_args(argv)
+
+    pygame.init()
+    screen = pygame.display.set_mode((1280, 720))
+
+    only = set(args.only.split(",")) if args.only else None
+    results = []
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.json"))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        if only and name not in only:
+            continue
+        results += check_golden(screen, name, load_fixture(path), args.update, args.diff_dir,
+                                args.tolerance, args.max_bad_ratio)
+        if not args.no_cache_check:
+            results += [(f"{name}/{label}", ok, note)
+                        for label, ok, note in check_cache_consistency(screen, load_fixture(path))]
+
+    for label, ok, note in results:
+        print(f"{'ok  ' if ok else 'FAIL'} {label:<40} {note}")
+    failed = [label for label, ok, _ in results if not ok]
+    print(f"{len(results) - len(failed)} passed, {len(failed)} failed")
+    pygame.quit()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
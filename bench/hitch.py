@@ -0,0 +1,85 @@
+"""
+ダイアログで止まったフレームの検出確認（python -m bench.hitch）
+
+電力表（P キー）のダイアログを「sleep するだけ」の代わりに差し替えてマップ表示モードを再生し、
+frame_watchdog がそのフレームを書き出すか確かめる。待機から入力で起きた回は描画しないので、
+描かなかった回も frame_timer で確定していないと見落とす。
+
+  python -m bench.hitch            : 確認（書き出されなければ終了コード 1）
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pygame
+
+import config
+import bench.replay as replay
+from bench.venue import generate_venue
+from frame_watchdog import frame_watchdog
+from input_trace import model_snapshot, model_checksum
+
+
+def hitch_session(model, key=pygame.K_p, at_ms=500):
+    """at_ms に key を1回押すだけのマップ表示セッション（bench.replay の形）"""
+    events = [
+        {"t": at_ms, "type": pygame.KEYDOWN, "dict": {"key": key, "mod": 0, "unicode": "", "scancode": 0}},
+        {"t": at_ms + 50, "type": pygame.KEYUP, "dict": {"key": key, "mod": 0, "unicode": "", "scancode": 0}},
+    ]
+    return {
+        "mode": "map", "window": [1280, 720], "model": model,
+        "events": events, "states": [], "checksum": model_checksum(model),
+    }
+
+
+def check_dialog_hitch(screen, stall_ms=300, budget_ms=None):
+    """
+    電力表が stall_ms 掛かるセッションを再生し、(書き出したか, 書き出した最長の ms, 説明) を返す
+    """
+    model = model_snapshot(*generate_venue(rects=200, seed=0))
+
+    def slow_power_table(*args, **kwargs):
+        time.sleep(stall_ms / 1000)
+
+    saved = (config.FRAME_WATCHDOG, frame_watchdog.out_dir, frame_watchdog.budget_ms,
+             replay.DIALOG_STUBS["show_power_table_with_category"])
+    with tempfile.TemporaryDirectory() as tmp:
+        config.FRAME_WATCHDOG = True
+        frame_watchdog.out_dir = tmp
+        frame_watchdog.budget_ms = budget_ms if budget_ms is not None else stall_ms / 2
+        replay.DIALOG_STUBS["show_power_table_with_category"] = slow_power_table
+        dumps = len(frame_watchdog.dumps)
+        cwd = os.getcwd()
+        os.chdir(tmp)  # 終了時の保存は一時ディレクトリへ
+        try:
+            replay.replay_session(hitch_session(model), screen)
+            replay.save_service.flush()
+        finally:
+            os.chdir(cwd)
+            frame_watchdog.stop()
+            (config.FRAME_WATCHDOG, frame_watchdog.out_dir, frame_watchdog.budget_ms,
+             replay.DIALOG_STUBS["show_power_table_with_category"]) = saved
+        written = frame_watchdog.dumps[dumps:]
+        longest = max((total for total, _, _ in frame_watchdog.frames), default=0.0)
+
+    ok = bool(written) and longest >= stall_ms
+    return ok, longest, f"{len(written)} dump(s), longest frame {longest:.1f} ms (dialog {stall_ms} ms)"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.hitch", description="ダイアログで止まったフレームの検出確認")
+    parser.add_argument("--stall-ms", type=int, default=300, help="ダイアログの代わりに止める時間")
+    args = parser.parse_args(argv)
+
+    pygame.init()
+    screen = pygame.display.set_mode((1280, 720), pygame.RESIZABLE)
+    ok, _, note = check_dialog_hitch(screen, args.stall_ms)
+    print(f"{'ok  ' if ok else 'FAIL'} {'dialog_hitch':<40} {note}")
+    pygame.quit()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
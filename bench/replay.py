@@ -0,0 +1,305 @@
+import argparse
+import bisect
+import json
+import os
+import sys
+import tempfile
+from collections import deque
+from contextlib import contextmanager
+
+import pygame
+
+import config
+import object_editor
+from frame_timing import frame_timer
+from fonts import fonts
+from input_trace import (INPUT_EVENT_TYPES, DIALOG_EDITS_ARG, decode_event, decode_dialog_result, apply_dialog_state,
+                         model_checksum, model_snapshot, input_recorder)
+from objects import RotatingRect, TextLabel, CategoryShape, PolygonShape
+from save_service import save_service
+
+
+# -----------------------------
+# 固定クロックの入力
+# -----------------------------
+class _KeyState:
+    """pygame.key.get_pressed() の代わり（keys[K_xxx] で引く）"""
+
+    def __init__(self, keys):
+        self._keys = frozenset(keys)
+
+    def __getitem__(self, key):
+        return key in self._keys
+
+
+class _FixedClock:
+    """pygame.time.Clock の代わり。待たずに仮想時刻を1フレーム分進める"""
+
+    def __init__(self, replay):
+        self.replay = replay
+
+    def tick(self, fps=0):
+        step = 1000 / (fps or config.MAX_FPS)
+        self.replay.now += step
+        return int(step)
+
+    def get_fps(self):
+        return float(config.MAX_FPS)
+
+
+class ReplayInput:
+    """
+    記録したセッションを仮想時刻で返す。
+    イベントは記録時刻が来たら渡し、キー・マウスの状態はその時刻の最新の記録を返す。
+    待機（event.wait）は次のイベントまで仮想時刻を飛ばす。記録が尽きたら QUIT を渡す。
+    """
+
+    QUIT_AFTER_MS = 1000  # 最後の記録からこれだけ経ったら終了させる
+
+    def __init__(self, session):
+        self.now = 0.0
+        self.events = deque(sorted(session["events"], key=lambda e: e["t"]))
+        self.states = session["states"]
+        self._state_times = [s["t"] for s in self.states]
+        last = max([e["t"] for e in session["events"]] + self._state_times + [0])
+        self.end = last + self.QUIT_AFTER_MS
+        self._real_get = pygame.event.get
+
+    def _state(self):
+        i = bisect.bisect_right(self._state_times, self.now) - 1
+        return self.states[i] if i >= 0 else None
+
+    def _due(self):
+        out = []
+        while self.events and self.events[0]["t"] <= self.now:
+            out.append(decode_event(self.events.popleft()))
+        if not self.events and self.now >= self.end:
+            out.append(pygame.event.Event(pygame.QUIT))
+        return out
+
+    # --- pygame の代わり ---
+    def get_ticks(self):
+        return int(self.now)
+
+    def event_get(self, *args, **kwargs):
+        # アプリが post したイベントはそのまま渡す
+        posted = [e for e in self._real_get() if e.type not in INPUT_EVENT_TYPES]
+        return self._due() + posted
+
+    def event_poll(self):
+        due = self._due()
+        for event in due[1:]:
+            self.events.appendleft({"t": self.now, "type": event.type, "dict": event.dict})
+        return due[0] if due else pygame.event.Event(pygame.NOEVENT)
+
+    def event_wait(self, timeout=0):
+        if not self.events or self.events[0]["t"] > self.now:
+            next_t = self.events[0]["t"] if self.events else self.end
+            self.now = min(next_t, self.now + timeout) if timeout else max(self.now, next_t)
+        return self.event_poll()
+
+    def get_pressed(self):
+        state = self._state()
+        return _KeyState(state["keys"] if state else ())
+
+    def get_mods(self):
+        state = self._state()
+        return state["mods"] if state else 0
+
+    def mouse_pos(self):
+        state = self._state()
+        return tuple(state["pos"]) if state else (0, 0)
+
+    def mouse_pressed(self, num_buttons=3):
+        state = self._state()
+        return tuple(state["buttons"]) if state else (False,) * num_buttons
+
+
+# -----------------------------
+# Tk ダイアログの代わり
+# 記録した結果があればそれを返し、無い古い記録では編集は変更なし・保存は一時ディレクトリへ
+# -----------------------------
+def _unchanged_object(obj):
+    keys = ("no", "name", "text", "center", "position", "color", "classification", "power", "tent", "light")
+    return {k: getattr(obj, k, "") for k in keys}
+
+
+DIALOG_STUBS = {
+    "confirm_quit": lambda: True,  # 保存して戻る
+    "edit_object_window": _unchanged_object,
+    "edit_all_objects_window": lambda objs: objs,
+    "show_power_table_with_category": lambda *args, **kwargs: None,
+    "edit_polygon_window": lambda poly: None,
+    "edit_category_dialog": lambda cat: None,
+    "save_as_png": lambda surface: None,
+}
+
+
+class RecordedDialogs:
+    """
+    セッションの "dialogs"（InputRecorder が残したダイアログの結果）を呼ばれた順に返す。
+    同じ名前のダイアログごとに先頭から使い、尽きたら（または記録が無ければ）DIALOG_STUBS に任せる
+    """
+
+    def __init__(self, session):
+        self.queues = {}
+        for record in session.get("dialogs", []):
+            self.queues.setdefault(record["name"], deque()).append(record)
+        self.replayed = 0
+
+    def stub(self, name, fallback):
+        def dialog(*args, **kwargs):
+            queue = self.queues.get(name)
+            if not queue:
+                return fallback(*args, **kwargs)
+            record = queue.popleft()
+            self.replayed += 1
+            if name in DIALOG_EDITS_ARG:
+                apply_dialog_state(args[0], record["state"])
+                return fallback(*args, **kwargs)  # 戻り値（引数そのもの / None）は代わりと同じ
+            return decode_dialog_result(record)
+        return dialog
+
+    def stubs(self):
+        return {name: self.stub(name, fallback) for name, fallback in DIALOG_STUBS.items()}
+
+
+@contextmanager
+def _patched(replay, modules, dialogs=None):
+    patches = [
+        (pygame.time, "get_ticks", replay.get_ticks),
+        (pygame.time, "Clock", lambda: _FixedClock(replay)),
+        (pygame.event, "get", replay.event_get),
+        (pygame.event, "poll", replay.event_poll),
+        (pygame.event, "wait", replay.event_wait),
+        (pygame.key, "get_pressed", replay.get_pressed),
+        (pygame.key, "get_mods", replay.get_mods),
+        (pygame.mouse, "get_pos", replay.mouse_pos),
+        (pygame.mouse, "get_pressed", replay.mouse_pressed),
+        (object_editor, "tk_file_dialog_open", lambda dialog_func, **options: options.get("initialfile") or None),
+    ]
+    stubs = dialogs.stubs() if dialogs is not None else dict(DIALOG_STUBS)
+    for module in modules:
+        patches += [(module, name, stub) for name, stub in stubs.items() if hasattr(module, name)]
+
+    originals = [(module, name, getattr(module, name)) for module, name, _ in patches]
+    for module, name, value in patches:
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for module, name, value in originals:
+            setattr(module, name, value)
+
+
+# -----------------------------
+# 再生
+# -----------------------------
+class _FrameLog:
+    """frame_timer の observer。再生中のフレームごとの内訳を全部残す（描かなかった入力処理の回も）"""
+
+    def __init__(self):
+        self.frames = []
+
+    def frame_begin(self, timer):
+        pass
+
+    def frame_end(self, timer):
+        self.frames.append((timer.last_total, dict(timer.last_stages), timer.last_rendered))
+
+
+def _summary(values):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return {
+        "mean": round(sum(ordered) / len(ordered), 3),
+        "p95": round(ordered[int(0.95 * (len(ordered) - 1))], 3),
+        "max": round(ordered[-1], 3),
+    }
+
+
+def replay_session(session, screen):
+    """1セッションを再生して処理時間とモデルのチェックサムを返す"""
+    import map_mode
+    import category_mode
+
+    model = session["model"]
+    rects = [RotatingRect.from_dict(d) for d in model["rects"]]
+    texts = [TextLabel.from_dict(d) for d in model["texts"]]
+    categories = [CategoryShape.from_dict(d) for d in model["categories"]]
+    polygons = [PolygonShape.from_dict(d) for d in model["polygons"]]
+    if session.get("window"):
+        screen = pygame.display.set_mode(session["window"], pygame.RESIZABLE)
+
+    replay = ReplayInput(session)
+    dialogs = RecordedDialogs(session)
+    log = _FrameLog()
+    frame_timer.add_observer(log)
+    try:
+        with _patched(replay, (map_mode, category_mode), dialogs):
+            run = map_mode.run_map_mode if session["mode"] == "map" else category_mode.run_category_editor
+            run(screen, fonts.get(20), rects, texts, categories, polygons, "replay.json")
+    finally:
+        frame_timer.remove_observer(log)
+
+    checksum = model_checksum(model_snapshot(*input_recorder.model))
+    stage_names = {name for _, stages, _ in log.frames for name in stages}
+    return {
+        "mode": session["mode"],
+        "frames": len(log.frames),
+        "rendered_frames": sum(1 for _, _, rendered in log.frames if rendered),
+        "dialogs_replayed": dialogs.replayed,
+        "virtual_ms": round(replay.now, 1),
+        "frame_ms": _summary([total for total, _, _ in log.frames]),
+        "stages_ms": {
+            name: _summary([stages[name] for _, stages, _ in log.frames if name in stages])
+            for name in sorted(stage_names)
+        },
+        "checksum": checksum,
+        "recorded_checksum": session.get("checksum"),
+        "match": checksum == session.get("checksum"),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.replay", description="記録した入力をヘッドレスで再生")
+    parser.add_argument("trace", help="main.py --record で記録した JSON")
+    parser.add_argument("--out", default=None, help="結果 JSON の出力先")
+    args = parser.parse_args(argv)
+
+    with open(args.trace, encoding="utf-8") as f:
+        sessions = json.load(f)["sessions"]
+
+    pygame.init()
+    screen = pygame.display.set_mode((1280, 720), pygame.RESIZABLE)
+
+    # 保存・CSV 出力などは一時ディレクトリに出す
+    cwd = os.getcwd()
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            for i, session in enumerate(sessions):
+                result = replay_session(session, screen)
+                results.append(result)
+                frame = result["frame_ms"] or {}
+                print(
+                    f"[{i}] {result['mode']}: {result['frames']} frames, "
+                    f"mean {frame.get('mean')} ms, p95 {frame.get('p95')} ms, max {frame.get('max')} ms, "
+                    f"checksum {'OK' if result['match'] else 'MISMATCH'} {result['checksum'][:12]}",
+                    file=sys.stderr,
+                )
+            save_service.flush()  # 一時ディレクトリを消す前に保存を書き終える
+        finally:
+            os.chdir(cwd)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"trace": args.trace, "sessions": results}, f, ensure_ascii=False, indent=2)
+    pygame.quit()
+    return 0 if all(r["match"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+import io
+import os
+import random
+import tempfile
+import time
+from contextlib import contextmanager, redirect_stdout
+
+import pygame
+
+import config
+import object_editor
+from objects import ObjectList, DataManager, RotatingRect
+from spatial_index import SpatialGrid
+from rect_store import rect_store
+from category_index import CategoryIndex
+from power_aggregator import PowerAggregator
+from compositor import SceneCompositor
+from damage import DamageTracker, DamageSurface
+from fonts import fonts
+from utils import categories_power_list
+from bench.venue import generate_venue
+
+
+DRAW_W, DRAW_H = config.DRAW_W, config.DRAW_H
+
+
+# -----------------------------
+# 計測
+# -----------------------------
+def measure(func, repeat=5, warmup=1):
+    """func() を repeat 回計って ms の統計を返す（warmup 回は捨てる）"""
+    for _ in range(warmup):
+        func()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return {
+        "min": round(times[0], 3),
+        "median": round(times[len(times) // 2], 3),
+        "mean": round(sum(times) / len(times), 3),
+        "max": round(times[-1], 3),
+        "repeat": repeat,
+    }
+
+
+@contextmanager
+def no_dialogs():
+    """保存時の Tk ファイルダイアログを出さず、渡したファイル名をそのまま使う"""
+    original = object_editor.tk_file_dialog_open
+    object_editor.tk_file_dialog_open = lambda dialog_func, **options: options.get("initialfile")
+    try:
+        yield
+    finally:
+        object_editor.tk_file_dialog_open = original
+
+
+# -----------------------------
+# map_mode と同じ構成の描画経路
+# -----------------------------
+class MapScene:
+    """run_map_mode の描画部分（静的レイヤー合成 -> 動的オブジェクト -> 画面へ提示）"""
+
+    def __init__(self, screen, rects, texts, categories, polygons):
+        self.screen = screen
+        self.font = fonts.get(20)
+        self.rects = ObjectList(rects)
+        self.texts = ObjectList(texts)
+        self.polygons = ObjectList(polygons)
+        self.categories = categories
+
+        self.rect_index = SpatialGrid(bulk_bounds=rect_store.bounds)
+        self.rects.add_observer(self.rect_index)
+
+        self.category_index = CategoryIndex()
+        self.category_index.sync(categories)
+        self.power_aggregator = PowerAggregator(self.category_index.point_in_category)
+        self.power_aggregator.sync_categories(categories)
+        self.rects.add_observer(self.power_aggregator)
+
+        background = pygame.Surface((DRAW_W, DRAW_H), pygame.SRCALPHA)
+        background.fill((250, 250, 255))
+        category_layer = pygame.Surface((DRAW_W, DRAW_H), pygame.SRCALPHA)
+        for cat in categories:
+            cat.draw_category(category_layer, self.font, active=False, active_vertex=None,
+                              show_names=False, show_vertices=False)
+
+        self.damage = DamageTracker((DRAW_W, DRAW_H))
+        self.draw_surface = DamageSurface((DRAW_W, DRAW_H), self.damage)
+        self.compositor = SceneCompositor(
+            (DRAW_W, DRAW_H), self.rects, self.polygons, self.texts, self.font, config.font_path,
+            background, category_layer,
+        )
+
+    def frame(self, active=None):
+        restore = self.damage.begin_frame()
+        repainted = self.compositor.update(show_category=True, active=active)
+        with self.damage.base():
+            self.compositor.restore(self.draw_surface, None if repainted is None else restore + repainted)
+        self.damage.add_all(self.compositor.draw_dynamic(self.draw_surface, active=active))
+        self.damage.present(self.screen, self.draw_surface)
+
+    def full_frame(self):
+        self.compositor.invalidate()
+        self.damage.invalidate()
+        self.frame()
+
+
+# -----------------------------
+# ベンチマーク
+# -----------------------------
+def run_size(screen, n_rects, repeat=5, seed=0, venue_options=None):
+    """rect 数 n_rects の会場で各項目を計る。{項目: 統計} を返す"""
+    rects, texts, categories, polygons = generate_venue(rects=n_rects, seed=seed, **(venue_options or {}))
+    rng = random.Random(seed)
+    results = {}
+
+    start = time.perf_counter()
+    scene = MapScene(screen, rects, texts, categories, polygons)
+    scene.full_frame()
+    results["scene_setup"] = {"once": round((time.perf_counter() - start) * 1000, 3)}
+
+    # --- 描画 ---
+    results["frame_full"] = measure(scene.full_frame, repeat)
+    moving = scene.rects[len(scene.rects) // 2]
+
+    def drag_frame():
+        x, y = moving.center
+        moving.center = (x + rng.choice((-3, 3)), y)
+        scene.frame(active=moving)
+    results["frame_drag"] = measure(drag_frame, repeat * 4)
+    results["frame_idle"] = measure(scene.frame, repeat * 4)
+
+    # --- 当たり判定（1000点） ---
+    points = [(rng.uniform(0, DRAW_W), rng.uniform(0, DRAW_H)) for _ in range(1000)]
+
+    def hit_test():
+        for p in points:
+            scene.rect_index.hit_test(p, scene.rects, lambda r, pos: r.contains_point(pos))
+    results["hit_test_1000"] = measure(hit_test, repeat)
+
+    # --- 電力集計 ---
+    in_category = scene.category_index.point_in_category
+    results["categories_power_list"] = measure(
+        lambda: categories_power_list(scene.rects, categories, in_category), repeat)
+    results["power_aggregator_rebuild"] = measure(
+        lambda: scene.power_aggregator.rebuild(scene.rects), repeat)
+
+    # --- 書き出し・保存/読込（完了メッセージの print は捨てる）---
+    with tempfile.TemporaryDirectory() as tmp, redirect_stdout(io.StringIO()):
+        csv_path = os.path.join(tmp, "rects.csv")
+        json_path = os.path.join(tmp, "venue.json")
+        results["save_rects_as_csv"] = measure(
+            lambda: RotatingRect.save_rects_as_csv(scene.rects, categories, output_csv_path=csv_path), repeat)
+        with no_dialogs():
+            results["save_all"] = measure(
+                lambda: DataManager.save_all(scene.rects, scene.texts, categories, scene.polygons, json_path), repeat)
+        results["load_all"] = measure(lambda: DataManager.load_all(json_path), repeat)
+        results["file_bytes"] = {"json": os.path.getsize(json_path), "csv": os.path.getsize(csv_path)}
+
+    return results
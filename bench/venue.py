@@ -0,0 +1,105 @@
+import math
+import random
+
+from objects import RotatingRect, TextLabel, CategoryShape, PolygonShape
+
+
+CLASSIFICATIONS = ["beer", "food", "goods", "stage", "info"]
+COLORS = [(100, 200, 100), (120, 180, 220), (230, 170, 90), (200, 120, 200), (180, 180, 180)]
+
+
+# -----------------------------
+# 合成会場データ
+# -----------------------------
+def generate_venue(
+        rects=1000,
+        categories=12,
+        category_vertices=64,
+        polylines=20,
+        polyline_vertices=16,
+        texts=50,
+        size=(1920, 1080),
+        seed=0,
+        ):
+    """
+    ベンチマーク用の会場を作る。戻り値は DataManager.load_all と同じ並び
+    (rects, texts, categories, polygons)
+
+    rects      : 会場を格子に分けて1マス1ブース（数に合わせて小さくなる）
+    categories : 会場を区画に分けた多角形（頂点 category_vertices 個、一部 alert）
+    polylines  : ランダムな折れ線（PolygonShape）
+    texts      : テキストラベル
+    """
+    rng = random.Random(seed)
+    width, height = size
+
+    # --- ブース（格子状に並べ、少しずらす）---
+    cols = max(1, math.ceil(math.sqrt(rects * width / height)))
+    rows = max(1, math.ceil(rects / cols))
+    cell_w, cell_h = width / cols, height / rows
+    side = max(4, int(min(cell_w, cell_h) * 0.8))
+    booths = []
+    for i in range(rects):
+        col, row = i % cols, i // cols
+        kind = rng.randrange(len(CLASSIFICATIONS))
+        booths.append(RotatingRect(
+            no=i + 1,
+            name=f"店舗{i + 1}\\n{CLASSIFICATIONS[kind]}",
+            center=(
+                round((col + 0.5) * cell_w + rng.uniform(-0.1, 0.1) * cell_w, 1),
+                round((row + 0.5) * cell_h + rng.uniform(-0.1, 0.1) * cell_h, 1),
+            ),
+            size=(side, side),
+            angle=rng.choice([0, 0, 0, 45, 90]),
+            font_size=max(6, min(15, side // 2)),
+            power=rng.choice([0, 100, 300, 500, 1000, 1500]),
+            classification=CLASSIFICATIONS[kind],
+            color=COLORS[kind],
+            tent=rng.randint(0, 1),
+            light=rng.randint(0, 2),
+        ))
+
+    # --- カテゴリ（区画ごとに頂点の多い星形に近い多角形）---
+    cat_cols = max(1, math.ceil(math.sqrt(categories * width / height)))
+    cat_rows = max(1, math.ceil(categories / cat_cols)) if categories else 1
+    area_w, area_h = width / cat_cols, height / cat_rows
+    cats = []
+    for i in range(categories):
+        cx = (i % cat_cols + 0.5) * area_w
+        cy = (i // cat_cols + 0.5) * area_h
+        points = []
+        for k in range(category_vertices):
+            t = 2 * math.pi * k / category_vertices
+            r = 0.45 * rng.uniform(0.85, 1.0)
+            points.append((round(cx + math.cos(t) * area_w * r, 1), round(cy + math.sin(t) * area_h * r, 1)))
+        cats.append(CategoryShape(
+            name=f"エリア{i + 1}",
+            points=points,
+            alert=(i % 5 == 4),
+            power_limit=rng.choice([0, 3000, 5000, 10000]),
+        ))
+
+    # --- 折れ線 ---
+    lines = []
+    for _ in range(polylines):
+        x, y = rng.uniform(0, width), rng.uniform(0, height)
+        points = [(x, y)]
+        for _ in range(polyline_vertices - 1):
+            x = min(width, max(0, x + rng.uniform(-80, 80)))
+            y = min(height, max(0, y + rng.uniform(-80, 80)))
+            points.append((round(x, 1), round(y, 1)))
+        lines.append(PolygonShape(points=points, color=rng.choice(COLORS), width=rng.choice([2, 3, 5])))
+
+    # --- テキスト ---
+    labels = [
+        TextLabel(
+            no=str(i + 1),
+            text=f"ラベル{i + 1}",
+            position=(round(rng.uniform(0, width - 100), 1), round(rng.uniform(0, height - 20), 1)),
+            font_size=rng.choice([15, 20, 30]),
+            angle=rng.choice([0, 0, 90]),
+        )
+        for i in range(texts)
+    ]
+
+    return booths, labels, cats, lines
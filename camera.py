@@ -0,0 +1,153 @@
+import pygame
+from utils import screen_to_internal
+
+
+# -----------------------------
+# 描画用の座標変換
+# -----------------------------
+class ViewTransform:
+    """
+    ワールド座標 -> 描画先ピクセル座標（ネイティブ解像度描画用）
+    pixel = world * scale + offset（文字サイズ・線幅も scale 倍）
+    """
+
+    def __init__(self, scale=1.0, offset=(0, 0)):
+        self.scale = scale
+        self.offset = offset
+
+    def key(self):
+        return (self.scale, self.offset)
+
+    def point(self, p):
+        return (p[0] * self.scale + self.offset[0], p[1] * self.scale + self.offset[1])
+
+    def size(self, size):
+        return (size[0] * self.scale, size[1] * self.scale)
+
+    def font_size(self, size):
+        return max(1, round(size * self.scale))
+
+    def width(self, width):
+        return max(1, round(width * self.scale))
+
+
+# -----------------------------
+# 表示範囲（ズーム・パン）
+# -----------------------------
+class Camera:
+    """
+    ワールド座標（オブジェクトの座標、従来の内部座標と同じ）のうち
+    表示する範囲 view_rect を内部描画 Surface（view_size）に拡大して写す。
+
+    zoom == 1 かつ移動なしのとき is_identity で、従来どおり内部座標 = ワールド座標。
+    座標変換は整数に丸めた view_rect から行う（描画とクリック位置を一致させるため）。
+
+    to_world(pos)        : 内部描画座標 -> ワールド座標
+    to_view(pos)         : ワールド座標 -> 内部描画座標
+    screen_to_world(pos) : ウィンドウ座標 -> ワールド座標（レターボックス込み）
+    """
+
+    MIN_ZOOM = 1.0
+    MAX_ZOOM = 8.0
+    ZOOM_STEP = 1.25  # ホイール1目盛りの倍率
+
+    def __init__(self, view_size, world_size=None):
+        self.view_size = view_size
+        self.world_size = world_size if world_size is not None else view_size
+        self.zoom = 1.0
+        self.x = 0.0  # 表示範囲左上（ワールド座標）
+        self.y = 0.0
+        self.revision = 0  # 表示範囲が変わるたびに進む
+
+    @property
+    def is_identity(self):
+        return self.view_rect() == pygame.Rect((0, 0), self.view_size)
+
+    def view_rect(self):
+        """表示範囲（ワールド座標、整数）"""
+        vw, vh = self.view_size
+        rect = pygame.Rect(
+            round(self.x), round(self.y),
+            max(1, round(vw / self.zoom)), max(1, round(vh / self.zoom)),
+        )
+        return rect.clamp(pygame.Rect((0, 0), self.world_size))
+
+    def view_bounds(self):
+        """表示範囲 (x0, y0, x1, y1)（SpatialGrid.query 用）"""
+        r = self.view_rect()
+        return (r.left, r.top, r.right, r.bottom)
+
+    # -----------------------------
+    # 座標変換
+    # -----------------------------
+    def to_world(self, pos):
+        r = self.view_rect()
+        vw, vh = self.view_size
+        return (r.x + pos[0] * r.width / vw, r.y + pos[1] * r.height / vh)
+
+    def to_view(self, pos):
+        r = self.view_rect()
+        vw, vh = self.view_size
+        return ((pos[0] - r.x) * vw / r.width, (pos[1] - r.y) * vh / r.height)
+
+    def pixel_transform(self, target_size):
+        """表示範囲を target_size（内部描画と同じ 16:9）のピクセルに直接描くための変換"""
+        r = self.view_rect()
+        scale = target_size[0] / r.width
+        return ViewTransform(scale, (-round(r.x * scale), -round(r.y * scale)))
+
+    def screen_to_world(self, pos, screen_size):
+        return self.to_world(screen_to_internal(pos, screen_size, self.view_size))
+
+    # -----------------------------
+    # 操作
+    # -----------------------------
+    def zoom_at(self, factor, view_pos):
+        """内部描画座標 view_pos の下のワールド座標を固定したまま倍率を変える"""
+        zoom = min(self.MAX_ZOOM, max(self.MIN_ZOOM, self.zoom * factor))
+        if zoom == self.zoom:
+            return
+        wx, wy = self.to_world(view_pos)
+        self.zoom = zoom
+        self.x = wx - view_pos[0] / zoom
+        self.y = wy - view_pos[1] / zoom
+        self._changed()
+
+    def pan(self, dx, dy):
+        """内部描画座標で (dx, dy) だけ表示をずらす（ドラッグした方向に絵が動く）"""
+        if not dx and not dy:
+            return
+        self.x -= dx / self.zoom
+        self.y -= dy / self.zoom
+        self._changed()
+
+    def reset(self):
+        if (self.zoom, self.x, self.y) == (1.0, 0.0, 0.0):
+            return
+        self.zoom = 1.0
+        self.x = self.y = 0.0
+        self._changed()
+
+    def _changed(self):
+        """ワールドの外を写さないよう位置を詰める"""
+        vw, vh = self.view_size
+        ww, wh = self.world_size
+        self.x = min(max(0.0, self.x), max(0.0, ww - vw / self.zoom))
+        self.y = min(max(0.0, self.y), max(0.0, wh - vh / self.zoom))
+        self.revision += 1
+
+    # -----------------------------
+    # 描画
+    # -----------------------------
+    def visible(self, bounds):
+        """外接矩形 (x0, y0, x1, y1) が表示範囲に掛かるか"""
+        x0, y0, x1, y1 = bounds
+        r = self.view_rect()
+        return x1 >= r.left and x0 <= r.right and y1 >= r.top and y0 <= r.bottom
+
+    def render(self, scene, target):
+        """ワールド座標で描いた scene の表示範囲を target 全体に拡大して写す"""
+        r = self.view_rect().clip(scene.get_rect())
+        if r.width <= 0 or r.height <= 0:
+            return target.fill((0, 0, 0))
+        return target.blit(pygame.transform.smoothscale(scene.subsurface(r), self.view_size), (0, 0))
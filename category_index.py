@@ -0,0 +1,142 @@
+import math
+from config import DRAW_W, DRAW_H
+from utils import point_in_category as exact_point_in_category
+
+
+# -----------------------------
+# カテゴリ所属判定の表引きインデックス
+# -----------------------------
+class _CategoryRaster:
+    """1カテゴリ分のビットセット（1行 = 1つの int、ビット ix = ピクセル ix）"""
+
+    def __init__(self, cat, signature, fill_rows, edge_rows):
+        self.cat = cat
+        self.signature = signature
+        self.fill_rows = fill_rows  # 内側ピクセル
+        self.edge_rows = edge_rows  # 辺が通るピクセル（厳密判定に回す）
+
+
+class CategoryIndex:
+    """
+    CategoryShape の多角形を内部解像度（DRAW_W x DRAW_H）のピクセル単位
+    ビットセットにラスタライズし、点の所属判定を表引きにする。
+
+    - 辺が通るピクセルと描画範囲外の点は従来のレイキャスト（utils.point_in_category）で判定
+    - カテゴリの頂点が変わったときだけ作り直す（sync で検出）
+
+    index.point_in_category は utils.point_in_category と同じ引数なので、
+    point_in_category を受け取る既存関数にそのまま渡せる。
+    """
+
+    def __init__(self, width=DRAW_W, height=DRAW_H):
+        self.width = width
+        self.height = height
+        self._rasters = {}  # id(cat) -> _CategoryRaster
+
+        # 計測用
+        self.builds = 0
+        self.exact_fallbacks = 0
+
+    @staticmethod
+    def _signature(cat):
+        return tuple(tuple(p) for p in cat.points)
+
+    def sync(self, categories):
+        """カテゴリ一覧と同期し、頂点が変わったカテゴリだけ作り直す"""
+        rasters = {}
+        for cat in categories:
+            raster = self._rasters.get(id(cat))
+            if raster is None or raster.cat is not cat or raster.signature != self._signature(cat):
+                raster = self._build(cat)
+            rasters[id(cat)] = raster
+        self._rasters = rasters
+
+    def invalidate(self):
+        self._rasters = {}
+
+    # -----------------------------
+    # 判定
+    # -----------------------------
+    def point_in_category(self, pt, cat):
+        """点(pt)がカテゴリ(cat)内にあるか判定（表引き、辺上はレイキャスト）"""
+        raster = self._rasters.get(id(cat))
+        if raster is None or raster.cat is not cat:
+            raster = self._build(cat)
+            self._rasters[id(cat)] = raster
+
+        px, py = pt
+        if not (0 <= px < self.width and 0 <= py < self.height):
+            self.exact_fallbacks += 1
+            return exact_point_in_category(pt, cat)
+
+        ix = int(px)
+        iy = int(py)
+        bit = 1 << ix
+        if raster.edge_rows[iy] & bit:
+            self.exact_fallbacks += 1
+            return exact_point_in_category(pt, cat)
+        return bool(raster.fill_rows[iy] & bit)
+
+    def names_containing(self, pt, categories):
+        """点を含むカテゴリ名リスト（categories_name_containing_rect と同じ結果）"""
+        return [cat.name for cat in categories if self.point_in_category(pt, cat)]
+
+    # -----------------------------
+    # ラスタライズ
+    # -----------------------------
+    def _build(self, cat):
+        self.builds += 1
+        w, h = self.width, self.height
+        fill_rows = [0] * h
+        edge_rows = [0] * h
+        signature = self._signature(cat)
+
+        pts = signature
+        n = len(pts)
+        if n < 3:
+            # point_in_category と同じく常に範囲外
+            return _CategoryRaster(cat, signature, fill_rows, edge_rows)
+
+        # --- 内側: 各行のピクセル中心 (iy + 0.5) でレイキャストと同じ交差規則 ---
+        crossings = {}
+        for i in range(n):
+            x1, y1 = pts[i]
+            x2, y2 = pts[(i + 1) % n]
+            lo, hi = (y1, y2) if y1 < y2 else (y2, y1)
+            if lo == hi:
+                continue  # 水平辺は交差しない
+            iy0 = max(0, math.ceil(lo - 0.5))
+            iy1 = min(h - 1, math.ceil(hi - 0.5) - 1)
+            slope = (x2 - x1) / (y2 - y1)
+            for iy in range(iy0, iy1 + 1):
+                x_int = slope * (iy + 0.5 - y1) + x1
+                crossings.setdefault(iy, []).append(x_int)
+
+        for iy, xs in crossings.items():
+            xs.sort()
+            row = 0
+            for j in range(0, len(xs) - 1, 2):
+                # ピクセル中心 ix + 0.5 が [a, b) に入る範囲
+                ix0 = max(0, math.ceil(xs[j] - 0.5))
+                ix1 = min(w - 1, math.ceil(xs[j + 1] - 0.5) - 1)
+                if ix1 >= ix0:
+                    row |= ((1 << (ix1 - ix0 + 1)) - 1) << ix0
+            fill_rows[iy] = row
+
+        # --- 辺: 0.5px 間隔でサンプルし周囲 3x3 ピクセルを厳密判定扱いにする ---
+        for i in range(n):
+            x1, y1 = pts[i]
+            x2, y2 = pts[(i + 1) % n]
+            steps = max(1, math.ceil(math.hypot(x2 - x1, y2 - y1) / 0.5))
+            for k in range(steps + 1):
+                t = k / steps
+                sx = math.floor(x1 + (x2 - x1) * t)
+                sy = math.floor(y1 + (y2 - y1) * t)
+                if sx < -1 or sx > w or sy < -1 or sy > h:
+                    continue
+                mask = (0b111 << (sx - 1)) if sx >= 1 else (0b111 >> (1 - sx))
+                for row in (sy - 1, sy, sy + 1):
+                    if 0 <= row < h:
+                        edge_rows[row] |= mask
+
+        return _CategoryRaster(cat, signature, fill_rows, edge_rows)
@@ -5,7 +5,17 @@ from utils import (draw_background, load_and_resize_bg, load_bg_path, point_in_c
                    get_active_point_index, get_active_polygon_index, drag_vertex, drag_category_or_polygon, handle_category_movement, handle_vertex_movement,
                    screen_to_internal, calc_vertex_drag_offset, calc_category_or_polygon_drag_offset)
 from objects import CategoryShape, DataManager
-from config import font_path, SCREEN_W, SCREEN_H
+import config
+from config import SCREEN_W, SCREEN_H
+from fonts import fonts
+from text_cache import text_surfaces
+from frame_timing import frame_timer
+from frame_watchdog import frame_watchdog
+from input_trace import input_recorder
+from save_service import save_service, SaveService, SAVE_DONE
+from journal import edit_journal
+from camera import Camera
+from damage import letterbox
 from object_editor import confirm_quit, edit_category_dialog
 
 # -----------------------------
@@ -19,14 +29,21 @@ from object_editor import confirm_quit, edit_category_dialog
 # -----------------------------
 # カテゴリ編集モード
 # -----------------------------
-def run_category_editor(screen, font, rects, texts, categories, polygons, filename):
+def run_category_editor(screen, font, rects, texts, categories, polygons, filename, full_path=None):
     """カテゴリ編集モード"""
     import tkinter as tk
     # root = tk.Tk()
     # root.withdraw()
 
     DRAW_W, DRAW_H = 1920, 1080  # 内部描画解像度（固定）
-    draw_surface = pygame.Surface((DRAW_W, DRAW_H))  # 内部用Surface
+    native = config.NATIVE_RESOLUTION  # 縮小せずウィンドウの表示サイズに直接描く
+    draw_size = letterbox(screen.get_size(), (DRAW_W, DRAW_H))[:2] if native else (DRAW_W, DRAW_H)
+    draw_surface = pygame.Surface(draw_size)  # 内部用Surface
+    camera = Camera((DRAW_W, DRAW_H))  # ズーム・パン（ホイール / 中ボタンドラッグ / Home）
+    scene_surface = None  # ズーム中にワールド座標で描く Surface
+    native_bg = None  # ネイティブ解像度用に表示範囲を拡大済みの背景
+    native_bg_key = None
+    panning = False
 
     # rects, texts, categories, filename = DataManager.load_all()
     pygame.display.set_caption(f"{filename}")
@@ -43,8 +60,18 @@ def run_category_editor(screen, font, rects, texts, categories, polygons, filena
     last_deleted_cat = None
     vertex_drag_offset = None  # 選択頂点用
     category_drag_offset = None  # 選択カテゴリ用
-    font_small = pygame.font.Font(font_path, 15)
+    font_small = fonts.get(15)
     save_message_until = 0
+    save_message = ""
+
+    # 予算を超えたフレームを記録（config.FRAME_WATCHDOG）
+    if config.FRAME_WATCHDOG:
+        frame_watchdog.watch("category", lambda: {
+            "categories": len(categories), "rects": len(rects),
+        })
+    input_recorder.begin_session("category", rects, texts, categories, polygons)  # 入力の記録（--record）
+    if config.EDIT_JOURNAL and full_path:
+        edit_journal.open(full_path, rects, texts, categories, polygons)  # 編集ジャーナル（落ちたときの復元用）
 
     running = True
 
@@ -52,22 +79,55 @@ def run_category_editor(screen, font, rects, texts, categories, polygons, filena
     bg_image = load_and_resize_bg(bg_image_path) if bg_image_path else None
 
     while running:
+        frame_timer.begin_frame()  # 段階ごとの処理時間（F3 で表示）
+
         # ---- 内部Surfaceにすべて描画 ----
-        draw_background(draw_surface, bg_image=bg_image)
+        # ズーム中はワールド座標の scene に表示範囲だけ描いて拡大する
+        # ネイティブ解像度では表示範囲をそのまま表示サイズのピクセルに描く
+        xf = None
+        if native:
+            size = letterbox(screen.get_size(), (DRAW_W, DRAW_H))[:2]
+            if size != draw_surface.get_size():
+                draw_surface = pygame.Surface(size)
+            xf = camera.pixel_transform(size)
+            if bg_image and native_bg_key != (size, camera.revision, id(bg_image)):
+                view_bg = bg_image.subsurface(camera.view_rect().clip(bg_image.get_rect()))
+                native_bg = pygame.transform.smoothscale(view_bg, size)
+                native_bg_key = (size, camera.revision, id(bg_image))
+        view = None if camera.is_identity else camera.view_rect()
+        if native:
+            scene = draw_surface
+            draw_background(scene, bg_image=native_bg if bg_image else None)
+        elif view is None:
+            scene = draw_surface
+        else:
+            if scene_surface is None:
+                scene_surface = pygame.Surface((DRAW_W, DRAW_H))
+            scene = scene_surface
+            scene.set_clip(view)
+        if not native:
+            draw_background(scene, bg_image=bg_image)
 
         now = pygame.time.get_ticks() / 1000.0
 
-        # カテゴリ描画（選択頂点・名前・頂点表示あり）
+        # カテゴリ描画（選択頂点・名前・頂点表示あり、表示範囲外は省く）
         for i, c in enumerate(categories):
+            if view is not None and not camera.visible(c.get_bounds()):
+                continue
             av = None
             if selected_vertex is not None and i == selected_vertex[0]:
                 av = selected_vertex[1]
-            c.draw_category(draw_surface, font, active=(i==selected_cat), active_vertex=av, show_names=True, show_vertices=True)
+            c.draw_category(scene, font, active=(i==selected_cat), active_vertex=av, show_names=True, show_vertices=True, xf=xf)
+
+        if view is not None and not native:
+            scene.set_clip(None)
+            camera.render(scene, draw_surface)
+        frame_timer.lap("scene")
 
         # IME ON(日本語入力時)警告
         if now < ime_warned_message_until:
             msg_surf = font.render("IME ON/日本語 -> IME OFF/アルファベット", True, (0, 0, 0))
-            draw_surface.blit(msg_surf, (DRAW_W - msg_surf.get_width() - 10, 10))
+            draw_surface.blit(msg_surf, (draw_surface.get_width() - msg_surf.get_width() - 10, 10))
 
         # ---電力上限表記---
         # (name, power) で重複排除
@@ -85,7 +145,7 @@ def run_category_editor(screen, font, rects, texts, categories, polygons, filena
         for i, c in enumerate(sorted_categories):
             y = base_y + i * 20
             text = f"name: {c.name}  power_limit: {c.power_limit}"
-            surf = font_small.render(text, True, (0, 0, 0))
+            surf = text_surfaces.render(font_small, text, True, (0, 0, 0))
             draw_surface.blit(surf, (10, y))
 
         # 操作説明
@@ -103,13 +163,16 @@ def run_category_editor(screen, font, rects, texts, categories, polygons, filena
             "Ctrl+S: 保存",
             "ESC: 保存して戻る",
             "Ctrl+Z: 元に戻す（削除のみ）",
+            "ホイール / 中ボタンドラッグ: ズーム / 表示移動",
+            "Home: 表示リセット",
+            "F3: 処理時間表示",
         ]
 
         # --- 操作説明描画（左下配置） ---
-        y_offset = DRAW_H - 20 * len(instructions) - 10  # 下端から上にずらす
+        y_offset = draw_surface.get_height() - 20 * len(instructions) - 10  # 下端から上にずらす
         x_offset = 10  # 左端から10px
         for i, line in enumerate(instructions):
-            text_surf = font_small.render(line, True, (0, 0, 0))
+            text_surf = text_surfaces.render(font_small, line, True, (0, 0, 0))
             draw_surface.blit(text_surf, (x_offset, y_offset + i * 20))
 
         # --- アクティブオブジェクト情報表示 ---
@@ -139,20 +202,22 @@ def run_category_editor(screen, font, rects, texts, categories, polygons, filena
                     vi = 0
 
             if selected_cat is not None and vi is None:
-                draw_surface.blit(font_small.render(f"name: {categories[selected_cat].name}", True, (0,0,0)), (10, 50)) #1行目
-                draw_surface.blit(font_small.render(f"point: None", True, (0,0,0)), (10, 70)) #2行目以降
+                draw_surface.blit(text_surfaces.render(font_small, f"name: {categories[selected_cat].name}", True, (0,0,0)), (10, 50)) #1行目
+                draw_surface.blit(text_surfaces.render(font_small, f"point: None", True, (0,0,0)), (10, 70)) #2行目以降
             if selected_cat is not None and vi is not None:
-                draw_surface.blit(font_small.render(f"name: {categories[selected_cat].name}", True, (0,0,0)), (10, 50)) #1行目
-                draw_surface.blit(font_small.render(f"point: {categories[selected_cat].points[vi]}", True, (0,0,0)), (10, 70)) #2行目以降
+                draw_surface.blit(text_surfaces.render(font_small, f"name: {categories[selected_cat].name}", True, (0,0,0)), (10, 50)) #1行目
+                draw_surface.blit(text_surfaces.render(font_small, f"point: {categories[selected_cat].points[vi]}", True, (0,0,0)), (10, 70)) #2行目以降
         else:
             None
 
         # Ctrl+S save message
         if now < save_message_until:
-            msg_surf = font.render("Saved all objects.", True, (0, 0, 0))
-            draw_surface.blit(msg_surf, (DRAW_W - msg_surf.get_width() - 10, 10))
+            msg_surf = font.render(save_message, True, (0, 0, 0))
+            draw_surface.blit(msg_surf, (draw_surface.get_width() - msg_surf.get_width() - 10, 10))
+        frame_timer.lap("hud")
 
         pygame.display.flip()
+        frame_timer.lap("flip")
         keys = pygame.key.get_pressed()
         mods = pygame.key.get_mods()
         ctrl = mods & pygame.KMOD_CTRL
@@ -172,15 +237,21 @@ def run_category_editor(screen, font, rects, texts, categories, polygons, filena
                 keys, prev_keys, ctrl, shift)
             
         prev_keys = keys
+        frame_timer.lap("input")
 
         # イベント処理
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 if confirm_quit():
-                    DataManager.save_all(rects, texts, categories, polygons, filename)
+                    DataManager.save_all_async(rects, texts, categories, polygons, filename)
                     return "back_to_mode_select"
                 else:
+                    edit_journal.close(discard=True)  # 保存しない編集は復元しない
                     running = False
+            # 保存完了（save_service のワーカースレッドから）
+            elif event.type == SAVE_DONE:
+                save_message = SaveService.message(event)
+                save_message_until = now + 3  # 今から3秒後
             # ウィンドウリサイズ処理
             elif event.type == pygame.VIDEORESIZE:
                 bg_image = load_and_resize_bg(bg_image_path) if bg_image_path else None
@@ -193,6 +264,14 @@ def run_category_editor(screen, font, rects, texts, categories, polygons, filena
                 # continue
 
             elif event.type == pygame.KEYDOWN:
+                # 表示リセット（ズーム・パン解除）
+                if event.key == pygame.K_HOME:
+                    camera.reset()
+
+                # 処理時間オーバーレイ
+                if event.key == pygame.K_F3:
+                    frame_timer.toggle()
+
                 if event.key == pygame.K_ESCAPE:
                     if selected_vertex is not None:
                         selected_vertex = None
@@ -200,9 +279,10 @@ def run_category_editor(screen, font, rects, texts, categories, polygons, filena
                         selected_cat = None
                     else:
                         if confirm_quit():
-                            DataManager.save_all(rects, texts, categories, polygons, filename)
+                            DataManager.save_all_async(rects, texts, categories, polygons, filename)
                             return "back_to_mode_select"
                         else:
+                            edit_journal.close(discard=True)
                             return "back_to_mode_select"
 
                 if event.key == pygame.K_TAB:
@@ -309,8 +389,7 @@ def run_category_editor(screen, font, rects, texts, categories, polygons, filena
 
                 # SAVE
                 if ctrl and event.key == pygame.K_s:
-                    DataManager.save_all(rects, texts, categories, polygons, filename)
-                    save_message_until = now + 3  # 今から3秒後
+                    DataManager.save_all_async(rects, texts, categories, polygons, filename)
 
                 # 選択頂点削除
                 if selected_vertex is not None and event.key == pygame.K_d:
@@ -362,10 +441,15 @@ def run_category_editor(screen, font, rects, texts, categories, polygons, filena
                 if offset_x <= mx < offset_x + scaled_w and offset_y <= my < offset_y + scaled_h:
                     sx = (mx - offset_x) / scale
                     sy = (my - offset_y) / scale
-                    pos = (sx, sy)
+                    pos = camera.to_world((sx, sy))
                 else:
                     pos = None  # クリック無効領域
 
+                # 中ボタンドラッグ：表示移動
+                if event.button == 2:
+                    panning = True
+                    continue
+
                 if event.button == 1: # 左クリック
                     if selected_cat is not None and shift:
                         # Shift+クリックで頂点追加
@@ -385,14 +469,15 @@ def run_category_editor(screen, font, rects, texts, categories, polygons, filena
                         continue # 追加後は他の処理をスキップ
 
                 if event.button == 1:  # 左クリック
-                    (ci, vi) = get_active_point_index(pos, categories)
+                    (ci, vi) = get_active_point_index(pos, categories, radius=10 / camera.zoom)
                     selected_vertex = (ci, vi) if ci is not None and vi is not None else None
                     selected_cat = get_active_polygon_index(pos, categories)
 
                     internal_pos = screen_to_internal(
                         event.pos,
                         screen.get_size(),
-                        (DRAW_W, DRAW_H)
+                        (DRAW_W, DRAW_H),
+                        camera
                     )
 
                     if selected_vertex is not None:
@@ -425,22 +510,45 @@ def run_category_editor(screen, font, rects, texts, categories, polygons, filena
             elif event.type == pygame.MOUSEBUTTONUP:
                 if event.button == 1:
                     dragging = False
+                if event.button == 2:
+                    panning = False
+
+            # ホイール：マウス位置を中心にズーム
+            elif event.type == pygame.MOUSEWHEEL:
+                camera.zoom_at(
+                    Camera.ZOOM_STEP ** event.y,
+                    screen_to_internal(pygame.mouse.get_pos(), screen.get_size(), (DRAW_W, DRAW_H))
+                )
 
             elif event.type == pygame.MOUSEMOTION:
+                if panning:
+                    mx, my = screen_to_internal(event.pos, screen.get_size(), (DRAW_W, DRAW_H))
+                    px, py = screen_to_internal(
+                        (event.pos[0] - event.rel[0], event.pos[1] - event.rel[1]),
+                        screen.get_size(), (DRAW_W, DRAW_H)
+                    )
+                    camera.pan(mx - px, my - py)
+                    continue
 
                 # カテゴリドラッグ移動
                 if dragging:
                     if selected_vertex is not None:
                         (ci, vi) = selected_vertex
-                        dx, dy = drag_vertex(categories[ci], vi, event.pos, screen, DRAW_W, DRAW_H, SCREEN_W, SCREEN_H, offset=vertex_drag_offset)
+                        dx, dy = drag_vertex(categories[ci], vi, event.pos, screen, DRAW_W, DRAW_H, SCREEN_W, SCREEN_H, offset=vertex_drag_offset, camera=camera)
                         x, y = categories[ci].points[vi]
                         categories[ci].points[vi] = (x + dx , y + dy)
                     elif selected_cat is not None:
-                        dx, dy = drag_category_or_polygon(categories[selected_cat], event.pos, screen, DRAW_W, DRAW_H, SCREEN_W, SCREEN_H, offset=category_drag_offset)
+                        dx, dy = drag_category_or_polygon(categories[selected_cat], event.pos, screen, DRAW_W, DRAW_H, SCREEN_W, SCREEN_H, offset=category_drag_offset, camera=camera)
                         cat = categories[selected_cat]
                         cat.points = [(x+dx, y+dy) for (x,y) in cat.points]
 
         # 内部解像度で全て描画したあと
+        frame_timer.lap("events")
+
+        # 自動保存（書き込みはワーカースレッド）
+        save_service.autosave(now, rects, texts, categories, polygons, filename)
+        edit_journal.flush()
+
         sw, sh = screen.get_size()
         target_aspect = 16 / 9
         current_aspect = sw / sh
@@ -453,12 +561,19 @@ def run_category_editor(screen, font, rects, texts, categories, polygons, filena
             scaled_w = sw
             scaled_h = int(sw / target_aspect)
 
-        scaled = pygame.transform.smoothscale(draw_surface, (scaled_w, scaled_h))
+        if draw_surface.get_size() == (scaled_w, scaled_h):
+            scaled = draw_surface  # ネイティブ解像度描画はそのまま写す
+        else:
+            scaled = pygame.transform.smoothscale(draw_surface, (scaled_w, scaled_h))
         screen.fill((0, 0, 0))
         offset_x = (sw - scaled_w) // 2
         offset_y = (sh - scaled_h) // 2
         screen.blit(scaled, (offset_x, offset_y))
+        frame_timer.lap("scale")
+        frame_timer.draw(screen, font_small)
         pygame.display.flip()
+        frame_timer.lap("present")
+        frame_timer.end_frame()
 
 
         clock.tick(60)
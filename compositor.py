@@ -0,0 +1,477 @@
+import pygame
+from objects import RotatingRect, PolygonShape
+from spatial_index import SpatialGrid
+from camera import ViewTransform
+
+
+# -----------------------------
+# 静的/動的レイヤー合成
+# -----------------------------
+class SceneCompositor:
+    """
+    背景・カテゴリ・非アクティブな rect / polygon / text を static_layer に焼き込み、
+    毎フレームはそれを1回 blit して動的オブジェクト（active・複数選択・ドラッグ中）だけ描く。
+
+    rects / polygons / texts（ObjectList）の observer として登録すると、
+    変更されたオブジェクトの描画範囲（変更前・変更後）だけ static_layer を描き直す。
+    描き直しは範囲を clip して、その範囲に掛かる静的オブジェクトを元の重なり順で描く。
+
+    重なり順は従来と同じ（rect -> polygon -> text、各リスト内は後ろほど前面）。
+    ただし動的オブジェクトは静的オブジェクトより前面に描く。
+
+    update(view=...) で表示範囲を渡すと、範囲外の描き直しは見えるようになるまで保留する
+    （ズーム中は表示範囲に掛かるオブジェクトだけ描く）。
+
+    set_transform(xf, size) でネイティブ解像度描画にする（static_layer = 表示範囲のピクセル）。
+    描画範囲のインデックスは拡大率だけ掛けた座標で持ち、表示位置（原点）はあとから引く。
+    拡大率が変わったときだけ測り直し、変換が変わったら全体を描き直す。
+    """
+
+    # これを超える面積が汚れたら全体を描き直す
+    FULL_REPAINT_RATIO = 0.5
+    MAX_REGIONS = 64
+    BOUNDS_PAD = 4  # 枠線（最大3px）のはみ出し分
+
+    def __init__(self, size, rects, polygons, texts, font, font_path, background_layer, category_layer):
+        self.size = size
+        self.rects = rects
+        self.polygons = polygons
+        self.texts = texts
+        self.font = font
+        self.font_path = font_path
+        self.background_layer = background_layer
+        self.category_layer = category_layer
+
+        self.static_layer = pygame.Surface(size)
+        self._scratch = pygame.Surface((1, 1), pygame.SRCALPHA)  # 描画範囲の計測用
+        self._visual = SpatialGrid(bounds=self._measure)  # 描画範囲のインデックス
+
+        self._dynamic = set()   # 静的レイヤーから外しているオブジェクト
+        self._regions = []      # 描き直す範囲（pygame.Rect）
+        self._deferred = []     # 表示範囲外なので描き直しを保留している範囲
+        self._full = True       # 次の compose で全体を描き直す
+        self._appended = []     # 重なり順の一番上に足したので、描き直さずに上から描き足すもの
+        self._flags = None      # (show_category, tent_highlight, LOD の revision)
+        self._lod = None        # LabelLod（ブース文字の詳細度）
+        self._sprites = {}      # polygon -> (key, Surface, 左上)
+        self._z = {}            # obj -> (層, 並びのキー)。observer の通知で保つ（毎フレームリストを調べない）
+        self._top = [0, 0, 0]   # 層ごとに振ったキーの最大（末尾への追加はこの次）
+
+        # ネイティブ解像度描画（None は従来どおりワールド座標 = static_layer 座標）
+        self._xf = None         # ワールド -> static_layer
+        self._scene_xf = None   # 拡大率だけの変換（描画範囲の計測用）
+        self._origin = (0, 0)   # static_layer 左上（拡大率だけ掛けた座標）
+
+        # 計測用
+        self.full_repaints = 0
+        self.region_repaints = 0
+
+        for objs in (rects, polygons, texts):
+            objs.add_observer(self)
+
+    # -----------------------------
+    # 描画範囲
+    # -----------------------------
+    def _draw_static(self, surface, obj, lod=None, xf=None):
+        """静的レイヤー用の描画（非アクティブ表示）。描画範囲のリストを返す"""
+        if isinstance(obj, RotatingRect):
+            return obj.draw_rects(
+                surface, self.font, is_active=False,
+                name_pos_active=obj.name_pos_active, tent_highlight=self._tent_highlight(), lod=lod, xf=xf
+            )
+        if isinstance(obj, PolygonShape):
+            return obj.draw_polygon(surface, is_active=False, xf=xf)
+        return obj.draw_texts(surface, self.font_path, active=False, xf=xf)
+
+    def _tent_highlight(self):
+        return self._flags[1] if self._flags else False
+
+    def _measure(self, obj):
+        """
+        1x1 の作業用 Surface に描いて描画範囲 (x0, y0, x1, y1) を得る
+        （LOD によらず文字まで含めた範囲。詳細度が変わっても測り直さなくてよい）
+        """
+        rects = self._draw_static(self._scratch, obj, xf=self._scene_xf) or []
+        if not rects:
+            return (0, 0, 0, 0)
+        area = pygame.Rect(rects[0]).unionall(rects[1:]).inflate(self.BOUNDS_PAD * 2, self.BOUNDS_PAD * 2)
+        return (area.left, area.top, area.right, area.bottom)
+
+    def _layer_rect(self, bounds):
+        """インデックスの外接矩形 -> static_layer 上の Rect"""
+        x0, y0, x1, y1 = bounds
+        ox, oy = self._origin
+        return pygame.Rect(x0 - ox, y0 - oy, x1 - x0, y1 - y0)
+
+    def _scene_bounds(self, rect):
+        """static_layer 上の Rect -> インデックスの座標 (x0, y0, x1, y1)"""
+        ox, oy = self._origin
+        return (rect.left + ox, rect.top + oy, rect.right + ox, rect.bottom + oy)
+
+    def _invalidate_bounds(self, bounds):
+        if bounds is None:
+            return
+        x0, y0, x1, y1 = bounds
+        if x1 > x0 and y1 > y0:
+            self._regions.append(self._layer_rect(bounds))
+
+    def set_transform(self, xf, size=None):
+        """
+        ワールド座標を xf（ViewTransform）で size の static_layer に描く（None で従来の等倍）
+        拡大率が変わったら描画範囲を測り直し、何か変わったら次の update で全体を描き直す
+        """
+        size = size or self.size
+        old_key = self._xf.key() if self._xf is not None else None
+        new_key = xf.key() if xf is not None else None
+        if new_key == old_key and size == self.size:
+            return
+
+        if size != self.size:
+            self.size = size
+            self.static_layer = pygame.Surface(size)
+
+        old_scale = self._xf.scale if self._xf is not None else 1.0
+        self._xf = xf
+        if xf is None:
+            self._scene_xf = None
+            self._origin = (0, 0)
+        else:
+            self._scene_xf = ViewTransform(xf.scale)
+            self._origin = (-xf.offset[0], -xf.offset[1])
+
+        if (xf.scale if xf is not None else 1.0) != old_scale:
+            self._visual.rebuild([*self.rects, *self.polygons, *self.texts])
+            self._sprites.clear()
+        self._regions = []
+        self._deferred = []
+        self._full = True
+
+    def invalidate(self, rect=None):
+        """範囲（省略時は全体）を次の compose で描き直す"""
+        if rect is None:
+            self._full = True
+        else:
+            self._regions.append(pygame.Rect(rect))
+
+    # -----------------------------
+    # ObjectList observer
+    # -----------------------------
+    def attach(self, objs):
+        """登録時の既存オブジェクト（並びのキーはまとめて振る）"""
+        if not objs:
+            return
+        for obj in objs:
+            self._visual.insert(obj)
+        self._renumber(self._layer_of(objs[0]._owner))
+
+    def object_added(self, obj):
+        self._place(obj)
+        self._visual.insert(obj)
+        if obj not in self._dynamic:
+            self._invalidate_bounds(self._visual.bounds_of(obj))
+
+    def objects_appended(self, objs):
+        """
+        extend で末尾にまとめて足したもの。重なり順でそれより上に何も無ければ
+        範囲を描き直さず次の update で上から描き足す（段階的な読み込みで毎回描き直さないため）
+        """
+        owner = objs[0]._owner if objs else None
+        layer = self._layer_of(owner)
+        if layer is not None:
+            for obj in objs:
+                self._top[layer] += 1
+                self._z[obj] = (layer, self._top[layer])
+        above = {id(self.rects): (self.polygons, self.texts), id(self.polygons): (self.texts,)}.get(id(owner), ())
+        if any(above):
+            for obj in objs:
+                self._visual.insert(obj)
+                if obj not in self._dynamic:
+                    self._invalidate_bounds(self._visual.bounds_of(obj))
+            return
+        for obj in objs:
+            self._visual.insert(obj)
+        self._appended.extend(objs)
+
+    def objects_reordered(self, objs):
+        """重なり順が変わったものの範囲を描き直す"""
+        self._renumber(self._layer_of(objs[0]._owner))
+        for obj in objs:
+            if obj not in self._dynamic:
+                self._invalidate_bounds(self._visual.bounds_of(obj))
+
+    def object_removed(self, obj):
+        if obj not in self._dynamic:
+            self._invalidate_bounds(self._visual.bounds_of(obj))
+        self._visual.remove(obj)
+        self._z.pop(obj, None)
+        self._dynamic.discard(obj)
+        self._sprites.pop(obj, None)
+
+    def object_changed(self, obj, attr):
+        if obj in self._dynamic:
+            return  # 静的レイヤーには描かれていない（外れるときに測り直す）
+        old = self._visual.bounds_of(obj)
+        self._visual.insert(obj)
+        self._invalidate_bounds(old)
+        self._invalidate_bounds(self._visual.bounds_of(obj))
+
+    # -----------------------------
+    # 動的オブジェクト
+    # -----------------------------
+    def set_dynamic(self, objs):
+        """今フレームで毎回描くオブジェクトを指定（差分だけ静的レイヤーを描き直す）"""
+        objs = {obj for obj in objs if obj is not None and obj in self._visual}
+        if objs == self._dynamic:
+            return
+
+        for obj in objs - self._dynamic:
+            # 静的レイヤーから消す
+            self._invalidate_bounds(self._visual.bounds_of(obj))
+
+        for obj in self._dynamic - objs:
+            # 静的レイヤーに戻す（動的中の変更や name_pos_active 等の非通知属性を反映して測り直す）
+            old = self._visual.bounds_of(obj)
+            self._visual.insert(obj)
+            self._invalidate_bounds(old)
+            self._invalidate_bounds(self._visual.bounds_of(obj))
+
+        self._dynamic = objs
+
+    # -----------------------------
+    # 合成
+    # -----------------------------
+    def _layer_of(self, owner):
+        for layer, objs in enumerate((self.rects, self.polygons, self.texts)):
+            if objs is owner:
+                return layer
+        return None
+
+    def _renumber(self, layer):
+        """層のキーを今の並びで振り直す（登録時・並べ替え・途中への挿入で間が詰まったとき）"""
+        if layer is None:
+            return
+        objs = (self.rects, self.polygons, self.texts)[layer]
+        for i, obj in enumerate(objs):
+            self._z[obj] = (layer, i)
+        self._top[layer] = len(objs)
+
+    def _place(self, obj):
+        """
+        足したオブジェクトのキー。末尾なら最大の次、途中なら前後のキーの間（小数）にして、
+        ほかのオブジェクトのキーは変えない（間が取れなければその層だけ振り直す）
+        """
+        owner = obj._owner
+        layer = self._layer_of(owner)
+        if layer is None:
+            return
+        if owner[-1] is obj:
+            self._top[layer] += 1
+            self._z[obj] = (layer, self._top[layer])
+            return
+        i = owner.index(obj)  # 途中への挿入（まれ）だけリストを調べる
+        after = self._z.get(owner[i + 1])
+        before = self._z.get(owner[i - 1]) if i > 0 else (layer, after[1] - 1 if after else 0)
+        if after is None or before is None:
+            self._renumber(layer)
+            return
+        key = (before[1] + after[1]) / 2
+        if not before[1] < key < after[1]:
+            self._renumber(layer)
+            return
+        self._z[obj] = (layer, key)
+
+    def _z_order(self):
+        """obj -> 重なり順のキー (層, 並び)"""
+        return self._z
+
+    def _expand(self, area):
+        """
+        範囲に掛かる rect の描画範囲全体を含むまで広げる
+        （枠線の pygame.draw は clip で途中から描くと画素が1px ずれるため、rect は丸ごと描く）
+        """
+        while True:
+            grown = area
+            for obj in self._visual.query(self._scene_bounds(area)):
+                if obj in self._dynamic or not isinstance(obj, RotatingRect):
+                    continue
+                grown = grown.union(self._layer_rect(self._visual.bounds_of(obj)))
+            if grown == area:
+                return area
+            area = grown
+
+    def _polygon_sprite(self, poly):
+        """非アクティブ polygon を描いた Surface（clip しても画素がずれないよう丸ごと描いておく）"""
+        key = (tuple(poly.points), poly.color, poly.width, poly.visible, self._origin)
+        cached = self._sprites.get(poly)
+        if cached is not None and cached[0] == key:
+            return cached[1], cached[2]
+
+        x0, y0, x1, y1 = self._visual.bounds_of(poly)
+        sprite = pygame.Surface((max(1, x1 - x0), max(1, y1 - y0)), pygame.SRCALPHA)
+        if poly.visible and len(poly.points) >= 2:
+            if self._scene_xf is None:
+                pts, width = poly.points, poly.width
+            else:
+                pts = [self._scene_xf.point(p) for p in poly.points]
+                width = self._scene_xf.width(poly.width)
+            pts = [(x - x0, y - y0) for x, y in pts]
+            pygame.draw.lines(sprite, poly.color, False, pts, width)
+        pos = self._layer_rect((x0, y0, x1, y1)).topleft
+        self._sprites[poly] = (key, sprite, pos)
+        return sprite, pos
+
+    def _repaint(self, area, order, show_category):
+        layer = self.static_layer
+        layer.set_clip(area)
+        layer.blit(self.background_layer, area, area)
+        if show_category:
+            layer.blit(self.category_layer, area, area)
+
+        objs = [obj for obj in self._visual.query(self._scene_bounds(area)) if obj not in self._dynamic and obj in order]
+        objs.sort(key=order.__getitem__)
+        for obj in objs:
+            if isinstance(obj, PolygonShape):
+                sprite, pos = self._polygon_sprite(obj)
+                layer.blit(sprite, pos)
+            else:
+                self._draw_static(layer, obj, self._lod, self._xf)
+        layer.set_clip(None)
+
+    def _repaint_all(self, show_category):
+        full = pygame.Rect((0, 0), self.size)
+        self._repaint(full, self._z_order(), show_category)
+        self.full_repaints += 1
+
+    def update(self, show_category=True, tent_highlight=False, active=None, active_rects=(), view=None, lod=None):
+        """
+        static_layer の汚れた範囲を描き直す
+        view: 表示範囲（pygame.Rect）。指定時は範囲内だけ描き直し、範囲外は保留する
+        lod : LabelLod。判定が変わったら（revision）全体を描き直す
+        戻り値: 描き直した範囲のリスト（全体を描き直したときは None）
+        """
+        self._lod = lod
+        flags = (show_category, tent_highlight, lod.revision if lod is not None else None)
+        if flags != self._flags:
+            self._flags = flags
+            self._full = True
+
+        self.set_dynamic([active, *active_rects])
+
+        # 上に描き足すだけで済むのは、ほかに描き直す範囲が無いときだけ（あれば範囲に含めて描き直す）
+        appended, self._appended = self._appended, []
+        if appended and (self._full or self._regions or self._deferred or view is not None):
+            for obj in appended:
+                self._invalidate_bounds(self._visual.bounds_of(obj))
+            appended = []
+
+        screen_area = pygame.Rect((0, 0), self.size)
+        visible_area = screen_area if view is None else pygame.Rect(view).clip(screen_area)
+        regions = self._regions + self._deferred
+        self._regions = []
+        self._deferred = []
+
+        full = self._full
+        if not full and regions:
+            area = sum(r.clip(visible_area).width * r.clip(visible_area).height for r in regions)
+            if (len(regions) > self.MAX_REGIONS
+                    or area > visible_area.width * visible_area.height * self.FULL_REPAINT_RATIO):
+                full = True
+        self._full = False
+
+        if full and view is None:
+            self._repaint_all(show_category)
+            return None
+        if full:
+            regions = [screen_area]
+            self.full_repaints += 1
+
+        repainted = []
+        order = None
+        for region in regions:
+            region = region.clip(screen_area)
+            visible = region.clip(visible_area)
+            if not visible.width or not visible.height:
+                if region.width and region.height:
+                    self._deferred.append(region)
+                continue
+            self._deferred.extend(_subtract(region, visible))
+
+            if order is None:
+                order = self._z_order()
+            visible = self._expand(visible).clip(screen_area)
+            self._repaint(visible, order, show_category)
+            repainted.append(visible)
+            self.region_repaints += 1
+        if appended:
+            repainted.extend(self._draw_appended(appended))
+        return None if full else repainted
+
+    def _draw_appended(self, objs):
+        """足した順に static_layer の上から描く。描いた範囲（1つにまとめる）を返す"""
+        areas = []
+        for obj in objs:
+            bounds = self._visual.bounds_of(obj)
+            if bounds is None or obj in self._dynamic:
+                continue
+            if isinstance(obj, PolygonShape):
+                sprite, pos = self._polygon_sprite(obj)
+                self.static_layer.blit(sprite, pos)
+            else:
+                self._draw_static(self.static_layer, obj, self._lod, self._xf)
+            areas.append(self._layer_rect(bounds))
+        if not areas:
+            return []
+        return [areas[0].unionall(areas[1:]).clip(pygame.Rect((0, 0), self.size))]
+
+    def restore(self, surface, regions=None):
+        """static_layer を surface に写す（regions 省略時は全体）"""
+        if regions is None:
+            surface.blit(self.static_layer, (0, 0))
+            return
+        for region in regions:
+            surface.blit(self.static_layer, region, region)
+
+    def draw_dynamic(self, surface, active=None, selected_vertex=None, tent_highlight=False, lod=None):
+        """
+        動的オブジェクトを元の重なり順で描く
+        戻り値: 描画範囲のリスト（枠線のはみ出し分を含む）
+        """
+        dirty = []
+        for obj in sorted(self._dynamic, key=self._dynamic_order_key):
+            if isinstance(obj, RotatingRect):
+                dirty.extend(obj.draw_rects(
+                    surface, self.font, is_active=True,
+                    name_pos_active=obj.name_pos_active, tent_highlight=tent_highlight, lod=lod, xf=self._xf
+                ))
+            elif isinstance(obj, PolygonShape):
+                dirty.extend(obj.draw_polygon(
+                    surface, is_active=(obj is active), selected_vertex=selected_vertex, xf=self._xf
+                ))
+            else:
+                dirty.extend(obj.draw_texts(surface, self.font_path, active=(obj is active), xf=self._xf))
+        pad = self.BOUNDS_PAD * 2
+        return [pygame.Rect(r).inflate(pad, pad) for r in dirty]
+
+    def compose(self, surface, show_category=True, tent_highlight=False,
+                active=None, active_rects=(), selected_vertex=None):
+        """
+        static_layer を更新して surface 全体に写し、動的オブジェクトを描く
+        戻り値: 動的オブジェクトの描画範囲リスト
+        """
+        self.update(show_category, tent_highlight, active, active_rects)
+        self.restore(surface)
+        return self.draw_dynamic(surface, active, selected_vertex, tent_highlight)
+
+    def _dynamic_order_key(self, obj):
+        return self._z.get(obj, (-1, -1))
+
+
+def _subtract(rect, cut):
+    """rect から（rect に含まれる）cut を除いた残りを最大4つの Rect で返す"""
+    pieces = [
+        pygame.Rect(rect.left, rect.top, rect.width, cut.top - rect.top),
+        pygame.Rect(rect.left, cut.bottom, rect.width, rect.bottom - cut.bottom),
+        pygame.Rect(rect.left, cut.top, cut.left - rect.left, cut.height),
+        pygame.Rect(cut.right, cut.top, rect.right - cut.right, cut.height),
+    ]
+    return [r for r in pieces if r.width > 0 and r.height > 0]
@@ -1,3 +1,4 @@
+import os
 import tkinter as tk
 
 # --- 設定 ---
@@ -13,6 +14,55 @@ SCREEN_W, SCREEN_H = 1920, 1080
 SCALE_X = SCREEN_W / DRAW_W
 SCALE_Y = SCREEN_H / DRAW_H
 
+# 再描画モード
+# False: 入力・オブジェクト変更・メッセージ表示期限のときだけ描画（省電力）
+# True : 従来通り毎フレーム描画（ベンチマーク比較用 / 環境変数 TCBF_CONTINUOUS_REDRAW=1）
+CONTINUOUS_REDRAW = os.environ.get("TCBF_CONTINUOUS_REDRAW") == "1"
+MAX_FPS = 60
+
+# 描画解像度
+# False: 1920x1080 の内部 Surface に描いてウィンドウへ縮小（従来）
+# True : ウィンドウの解像度（16:9 の範囲）に直接描く（縮小なし / 環境変数 TCBF_NATIVE_RESOLUTION=1）
+NATIVE_RESOLUTION = os.environ.get("TCBF_NATIVE_RESOLUTION") == "1"
+IDLE_WAIT_TIMEOUT = 1.0  # 待機の最大時間（秒）
+
+# 長いフレームの記録（環境変数 TCBF_FRAME_WATCHDOG=1 で有効）
+# FRAME_BUDGET_MS を超えたフレームのプロファイルと段階別の内訳を FRAME_WATCHDOG_DIR に書き出す
+FRAME_WATCHDOG = os.environ.get("TCBF_FRAME_WATCHDOG") == "1"
+FRAME_BUDGET_MS = float(os.environ.get("TCBF_FRAME_BUDGET_MS", "50"))
+FRAME_WATCHDOG_PROFILER = os.environ.get("TCBF_FRAME_WATCHDOG_PROFILER", "sample")  # "sample": スタック採取 / "cprofile"
+FRAME_WATCHDOG_DIR = "frame_profiles"
+
+# トレース出力（Perfetto / chrome://tracing で開く JSON）
+# 環境変数 TCBF_TRACE=出力先.json か、起動引数 --trace 出力先.json で有効
+TRACE_FILE = os.environ.get("TCBF_TRACE") or None
+TRACE_BUFFER_EVENTS = 200_000  # これを超えたら古いイベントから捨てる
+
+# 入力の記録（bench.replay で再生して処理時間・結果を比べる）
+# 環境変数 TCBF_RECORD_INPUT=出力先.json か、起動引数 --record 出力先.json で有効
+RECORD_INPUT_FILE = os.environ.get("TCBF_RECORD_INPUT") or None
+
+# 自動保存（ワーカースレッドで AUTOSAVE_DIR/<ファイル名> に書き込む）
+# 環境変数 TCBF_AUTOSAVE_INTERVAL=秒 で有効（0 で無効）
+AUTOSAVE_INTERVAL = float(os.environ.get("TCBF_AUTOSAVE_INTERVAL", "0"))
+AUTOSAVE_DIR = "autosave"
+
+# 編集ジャーナル（マップ JSON の隣の <json>.journal に編集を追記し、落ちたら次の読み込みで戻す）
+# 環境変数 TCBF_EDIT_JOURNAL=0 で無効
+EDIT_JOURNAL = os.environ.get("TCBF_EDIT_JOURNAL") != "0"
+JOURNAL_FLUSH_INTERVAL = 0.5  # 書き込み間隔（秒）。この間の同じ属性の変更は最新値だけ書く
+
+# 段階的な読み込み（マップ表示モードはファイルをワーカースレッドで読み、届いた分をフレームごとに足す）
+# 環境変数 TCBF_PROGRESSIVE_LOAD=0 で無効（従来どおり全部読んでから開く）
+PROGRESSIVE_LOAD = os.environ.get("TCBF_PROGRESSIVE_LOAD") != "0"
+LOAD_CHUNK = 200             # ワーカーが一度に渡すオブジェクトの数
+LOAD_FRAME_BUDGET_MS = 12    # 1フレームでオブジェクトを足すのに使う時間の目安
+LOAD_REDRAW_INTERVAL = 0.5   # 読み込み中に足した分を描く間隔（秒。入力があればすぐ描く）
+
+# ブース文字の詳細度（画面上の文字の高さ[px]がこれ未満なら描かない）
+LOD_NAME_MIN_PX = 6    # 名前ブロック
+LOD_NUMBER_MIN_PX = 5  # No（これも読めなければ色付きの四角だけ）
+
 # JSON保存先
 CATEGORIES_FILE = "categories.json"
 RECTS_FILE = "rects.json"
@@ -23,8 +73,11 @@ PAST_EVENT_DIR = "past_event_data"
 # 過去開催JSONリスト
 PAST_EVENT_DATA_LIST = "past_event_data_list.json"
 
-root = tk.Tk() #tk.Tk() はアプリ全体で1回だけ作る
-root.withdraw()  # 常に隠しておく
+try:
+    root = tk.Tk() #tk.Tk() はアプリ全体で1回だけ作る
+    root.withdraw()  # 常に隠しておく
+except tk.TclError:
+    root = None  # ディスプレイのない環境（ヘッドレスのベンチマーク等）
 
 # DELETE/UNDO用
 last_deleted_obj = None
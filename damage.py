@@ -0,0 +1,258 @@
+import math
+import pygame
+
+TARGET_ASPECT = 16 / 9
+
+
+def letterbox(screen_size, draw_size, aspect=TARGET_ASPECT):
+    """
+    内部 Surface を 16:9 維持（黒帯あり）でウィンドウに収めるときの配置
+    戻り値: (scaled_w, scaled_h, offset_x, offset_y)
+    """
+    sw, sh = screen_size
+    if sw / sh > aspect:
+        scaled_h = sh
+        scaled_w = int(sh * aspect)
+    else:
+        scaled_w = sw
+        scaled_h = int(sw / aspect)
+    return scaled_w, scaled_h, (sw - scaled_w) // 2, (sh - scaled_h) // 2
+
+
+# -----------------------------
+# 描画範囲を記録する内部 Surface
+# -----------------------------
+class DamageSurface(pygame.Surface):
+    """blit / fill した範囲を DamageTracker に記録する内部描画用 Surface"""
+
+    def __init__(self, size, tracker):
+        super().__init__(size)
+        self.tracker = tracker
+
+    def blit(self, source, dest, area=None, special_flags=0):
+        rect = super().blit(source, dest, area, special_flags)
+        self.tracker.add(rect)
+        return rect
+
+    def fill(self, color, rect=None, special_flags=0):
+        rect = super().fill(color, rect, special_flags)
+        self.tracker.add(rect)
+        return rect
+
+
+# -----------------------------
+# 部分提示（ダメージトラッキング）
+# -----------------------------
+class DamageTracker:
+    """
+    内部座標で汚れた範囲を集め、レターボックス変換（screen_to_internal の逆変換）で
+    画面座標に写して、その範囲だけ縮小して display.update する。
+    ウィンドウサイズが変わったとき・invalidate() 後だけ全体を flip する。
+    等倍以外の部分縮小は縮小フィルタの都合で境界が僅かにずれるため、
+    操作が止まってから（settle_at）一度だけ全体を提示し直す。
+
+    毎フレーム上描きするもの（動的オブジェクト・HUD・メッセージ）は overlay として記録し、
+    次フレームで静的レイヤーから戻す範囲（begin_frame の戻り値）になる。
+    base() の中で描いたもの（静的レイヤーの復元）は提示だけして overlay にしない。
+    """
+
+    MARGIN = 2                # 縮小フィルタが参照する周囲の内部ピクセル
+    MERGE_GAP = 8             # これ以下の隙間の範囲はまとめる
+    FULL_PRESENT_RATIO = 0.6  # これを超える面積が汚れたら全体を提示
+    ALIGN_MAX = 32            # 部分縮小の位置合わせで探す範囲（内部ピクセル）
+    SETTLE_DELAY = 0.3        # 部分縮小のあと、操作が止まってから全体を提示し直すまでの秒数
+
+    def __init__(self, draw_size):
+        self.draw_size = draw_size
+        self._damage = []          # 今フレームで提示する内部座標の範囲
+        self._overlay = []         # 今フレームの上描き範囲
+        self._recording_base = False
+        self._screen_overlay = []  # 前フレームに画面へ直接描いた範囲（メニュー等）
+        self._screen_size = None
+        self._full = True
+        self._approx = False       # 部分縮小で全体縮小と画素が僅かにずれている
+        self.settle_at = None      # この時刻（秒）以降の present で全体を提示し直す
+
+        # 計測用
+        self.full_presents = 0
+        self.partial_presents = 0
+
+    # -----------------------------
+    # 記録
+    # -----------------------------
+    def begin_frame(self):
+        """前フレームの overlay を返して記録をリセット（静的レイヤーから戻す範囲）"""
+        restore = self._overlay
+        self._overlay = []
+        return restore
+
+    def add(self, rect):
+        rect = pygame.Rect(rect)
+        if rect.width <= 0 or rect.height <= 0:
+            return
+        self._damage.append(rect)
+        if not self._recording_base:
+            self._overlay.append(rect)
+
+    def add_all(self, rects):
+        for rect in rects:
+            self.add(rect)
+
+    def base(self):
+        """with tracker.base(): の中の描画は overlay にしない"""
+        return _BaseScope(self)
+
+    def invalidate(self):
+        """次の present で全体を提示する"""
+        self._full = True
+
+    # -----------------------------
+    # 提示
+    # -----------------------------
+    def present(self, screen, surface, draw_overlay=None, now=None):
+        """
+        surface（内部解像度）の汚れた範囲だけ screen に縮小して表示
+        draw_overlay(screen) -> [Rect]: 画面座標で直接描くもの（コンテキストメニュー等）
+        now: 現在時刻（秒）。部分縮小のあとは settle_at に全体を提示し直す時刻が入る
+        """
+        screen_size = screen.get_size()
+        scaled_w, scaled_h, offset_x, offset_y = letterbox(screen_size, self.draw_size)
+        if screen_size != self._screen_size:
+            self._screen_size = screen_size
+            self._full = True
+        if self.settle_at is not None and now is not None and now >= self.settle_at:
+            self._full = True
+
+        regions = self._merge(self._damage + self._screen_to_internal_rects(
+            self._screen_overlay, scaled_w, scaled_h, offset_x, offset_y))
+        draw_w, draw_h = self.draw_size
+        if not self._full and sum(r.width * r.height for r in regions) > draw_w * draw_h * self.FULL_PRESENT_RATIO:
+            self._full = True
+
+        if self._full:
+            scaled = pygame.transform.smoothscale(surface, (scaled_w, scaled_h))
+            screen.fill((0, 0, 0))
+            screen.blit(scaled, (offset_x, offset_y))
+            self._screen_overlay = list(draw_overlay(screen) or []) if draw_overlay else []
+            pygame.display.flip()
+            self._full = False
+            self._approx = False
+            self.settle_at = None
+            self._damage = []
+            self.full_presents += 1
+            return
+
+        updates = list(self._screen_overlay)
+        for region in regions:
+            dest = self._present_region(screen, surface, region, scaled_w, scaled_h, offset_x, offset_y)
+            if dest is not None:
+                updates.append(dest)
+
+        self._screen_overlay = list(draw_overlay(screen) or []) if draw_overlay else []
+        updates.extend(self._screen_overlay)
+        if updates:
+            pygame.display.update(updates)
+        self._damage = []
+        self.partial_presents += 1
+        if self._approx and now is not None:
+            self.settle_at = now + self.SETTLE_DELAY
+
+    def _present_region(self, screen, surface, region, scaled_w, scaled_h, offset_x, offset_y):
+        """内部座標の region を縮小して画面の対応位置に描く（戻り値: 画面座標の Rect）"""
+        draw_w, draw_h = self.draw_size
+
+        # 等倍ならそのまま写す（フィルタ誤差なし）
+        if (scaled_w, scaled_h) == (draw_w, draw_h):
+            dest = region.move(offset_x, offset_y)
+            screen.blit(surface, dest, region)
+            return dest
+
+        kx = scaled_w / draw_w
+        ky = scaled_h / draw_h
+
+        # 画面側の範囲（全体縮小時と同じ位置）
+        sx0 = max(0, math.floor(region.left * kx))
+        sy0 = max(0, math.floor(region.top * ky))
+        sx1 = min(scaled_w, math.ceil(region.right * kx))
+        sy1 = min(scaled_h, math.ceil(region.bottom * ky))
+        if sx1 <= sx0 or sy1 <= sy0:
+            return None
+
+        # フィルタの周囲参照分を足した内部側の範囲（縮小後に切り落とす）
+        # 内部と画面の画素境界がなるべく一致する位置に揃え、縮小位置のずれを抑える
+        ix0 = self._snap(math.floor(sx0 / kx) - self.MARGIN, kx, -1, 0, draw_w)
+        iy0 = self._snap(math.floor(sy0 / ky) - self.MARGIN, ky, -1, 0, draw_h)
+        ix1 = self._snap(math.ceil(sx1 / kx) + self.MARGIN, kx, +1, 0, draw_w)
+        iy1 = self._snap(math.ceil(sy1 / ky) + self.MARGIN, ky, +1, 0, draw_h)
+
+        px0 = round(ix0 * kx)
+        py0 = round(iy0 * ky)
+        pw = max(1, round(ix1 * kx) - px0)
+        ph = max(1, round(iy1 * ky) - py0)
+        part = pygame.transform.smoothscale(surface.subsurface((ix0, iy0, ix1 - ix0, iy1 - iy0)), (pw, ph))
+
+        dest = pygame.Rect(offset_x + sx0, offset_y + sy0, sx1 - sx0, sy1 - sy0)
+        screen.blit(part, dest, pygame.Rect(sx0 - px0, sy0 - py0, sx1 - sx0, sy1 - sy0))
+        self._approx = True
+        return dest
+
+    def _snap(self, i, k, step, lo, hi):
+        """i から step 方向に ALIGN_MAX 以内で、i * k が最も整数に近い位置（範囲外は端）"""
+        best, best_err = None, None
+        for n in range(self.ALIGN_MAX + 1):
+            j = i + step * n
+            if j < lo or j > hi:
+                break
+            err = abs(j * k - round(j * k))
+            if best is None or err < best_err - 1e-9:
+                best, best_err = j, err
+                if err < 1e-9:
+                    break
+        return best if best is not None else min(max(i, lo), hi)
+
+    def _screen_to_internal_rects(self, rects, scaled_w, scaled_h, offset_x, offset_y):
+        """画面座標の範囲を内部座標へ（screen_to_internal と同じ変換）"""
+        draw_w, draw_h = self.draw_size
+        kx = scaled_w / draw_w
+        ky = scaled_h / draw_h
+        result = []
+        for r in rects:
+            x0 = math.floor((r.left - offset_x) / kx)
+            y0 = math.floor((r.top - offset_y) / ky)
+            x1 = math.ceil((r.right - offset_x) / kx)
+            y1 = math.ceil((r.bottom - offset_y) / ky)
+            result.append(pygame.Rect(x0, y0, x1 - x0, y1 - y0))
+        return result
+
+    def _merge(self, rects):
+        """重なる・近い範囲をまとめる（描画範囲内に切り詰め）"""
+        bounds = pygame.Rect((0, 0), self.draw_size)
+        merged = []
+        for rect in rects:
+            rect = rect.clip(bounds)
+            if rect.width <= 0 or rect.height <= 0:
+                continue
+            grown = True
+            while grown:
+                grown = False
+                probe = rect.inflate(self.MERGE_GAP * 2, self.MERGE_GAP * 2)
+                for i, other in enumerate(merged):
+                    if probe.colliderect(other):
+                        rect = rect.union(merged.pop(i))
+                        grown = True
+                        break
+            merged.append(rect)
+        return merged
+
+
+class _BaseScope:
+    def __init__(self, tracker):
+        self.tracker = tracker
+
+    def __enter__(self):
+        self.tracker._recording_base = True
+        return self.tracker
+
+    def __exit__(self, *exc):
+        self.tracker._recording_base = False
+        return False
@@ -0,0 +1,87 @@
+import pygame
+from config import font_path as default_font_path
+
+
+# -----------------------------
+# フォント共有レジストリ
+# -----------------------------
+class FontRegistry:
+    """
+    (path, size) ごとに pygame.font.Font を1つだけ読み込んで共有する。
+
+    get(size)            : 取得（読み込んだフォントは保持し続ける）
+    acquire / release    : 参照カウントつき取得・解放（オブジェクトのサイズ変更用）
+                           get / preload されていないフォントはカウント0で破棄
+    preload(sizes)       : 使うサイズを読み込み時にまとめて読み込む
+
+    フォントファイルが読めないときは pygame の既定フォントで代用する。
+    """
+
+    def __init__(self):
+        self._fonts = {}    # (path, size) -> Font
+        self._refs = {}     # (path, size) -> 参照数
+        self._pinned = set()
+
+        # 計測用
+        self.hits = 0
+        self.misses = 0
+        self.fallbacks = 0
+
+    def _load(self, key):
+        font = self._fonts.get(key)
+        if font is not None:
+            self.hits += 1
+            return font
+
+        self.misses += 1
+        path, size = key
+        try:
+            font = pygame.font.Font(path, size)
+        except (OSError, pygame.error):
+            font = pygame.font.Font(None, size)
+            self.fallbacks += 1
+        self._fonts[key] = font
+        return font
+
+    def get(self, size, path=default_font_path):
+        key = (path, int(size))
+        self._pinned.add(key)
+        return self._load(key)
+
+    def acquire(self, size, path=default_font_path):
+        key = (path, int(size))
+        self._refs[key] = self._refs.get(key, 0) + 1
+        return self._load(key)
+
+    def release(self, size, path=default_font_path):
+        key = (path, int(size))
+        count = self._refs.get(key, 0) - 1
+        if count > 0:
+            self._refs[key] = count
+            return
+        self._refs.pop(key, None)
+        if key not in self._pinned:
+            self._fonts.pop(key, None)
+
+    def preload(self, sizes, path=default_font_path):
+        """sizes のフォントを読み込んで保持する"""
+        for size in sorted({int(s) for s in sizes if s and int(s) > 0}):
+            self.get(size, path)
+
+    def clear(self):
+        self._fonts.clear()
+        self._refs.clear()
+        self._pinned.clear()
+
+    def stats(self):
+        return {
+            "fonts": len(self._fonts),
+            "hits": self.hits,
+            "misses": self.misses,
+            "fallbacks": self.fallbacks,
+            "refs": sum(self._refs.values()),
+        }
+
+
+# プロセス共通のレジストリ
+fonts = FontRegistry()
@@ -0,0 +1,164 @@
+import time
+from collections import deque
+import pygame
+from config import MAX_FPS
+
+
+# -----------------------------
+# フレーム内の処理時間計測
+# -----------------------------
+class FrameTimer:
+    """
+    1フレームを段階（イベント処理・合成・HUD・画面転送など）に区切って所要時間を計る。
+
+    begin_frame()  : フレーム開始（待機のあと）
+    lap(name)      : 直前の begin_frame / lap からの時間を name の段階として記録
+    end_frame(rendered=True) : フレームを確定（描かなかった回も rendered=False で確定する。
+                   入力で起きた回のダイアログ・貼り付けなども計測に入る）
+    draw(screen)   : 直近 window フレームの平均・p95・最大とフレーム時間のスパークライン
+
+    enabled が False のあいだ lap などは属性を1つ見て戻るだけ（計測コストほぼなし）。
+    toggle() で表示を切り替える（F3）。表示中か observer がいるあいだ計測する。
+    observer: frame_begin(timer) / frame_end(timer)（end では last_stages / last_total / last_rendered が確定済み）
+    """
+
+    WINDOW = 120            # 集計するフレーム数
+    BUDGET_MS = 1000 / MAX_FPS  # スパークラインの目安線
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.enabled = False
+        self.visible = False
+        self._observers = []
+        self.reset()
+
+    def toggle(self):
+        self.visible = not self.visible
+        self.enabled = self.visible or bool(self._observers)
+        self.reset()
+        return self.visible
+
+    def add_observer(self, observer):
+        if observer not in self._observers:
+            self._observers.append(observer)
+        self.enabled = True
+
+    def remove_observer(self, observer):
+        if observer in self._observers:
+            self._observers.remove(observer)
+        self.enabled = self.visible or bool(self._observers)
+
+    def reset(self):
+        self._history = {}                      # 段階 -> deque[ms]
+        self._frames = deque(maxlen=self.window)  # フレーム全体 ms
+        self._rendered = deque(maxlen=self.window)  # 描いたフレームか（_frames と同じ並び）
+        self._current = {}
+        self._start = None
+        self._last = None
+        self.last_stages = {}   # 直前に確定したフレームの内訳 {段階: ms}
+        self.last_total = 0.0
+        self.last_rendered = True
+
+    # -----------------------------
+    # 計測
+    # -----------------------------
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        self._current = {}
+        for observer in self._observers:
+            observer.frame_begin(self)
+        self._start = self._last = time.perf_counter()
+
+    def lap(self, name):
+        if not self.enabled or self._last is None:
+            return
+        now = time.perf_counter()
+        self._current[name] = self._current.get(name, 0.0) + (now - self._last) * 1000
+        self._last = now
+
+    def end_frame(self, rendered=True):
+        if not self.enabled or self._start is None:
+            return
+        total = (time.perf_counter() - self._start) * 1000
+        for name, ms in self._current.items():
+            history = self._history.get(name)
+            if history is None:
+                history = self._history[name] = deque(maxlen=self.window)
+            history.append(ms)
+        self._frames.append(total)
+        self._rendered.append(rendered)
+        self.last_stages = self._current
+        self.last_total = total
+        self.last_rendered = rendered
+        self._current = {}
+        self._start = self._last = None
+        for observer in self._observers:
+            observer.frame_end(self)
+
+    # -----------------------------
+    # 集計
+    # -----------------------------
+    @staticmethod
+    def _summary(values):
+        ordered = sorted(values)
+        return (
+            sum(ordered) / len(ordered),
+            ordered[int(0.95 * (len(ordered) - 1))],
+            ordered[-1],
+        )
+
+    def stats(self):
+        """{段階: (平均, p95, 最大)}（ms、記録順）。フレーム全体は "frame" """
+        result = {name: self._summary(h) for name, h in self._history.items() if h}
+        if self._frames:
+            result["frame"] = self._summary(self._frames)
+        return result
+
+    # -----------------------------
+    # 表示
+    # -----------------------------
+    def draw(self, screen, font, pos=(10, 10)):
+        """画面座標で計測結果を描く。描いた範囲のリストを返す"""
+        if not self.visible:
+            return []
+
+        table = [("stage [ms]", "mean", "p95", "max")]
+        for name, values in self.stats().items():
+            table.append((name, *(f"{v:.2f}" for v in values)))
+        cells = [[font.render(text, True, (255, 255, 255)) for text in row] for row in table]
+
+        # 列ごとに揃える（段階名は左、数値は右寄せ）
+        col_w = [max(row[i].get_width() for row in cells) for i in range(4)]
+        line_h = font.get_linesize()
+        spark_w, spark_h = self.window * 2, 40
+        width = max(spark_w, sum(col_w) + 12 * 3) + 12
+        height = line_h * len(cells) + spark_h + 18
+        panel = pygame.Surface((width, height), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 180))
+        for r, row in enumerate(cells):
+            x = 6
+            for i, cell in enumerate(row):
+                dx = 0 if i == 0 else col_w[i] - cell.get_width()
+                panel.blit(cell, (x + dx, 6 + r * line_h))
+                x += col_w[i] + 12
+
+        # フレーム時間のスパークライン（目安線は MAX_FPS の1フレーム）
+        top = 12 + line_h * len(cells)
+        scale_ms = max([self.BUDGET_MS * 2] + list(self._frames))
+        budget_y = top + spark_h - round(self.BUDGET_MS / scale_ms * spark_h)
+        pygame.draw.line(panel, (90, 90, 90), (6, budget_y), (6 + spark_w, budget_y))
+        # 描かなかった回（入力処理だけ）は灰色、超えていれば赤
+        for i, (ms, rendered) in enumerate(zip(self._frames, self._rendered)):
+            h = max(1, round(ms / scale_ms * spark_h))
+            if ms > self.BUDGET_MS:
+                color = (255, 90, 90)
+            else:
+                color = (120, 220, 120) if rendered else (150, 150, 150)
+            pygame.draw.line(panel, color, (6 + i * 2, top + spark_h), (6 + i * 2, top + spark_h - h))
+
+        return [screen.blit(panel, pos)]
+
+
+# プロセス共通（モードを切り替えても表示状態を引き継ぐ）
+frame_timer = FrameTimer()
@@ -0,0 +1,185 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+import config
+from frame_timing import frame_timer
+
+
+# -----------------------------
+# スタック採取（低負荷のサンプリングプロファイラ）
+# -----------------------------
+class _StackSampler(threading.Thread):
+    """対象スレッドのスタックを interval 秒ごとに採って (時刻, スタック) を溜める"""
+
+    MAX_DEPTH = 64
+
+    def __init__(self, thread_id, interval=0.002, maxlen=20000):
+        super().__init__(name="frame-watchdog-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = deque(maxlen=maxlen)
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and len(stack) < self.MAX_DEPTH:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            if stack:
+                self.samples.append((time.perf_counter(), tuple(reversed(stack))))
+
+    def stop(self):
+        self._stop_event.set()
+
+    def between(self, start, end):
+        return [stack for t, stack in list(self.samples) if start <= t <= end]
+
+
+# -----------------------------
+# 長いフレームの記録
+# -----------------------------
+class FrameWatchdog:
+    """
+    フレームが budget_ms を超えたら、そのフレームのプロファイルと段階別の内訳を
+    out_dir/frame_<日時>_<ms>ms_<mode>.txt に書き出す（config.FRAME_WATCHDOG で有効）。
+
+    frame_timer の observer として動き、直近 history フレームの内訳も一緒に残す。
+    profiler="sample" はメインスレッドのスタックを別スレッドで採るだけなので描画を遅くしない。
+    "cprofile" は関数ごとの正確な時間が出るかわりに全体が重くなる。
+
+    watch(mode, counts) を各モードの開始時に呼ぶ（counts() -> {"rects": 件数, ...}）。
+    """
+
+    MIN_INTERVAL = 1.0  # 連続して書き出すときの最短間隔（秒）
+
+    def __init__(self, budget_ms=None, history=120, profiler=None, out_dir=None):
+        self.budget_ms = budget_ms if budget_ms is not None else config.FRAME_BUDGET_MS
+        self.profiler = profiler or config.FRAME_WATCHDOG_PROFILER
+        self.out_dir = out_dir or config.FRAME_WATCHDOG_DIR
+        self.frames = deque(maxlen=history)  # (合計 ms, 内訳, 描いたか)
+        self.mode = None
+        self.counts = None
+        self.running = False
+        self.dumps = []  # 書き出したファイル
+
+        self._sampler = None
+        self._profile = None
+        self._frame_start = None
+        self._last_dump = 0.0
+
+    def watch(self, mode, counts=None):
+        """mode のフレームを見張る（未開始なら開始）"""
+        self.mode = mode
+        self.counts = counts
+        if not self.running:
+            self.start()
+
+    def start(self):
+        if self.profiler == "sample":
+            self._sampler = _StackSampler(threading.get_ident())
+            self._sampler.start()
+        frame_timer.add_observer(self)
+        self.running = True
+
+    def stop(self):
+        frame_timer.remove_observer(self)
+        if self._sampler is not None:
+            self._sampler.stop()
+            self._sampler = None
+        self.running = False
+
+    # -----------------------------
+    # frame_timer observer
+    # -----------------------------
+    def frame_begin(self, timer):
+        self._frame_start = time.perf_counter()
+        if self._profile is not None:
+            self._profile.disable()  # 前のフレームが確定せずに終わった
+        if self.profiler == "cprofile":
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def frame_end(self, timer):
+        end = time.perf_counter()
+        if self._profile is not None:
+            self._profile.disable()
+        total, stages, rendered = timer.last_total, dict(timer.last_stages), timer.last_rendered
+        self.frames.append((total, stages, rendered))
+        if total > self.budget_ms and end - self._last_dump >= self.MIN_INTERVAL:
+            self._last_dump = end
+            self.dump(total, stages, self._frame_start, end, rendered)
+        self._profile = None
+
+    # -----------------------------
+    # 書き出し
+    # -----------------------------
+    def dump(self, total, stages, start, end, rendered=True):
+        os.makedirs(self.out_dir, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        path = os.path.join(self.out_dir, f"frame_{stamp}_{int(total)}ms_{self.mode}.txt")
+
+        lines = [
+            f"mode: {self.mode}",
+            f"objects: {self._counts_text()}",
+            f"frame: {total:.2f} ms (budget {self.budget_ms:g} ms)" + ("" if rendered else " - not rendered (input only)"),
+            "",
+            "stages [ms]:",
+        ]
+        lines += [f"  {name:<10}{ms:>9.2f}" for name, ms in stages.items()]
+        lines += ["", f"recent frames (oldest first, {len(self.frames)}, * = not rendered):"]
+        for frame_total, frame_stages, frame_rendered in self.frames:
+            detail = " ".join(f"{name}={ms:.1f}" for name, ms in frame_stages.items())
+            lines.append(f"  {frame_total:>8.2f}{'' if frame_rendered else ' *'}  {detail}")
+        lines += ["", *self._profile_lines(start, end)]
+
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        self.dumps.append(path)
+        print("Long frame ->", path)
+        return path
+
+    def _counts_text(self):
+        if self.counts is None:
+            return "-"
+        try:
+            return " ".join(f"{k}={v}" for k, v in self.counts().items())
+        except Exception as e:
+            return f"({e})"
+
+    def _profile_lines(self, start, end):
+        if self._profile is not None:
+            buf = io.StringIO()
+            pstats.Stats(self._profile, stream=buf).sort_stats("cumulative").print_stats(40)
+            return ["profile (cProfile, cumulative):", buf.getvalue()]
+
+        if self._sampler is None:
+            return ["profile: -"]
+        stacks = self._sampler.between(start, end)
+        interval_ms = self._sampler.interval * 1000
+        lines = [f"profile (sampled every {interval_ms:g} ms, {len(stacks)} samples):", "", "top (self):"]
+        leaf = Counter(stack[-1] for stack in stacks)
+        lines += [f"  {n:>5}  {name}" for name, n in leaf.most_common(25)]
+
+        # 関数単位（行番号を除く）。同じ関数がスタックに複数回あっても1回と数える
+        lines += ["", "top (inclusive):"]
+        inclusive = Counter(name for stack in stacks for name in {s.rsplit(":", 1)[0] for s in stack})
+        lines += [f"  {n:>5}  {name}" for name, n in inclusive.most_common(25)]
+
+        lines += ["", "stacks (collapsed):"]
+        collapsed = Counter(";".join(stack) for stack in stacks)
+        lines += [f"{n} {stack}" for stack, n in collapsed.most_common(50)]
+        return lines
+
+
+# プロセス共通
+frame_watchdog = FrameWatchdog()
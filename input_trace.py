@@ -0,0 +1,259 @@
+import hashlib
+import json
+import os
+
+import pygame
+
+
+# 記録・再生する入力イベント（アプリが post するイベントは含めない）
+INPUT_EVENT_TYPES = {
+    pygame.QUIT, pygame.KEYDOWN, pygame.KEYUP, pygame.TEXTINPUT, pygame.TEXTEDITING,
+    pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.MOUSEMOTION, pygame.MOUSEWHEEL,
+    pygame.VIDEORESIZE, pygame.ACTIVEEVENT,
+}
+KEY_CODES = sorted({v for k, v in vars(pygame).items() if k.startswith("K_") and isinstance(v, int)})
+
+# 記録する Tk ダイアログ（モードのモジュールに import された名前）。戻り値を残し、再生で同じ値を返す
+DIALOG_NAMES = (
+    "confirm_quit", "edit_object_window", "edit_all_objects_window", "show_power_table_with_category",
+    "edit_polygon_window", "edit_category_dialog", "save_as_png",
+)
+# 戻り値ではなく第1引数をその場で書き換えるダイアログ（閉じたあとの to_dict を残す）
+DIALOG_EDITS_ARG = {"edit_all_objects_window", "edit_polygon_window"}
+
+
+# -----------------------------
+# 変換
+# -----------------------------
+_SKIP = object()
+
+
+def _plain(value):
+    """JSON にできる値だけ残す（tuple は list）"""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (tuple, list)):
+        items = [_plain(v) for v in value]
+        return items if all(v is not _SKIP for v in items) else _SKIP
+    if isinstance(value, dict):
+        items = {k: _plain(v) for k, v in value.items()}
+        return items if all(isinstance(k, str) and v is not _SKIP for k, v in items.items()) else _SKIP
+    return _SKIP
+
+
+def _tuples(value):
+    """_plain の逆（list を tuple に戻す）"""
+    if isinstance(value, list):
+        return tuple(_tuples(v) for v in value)
+    if isinstance(value, dict):
+        return {k: _tuples(v) for k, v in value.items()}
+    return value
+
+
+def encode_event(event, t):
+    data = {k: _plain(v) for k, v in event.dict.items()}
+    return {"t": t, "type": event.type, "dict": {k: v for k, v in data.items() if v is not _SKIP}}
+
+
+def decode_event(record):
+    data = {k: tuple(v) if isinstance(v, list) else v for k, v in record["dict"].items()}
+    return pygame.event.Event(record["type"], data)
+
+
+def decode_dialog_result(record):
+    """記録したダイアログの戻り値（tuple は list で残っている）"""
+    return _tuples(record.get("result"))
+
+
+def apply_dialog_state(target, state):
+    """
+    その場で書き換えるダイアログの結果を target（オブジェクトかそのリスト）に反映する。
+    値は from_dict を通して作り、変わった属性だけ代入する（変更通知は通常の編集と同じ）
+    """
+    if isinstance(target, list):
+        for obj, d in zip(target, state):
+            apply_dialog_state(obj, d)
+        return
+    edited = type(target).from_dict(state)
+    for key in state:
+        value = getattr(edited, key)
+        if getattr(target, key, None) != value:
+            setattr(target, key, value)
+
+
+def model_snapshot(rects, texts, categories, polygons):
+    """DataManager.save_all と同じ形の辞書"""
+    return {
+        "rects":      [r.to_dict() for r in rects],
+        "texts":      [t.to_dict() for t in texts],
+        "categories": [c.to_dict() for c in categories],
+        "polygons":   [p.to_dict() for p in polygons],
+    }
+
+
+def model_checksum(snapshot):
+    text = json.dumps(snapshot, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# -----------------------------
+# 入力の記録
+# -----------------------------
+class InputRecorder:
+    """
+    マップ表示 / カテゴリ編集中の入力を時刻つきで記録し、path に JSON で書き出す
+    （bench.replay で同じ操作を再生して処理時間とモデルのチェックサムを比べる）。
+
+    pygame の入力関数（event.get / poll / wait・key.get_pressed / get_mods・mouse.get_pos / get_pressed）
+    を包み、モードの中で返した入力イベントと、押下中のキー・修飾キー・マウスの状態の変化を残す。
+    時刻はセッション開始からの get_ticks（ms）。
+    start(path, dialog_modules) に渡したモジュールの Tk ダイアログ（DIALOG_NAMES）も包み、
+    呼ばれた順に戻り値（DIALOG_EDITS_ARG は書き換えたあとの引数）を "dialogs" に残す。
+
+    begin_session(mode, rects, texts, categories, polygons) : モード開始時（各モードで呼ぶ）
+    end_session()                                          : モードから戻ったとき（main で呼ぶ）
+    記録していなくても begin_session は最後のモデル（model）を覚えておく。
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self.sessions = []
+        self.model = None       # (rects, texts, categories, polygons)
+        self._current = None
+        self._t0 = 0
+        self._last_state = None
+        self._originals = {}
+
+    def start(self, path, dialog_modules=()):
+        if self.enabled:
+            return
+        self.path = path
+        self.enabled = True
+        self._install()
+        for module in dialog_modules:
+            for name in DIALOG_NAMES:
+                if hasattr(module, name):
+                    original = getattr(module, name)
+                    self._originals[(module, name)] = original
+                    setattr(module, name, self._wrap_dialog(name, original))
+
+    def _install(self):
+        targets = {
+            (pygame.event, "get"): self._wrap_events,
+            (pygame.event, "poll"): self._wrap_event,
+            (pygame.event, "wait"): self._wrap_event,
+            (pygame.key, "get_pressed"): self._wrap_state,
+            (pygame.key, "get_mods"): self._wrap_state,
+            (pygame.mouse, "get_pos"): self._wrap_state,
+            (pygame.mouse, "get_pressed"): self._wrap_state,
+        }
+        for (module, name), wrap in targets.items():
+            original = getattr(module, name)
+            self._originals[(module, name)] = original
+            setattr(module, name, wrap(original))
+
+    # -----------------------------
+    # セッション
+    # -----------------------------
+    def begin_session(self, mode, rects, texts, categories, polygons):
+        self.model = (rects, texts, categories, polygons)
+        if not self.enabled:
+            return
+        surface = pygame.display.get_surface()
+        self._t0 = pygame.time.get_ticks()
+        self._last_state = None
+        self._current = {
+            "mode": mode,
+            "window": list(surface.get_size()) if surface else None,
+            "model": model_snapshot(rects, texts, categories, polygons),
+            "events": [],
+            "states": [],
+            "dialogs": [],
+        }
+
+    def end_session(self):
+        if self._current is None:
+            return
+        self._current["duration_ms"] = self._now()
+        self._current["checksum"] = model_checksum(model_snapshot(*self.model))
+        self.sessions.append(self._current)
+        self._current = None
+        self.save()
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": 2, "sessions": self.sessions}, f, ensure_ascii=False)  # 2: "dialogs" を追加
+        os.replace(tmp, self.path)
+        print("Input trace ->", self.path)
+
+    # -----------------------------
+    # 記録
+    # -----------------------------
+    def _now(self):
+        return pygame.time.get_ticks() - self._t0
+
+    def _log_event(self, event):
+        if self._current is not None and event.type in INPUT_EVENT_TYPES:
+            self._current["events"].append(encode_event(event, self._now()))
+
+    def _log_state(self):
+        if self._current is None:
+            return
+        originals = self._originals
+        pressed = originals[(pygame.key, "get_pressed")]()
+        state = (
+            [k for k in KEY_CODES if pressed[k]],
+            originals[(pygame.key, "get_mods")](),
+            list(originals[(pygame.mouse, "get_pos")]()),
+            list(originals[(pygame.mouse, "get_pressed")]()),
+        )
+        if state != self._last_state:
+            self._last_state = state
+            keys, mods, pos, buttons = state
+            self._current["states"].append({"t": self._now(), "keys": keys, "mods": mods, "pos": pos, "buttons": buttons})
+
+    def _log_dialog(self, name, result, args):
+        if self._current is None:
+            return
+        record = {"t": self._now(), "name": name}
+        if name in DIALOG_EDITS_ARG and args:
+            target = args[0]
+            record["state"] = [o.to_dict() for o in target] if isinstance(target, list) else target.to_dict()
+        else:
+            value = _plain(result)
+            record["result"] = None if value is _SKIP else value
+        self._current["dialogs"].append(record)
+
+    def _wrap_dialog(self, name, original):
+        def dialog(*args, **kwargs):
+            result = original(*args, **kwargs)
+            self._log_dialog(name, result, args)
+            return result
+        return dialog
+
+    def _wrap_events(self, original):
+        def get(*args, **kwargs):
+            events = original(*args, **kwargs)
+            for event in events:
+                self._log_event(event)
+            return events
+        return get
+
+    def _wrap_event(self, original):
+        def get_one(*args, **kwargs):
+            event = original(*args, **kwargs)
+            self._log_event(event)
+            return event
+        return get_one
+
+    def _wrap_state(self, original):
+        def poll(*args, **kwargs):
+            self._log_state()
+            return original(*args, **kwargs)
+        return poll
+
+
+# プロセス共通
+input_recorder = InputRecorder()
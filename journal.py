@@ -0,0 +1,361 @@
+import json
+import os
+import threading
+import time
+
+import config
+from save_service import _shared_record
+from tcbf_format import is_binary, TcbfReader
+
+
+SUFFIX = ".journal"
+
+# 1文字の種類名（行を短くする）
+KIND_KEYS = {"rects": "r", "texts": "t", "categories": "c", "polygons": "p"}
+KIND_NAMES = {v: k for k, v in KIND_KEYS.items()}
+
+
+def journal_path(json_path):
+    """マップ JSON の隣のジャーナル"""
+    return json_path + SUFFIX
+
+
+_SAVED_KEYS = {}  # クラス -> to_dict のキー（保存しない属性の変更は記録しない）
+
+
+def _saved_keys(obj):
+    keys = _SAVED_KEYS.get(type(obj))
+    if keys is None:
+        keys = _SAVED_KEYS[type(obj)] = frozenset(obj.to_dict())
+    return keys
+
+
+def _dumps(record):
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+
+
+# -----------------------------
+# 編集ジャーナル
+# -----------------------------
+class _KindObserver:
+    """ObjectList の observer。種類名をつけて EditJournal に渡す"""
+
+    def __init__(self, journal, kind):
+        self.journal = journal
+        self.kind = kind
+
+    def attach(self, objs):
+        self.journal._assign_ids(self.kind, objs)
+
+    def object_added(self, obj):
+        self.journal._added(self.kind, obj)
+
+    def object_removed(self, obj):
+        self.journal._removed(self.kind, obj)
+
+    def object_changed(self, obj, attr):
+        self.journal._changed(self.kind, obj, attr)
+
+    def objects_reordered(self, objs):
+        self.journal._reordered(self.kind)
+
+
+class EditJournal:
+    """
+    マップ JSON の隣（<json>.journal）に編集を1行ずつ追記する。
+    落ちても次の DataManager.load_all で JSON に続けて再生され、直前までの編集が戻る。
+
+    rects / texts  : ObjectList の observer で、追加・削除・属性の変更・並べ替え（sort）を記録
+                     （同じ属性の変更は flush までまとめて最新値だけ書く。ドラッグ中の移動など）
+    categories / polygons : 頂点をその場で書き換えるので、flush ごとにリスト全体を比べて変わったら記録
+
+    行は {"s": 連番, "op": ...}。オブジェクトはリスト内の番号（id）で指す。
+    "base" の行で id をその時点のリストの並びに振り直す（保存した JSON の並びと一致する）。
+
+    open(json_path, rects, texts, categories, polygons) : モード開始時
+    flush()             : 毎フレーム（JOURNAL_FLUSH_INTERVAL ごとに書く）
+    checkpoint()        : 保存の直前。スナップショットに入れる journal_seq を返す
+    saved(path, seq)    : 保存を書き終えたあと。seq までの行を消す（圧縮）
+    close(discard)      : モード終了時（保存しないで終えたときは discard=True で捨てる）
+    保存済みの JSON から変わっていなければ close でジャーナルを消す。
+    """
+
+    def __init__(self, interval=None):
+        self.interval = config.JOURNAL_FLUSH_INTERVAL if interval is None else interval
+        self.path = None
+        self.seq = 0
+        self._file = None
+        self._lock = threading.Lock()
+        self._lists = {}            # kind -> ObjectList（observer を外すため）
+        self._observers = {}
+        self._whole = {}            # kind -> リスト（categories / polygons）
+        self._whole_last = {}       # kind -> 前回書いた to_dict のリスト
+        self._ids = {}              # kind -> {id(obj): 番号}
+        self._next_id = {}
+        self._changes = {}          # (kind, 番号, attr) -> obj（flush までまとめる）
+        self._lines = []            # 書き込み待ちの行
+        self._last_flush = 0.0
+        self._dirty = False         # JSON 本体に無い編集がジャーナルにある
+
+        # 計測用
+        self.records = 0
+
+    @property
+    def active(self):
+        return self._file is not None
+
+    # -----------------------------
+    # セッション
+    # -----------------------------
+    def open(self, json_path, rects, texts, categories, polygons):
+        self.close()
+        path = journal_path(json_path)
+        with self._lock:
+            self.path = path
+            last_seq, saved_seq = self._last_seq(path), self._saved_seq(json_path)
+            self.seq = max(last_seq, saved_seq)
+            self._dirty = last_seq > saved_seq  # 前回落ちたときの編集を load_all で戻した
+            self._file = open(path, "a", encoding="utf-8")
+
+        self._whole = {"categories": categories, "polygons": polygons}
+        self._whole_last = {kind: [o.to_dict() for o in objs] for kind, objs in self._whole.items()}
+        for kind, objs in (("rects", rects), ("texts", texts)):
+            self._ids[kind] = {}
+            self._next_id[kind] = 0
+            if hasattr(objs, "add_observer"):
+                observer = _KindObserver(self, kind)
+                self._lists[kind] = objs
+                self._observers[kind] = observer
+                objs.add_observer(observer)
+            else:
+                self._assign_ids(kind, objs)
+        self._base()
+        self.flush(force=True)
+
+    def close(self, discard=False):
+        if not self.active:
+            return
+        self.flush(force=True)
+        for kind, objs in self._lists.items():
+            objs.remove_observer(self._observers[kind])
+        self._lists, self._observers = {}, {}
+        with self._lock:
+            self._file.close()
+            self._file = None
+            if (discard or not self._dirty) and os.path.exists(self.path):
+                os.remove(self.path)
+
+    @staticmethod
+    def _last_seq(path):
+        seq = 0
+        if os.path.exists(path):
+            for record in read_journal(path):
+                seq = max(seq, record["s"])
+        return seq
+
+    @staticmethod
+    def _saved_seq(json_path):
+        """JSON 本体の journal_seq（DataManager が最後のキーにするので末尾だけ読む）"""
+        if is_binary(json_path):
+            try:
+                with TcbfReader(json_path) as reader:
+                    return reader.meta["top"].get("journal_seq", 0)
+            except (OSError, ValueError):
+                return 0
+        try:
+            with open(json_path, "rb") as f:
+                f.seek(0, os.SEEK_END)
+                f.seek(max(0, f.tell() - 256))
+                tail = f.read().decode("utf-8", "ignore")
+        except OSError:
+            return 0
+        key = '"journal_seq":'
+        if key not in tail:
+            return 0
+        digits = tail.rsplit(key, 1)[1].strip().split(",")[0].split("}")[0].strip()
+        return int(digits) if digits.isdigit() else 0
+
+    # -----------------------------
+    # 記録
+    # -----------------------------
+    def _emit(self, record):
+        self.seq += 1
+        record["s"] = self.seq
+        self._lines.append(_dumps(record))
+        self.records += 1
+        if record["op"] != "base":
+            self._dirty = True
+
+    def _assign_ids(self, kind, objs):
+        ids = self._ids.setdefault(kind, {})
+        ids.clear()
+        for i, obj in enumerate(objs):
+            ids[id(obj)] = i
+        self._next_id[kind] = len(objs)
+
+    def _base(self):
+        """id を今の並びに振り直す（保存するスナップショットの並び）"""
+        for kind, objs in self._lists.items():
+            self._assign_ids(kind, objs)
+        self._emit({"op": "base"})
+
+    def _drain_changes(self):
+        for (kind, jid, attr), obj in self._changes.items():
+            self._emit({"op": "set", "k": KIND_KEYS[kind], "id": jid, "a": attr, "v": _shared_record(obj)[attr]})
+        self._changes.clear()
+
+    def _added(self, kind, obj):
+        self._drain_changes()
+        jid = self._next_id[kind]
+        self._next_id[kind] += 1
+        self._ids[kind][id(obj)] = jid
+        index = obj._owner.index(obj) if obj._owner is not None else -1
+        self._emit({"op": "add", "k": KIND_KEYS[kind], "id": jid, "i": index, "d": _shared_record(obj)})
+
+    def _removed(self, kind, obj):
+        jid = self._ids[kind].pop(id(obj), None)
+        if jid is None:
+            return
+        self._drain_changes()
+        self._emit({"op": "del", "k": KIND_KEYS[kind], "id": jid})
+
+    def _reordered(self, kind):
+        """並べ替えたあとの並びを id で記録（重なり順・保存順を再生で戻す）"""
+        ids = self._ids[kind]
+        order = [ids[id(obj)] for obj in self._lists[kind] if id(obj) in ids]
+        self._drain_changes()
+        self._emit({"op": "order", "k": KIND_KEYS[kind], "ids": order})
+
+    def _changed(self, kind, obj, attr):
+        jid = self._ids[kind].get(id(obj))
+        if jid is not None and attr in _saved_keys(obj):
+            self._changes[(kind, jid, attr)] = obj
+
+    def _diff_whole(self):
+        for kind, objs in self._whole.items():
+            current = [o.to_dict() for o in objs]
+            if current != self._whole_last[kind]:
+                self._whole_last[kind] = current
+                self._emit({"op": "all", "k": KIND_KEYS[kind], "d": current})
+
+    def flush(self, force=False):
+        if not self.active:
+            return
+        now = time.perf_counter()
+        if not force and now - self._last_flush < self.interval:
+            return
+        self._last_flush = now
+        self._drain_changes()
+        self._diff_whole()
+        if not self._lines:
+            return
+        with self._lock:
+            self._file.write("\n".join(self._lines) + "\n")
+            self._file.flush()
+        self._lines = []
+
+    # -----------------------------
+    # 保存との連携
+    # -----------------------------
+    def checkpoint(self):
+        """保存するスナップショットに入れる journal_seq（ジャーナルを開いていなければ None）"""
+        if not self.active:
+            return None
+        self.flush(force=True)
+        self._base()
+        self.flush(force=True)
+        return self.seq
+
+    def saved(self, json_path, seq):
+        """
+        json_path に seq までを保存し終えた（ワーカースレッドから呼ばれる）。
+        seq より後の行だけ残す。別名で保存したときはジャーナルもそちらへ移す
+        """
+        if seq is None or self.path is None:
+            return
+        target = journal_path(json_path)
+        with self._lock:
+            source = self.path
+            if not os.path.exists(source):
+                return
+            records = [r for r in read_journal(source) if r["s"] > seq]
+            is_open = self._file is not None
+            if is_open:
+                self._file.close()
+            tmp = target + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write("".join(_dumps(r) + "\n" for r in records))
+            os.replace(tmp, target)
+            if source != target:
+                os.remove(source)
+                self.path = target
+            self._dirty = any(r["op"] != "base" for r in records) or bool(self._changes)
+            if is_open:
+                self._file = open(target, "a", encoding="utf-8")
+            elif not self._dirty:
+                os.remove(target)  # 閉じたあとで残りが無ければ消す
+
+
+# -----------------------------
+# 再生
+# -----------------------------
+def read_journal(path):
+    """壊れた行（書き込み途中で落ちた最後の行など）は読み飛ばす"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict) and "s" in record and "op" in record:
+                yield record
+
+
+def apply_journal(path, model, after_seq, classes):
+    """
+    model（{"rects": [...], ...}）に after_seq より後の行を順に適用する。
+    classes は {"rects": RotatingRect, ...}（from_dict で作る）。適用した編集の数を返す
+    """
+    ids = {kind: list(range(len(model[kind]))) for kind in ("rects", "texts")}  # リストと同じ並びの番号
+    applied = 0
+    for record in read_journal(path):
+        if record["s"] <= after_seq:
+            continue
+        op = record["op"]
+        kind = KIND_NAMES.get(record.get("k"))
+        if op == "base":
+            for k in ids:
+                ids[k] = list(range(len(model[k])))
+            continue
+        if op == "all" and kind in ("categories", "polygons"):
+            model[kind] = [classes[kind].from_dict(d) for d in record["d"]]
+        elif kind in ids:
+            objs, order = model[kind], ids[kind]
+            if op == "add":
+                index = record["i"] if 0 <= record["i"] <= len(objs) else len(objs)
+                objs.insert(index, classes[kind].from_dict(record["d"]))
+                order.insert(index, record["id"])
+            elif op == "order":
+                position = {jid: i for i, jid in enumerate(order)}
+                moved = [position[jid] for jid in record["ids"] if jid in position]
+                moved += sorted(set(range(len(objs))) - set(moved))  # 記録に無いもの（念のため）は後ろへ
+                objs[:] = [objs[i] for i in moved]
+                order[:] = [order[i] for i in moved]
+            elif record["id"] in order:
+                index = order.index(record["id"])
+                if op == "del":
+                    del objs[index]
+                    del order[index]
+                elif op == "set":
+                    value = getattr(classes[kind].from_dict({record["a"]: record["v"]}), record["a"])
+                    setattr(objs[index], record["a"], value)
+            else:
+                continue
+        else:
+            continue
+        applied += 1
+    return applied
+
+
+# プロセス共通
+edit_journal = EditJournal()
@@ -0,0 +1,53 @@
+import config
+
+
+# -----------------------------
+# ブース文字の詳細度（LOD）
+# -----------------------------
+class LabelLod:
+    """
+    画面上の実際の大きさ（内部座標の大きさ x scale）から、ブースに描く文字を決める。
+        FULL   : No と名前ブロック
+        NUMBER : No だけ
+        BOX    : 色付きの四角（と枠）だけ
+
+    scale はズーム倍率 x ウィンドウへの縮小率。判定は (No のフォントサイズ, 名前のフォントサイズ)
+    ごとにキャッシュし、scale が変わったときだけ判定し直す。
+    判定が1つでも変わったら revision が進む（静的レイヤーの描き直し用）。
+    """
+
+    BOX, NUMBER, FULL = 0, 1, 2
+
+    def __init__(self, name_min_px=None, number_min_px=None):
+        self.name_min_px = config.LOD_NAME_MIN_PX if name_min_px is None else name_min_px
+        self.number_min_px = config.LOD_NUMBER_MIN_PX if number_min_px is None else number_min_px
+        self.scale = 1.0
+        self.revision = 0
+        self._tiers = {}  # (No のフォントサイズ, 名前のフォントサイズ) -> tier
+
+    def _decide(self, number_size, name_size):
+        if name_size * self.scale >= self.name_min_px:
+            return self.FULL
+        if number_size * self.scale >= self.number_min_px:
+            return self.NUMBER
+        return self.BOX
+
+    def set_scale(self, scale):
+        """表示倍率を更新（判定が変わったら True）"""
+        if scale == self.scale:
+            return False
+        self.scale = scale
+        old = self._tiers
+        self._tiers = {key: self._decide(*key) for key in old}
+        if self._tiers == old:
+            return False
+        self.revision += 1
+        return True
+
+    def tier(self, rect):
+        """RotatingRect に描く詳細度"""
+        key = (int(rect.size[1] * 0.75), rect.font_size)
+        tier = self._tiers.get(key)
+        if tier is None:
+            tier = self._tiers[key] = self._decide(*key)
+        return tier
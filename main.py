@@ -1,17 +1,35 @@
 import os
+import argparse
 import pygame
-from config import font_path
+import config
+from fonts import fonts
 from mode_select import select_mode
+import map_mode
 from map_mode import run_map_mode
 from objects import RotatingRect, TextLabel, CategoryShape
 from utils import select_background_file, save_bg_path
+import category_mode
 from category_mode import run_category_editor
 from objects import DataManager
+from tracing import tracer
+from input_trace import input_recorder
+from journal import edit_journal
 
 # -----------------------------
 # メイン関数
 # -----------------------------
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trace", metavar="PATH", default=config.TRACE_FILE,
+                        help="フレームの段階・保存/読込・ダイアログの区間を Trace Event Format の JSON に書き出す")
+    parser.add_argument("--record", metavar="PATH", default=config.RECORD_INPUT_FILE,
+                        help="マップ表示・カテゴリ編集中の入力を JSON に記録する（python -m bench.replay で再生）")
+    args, _ = parser.parse_known_args()
+    if args.trace:
+        tracer.start(args.trace, capacity=config.TRACE_BUFFER_EVENTS)
+    if args.record:
+        input_recorder.start(args.record, dialog_modules=(map_mode, category_mode))  # ダイアログの結果も記録
+
     # 🟩 ウィンドウ位置を中央に配置
     os.environ['SDL_VIDEO_CENTERED'] = '1'
 
@@ -23,10 +41,7 @@ def main():
     SCREEN_W, SCREEN_H = 1280, 720
     screen = pygame.display.set_mode((SCREEN_W, SCREEN_H), pygame.RESIZABLE)
 
-    try:
-        font = pygame.font.Font(font_path, 20)
-    except Exception:
-        font = pygame.font.SysFont(None, 20)
+    font = fonts.get(20)  # 読めなければ既定フォント
 
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
@@ -51,7 +66,7 @@ def main():
                 SCREEN_W, SCREEN_H = event.w, event.h
                 screen = pygame.display.set_mode((SCREEN_W, SCREEN_H), pygame.RESIZABLE)
 
-        mode, rects, texts, categories, polygons, filename, full_path = select_mode(screen, font)
+        mode, rects, texts, categories, polygons, filename, full_path, loader = select_mode(screen, font)
         if mode is None:
             # モード選択画面で終了
             # CategoryShape.save_categories(categories)
@@ -64,7 +79,9 @@ def main():
 
         if mode == "map":
             # rects, texts, categories, filename, full_path = DataManager.load_all()
-            res = run_map_mode(screen, font, rects, texts, categories, polygons, filename)
+            res = run_map_mode(screen, font, rects, texts, categories, polygons, filename, full_path, loader)
+            input_recorder.end_session()
+            edit_journal.close()
             if res is None:
                 # running = False
                 break
@@ -73,7 +90,9 @@ def main():
                 continue
         elif mode == "edit":
             # rects, texts, categories, filename, full_path = DataManager.load_all()
-            res = run_category_editor(screen, font, rects, texts, categories, polygons, filename)
+            res = run_category_editor(screen, font, rects, texts, categories, polygons, filename, full_path)
+            input_recorder.end_session()
+            edit_journal.close()
             if res is None:
                 # running = False
                 break
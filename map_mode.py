@@ -1,45 +1,112 @@
+import time
 import pygame
 import tkinter as tk
 import config
 from config import (
     font_path, SCREEN_W, SCREEN_H, DRAW_W, DRAW_H, MENU_ITEMS_ADD_SHAPE
     )
+from redraw import RedrawScheduler
+from spatial_index import SpatialGrid
+from category_index import CategoryIndex
+from power_aggregator import PowerAggregator
+from compositor import SceneCompositor
+from damage import DamageTracker, DamageSurface, letterbox
+from camera import Camera
+from lod import LabelLod
+from fonts import fonts
+from text_cache import text_surfaces
+from frame_timing import frame_timer
+from frame_watchdog import frame_watchdog
+from input_trace import input_recorder
+from save_service import save_service, SaveService, SAVE_DONE
+from journal import edit_journal
+from progressive_load import draw_load_progress
+from rect_store import rect_store
 from objects import (
-    PolygonShape, ContextMenu, RotatingRect, TextLabel, DataManager, 
+    PolygonShape, ContextMenu, RotatingRect, TextLabel, DataManager, ObjectList,
     add_rect, add_polygon, add_text
     )
 from object_editor import confirm_quit ,edit_object_window, edit_all_objects_window, show_power_table_with_category, edit_polygon_window
 from utils import (
     point_in_category, save_as_png, draw_background, load_and_resize_bg, drag_object, rotate_angle, 
     delete_object, undo_delete_object, categories_name_containing_rect, handle_key_movement, move_active_rects, load_bg_path,
-    categories_power_list, count_total_by_classification, drag_category_or_polygon, screen_to_internal, convert_mouse_to_draw_coords,
+    categories_power_list, drag_category_or_polygon, screen_to_internal, convert_mouse_to_draw_coords,
     handle_category_movement, handle_vertex_movement, get_active_point_index, drag_vertex
     )
 
 # -----------------------------
 # マップ表示モード
 # -----------------------------
-def run_map_mode(screen, font, rects, texts, categories, polygons, filename):
-    """マップ表示用モード"""
+def run_map_mode(screen, font, rects, texts, categories, polygons, filename, full_path=None, loader=None):
+    """
+    マップ表示用モード
+    loader（IncrementalLoad）を渡すと空のリストで始め、届いたオブジェクトをフレームごとに足す
+    """
     DRAW_W, DRAW_H = 1920, 1080  # 内部描画解像度（固定）
-    draw_surface = pygame.Surface((DRAW_W, DRAW_H))  # 内部用Surface
+    native = config.NATIVE_RESOLUTION  # 縮小せずウィンドウの表示サイズに直接描く
+    draw_size = letterbox(screen.get_size(), (DRAW_W, DRAW_H))[:2] if native else (DRAW_W, DRAW_H)
+    damage = DamageTracker(draw_size)  # 汚れた範囲だけ縮小して画面へ
+    draw_surface = DamageSurface(draw_size, damage)  # 内部用Surface（描画範囲を記録）
     pygame.display.set_caption(f"{filename}")
-    clock = pygame.time.Clock()
-    if not rects:
-        # 初期サンプル
-        rects = [
-            RotatingRect(name="testA", center=(320,180), size=(25,25)),
-            RotatingRect(name="testB", center=(420,240), size=(25,25), color=(120,180,220)),
-        ]
-    if not texts:
-        texts = [
-            TextLabel(text="タイトル（削除不可）", position=(10,20), font_size=20, color=(0,0,0), angle=0, locked=True),
-        ]
+    redraw = RedrawScheduler()  # 変化があったときだけ描画（config.CONTINUOUS_REDRAW で毎フレーム）
+    camera = Camera((DRAW_W, DRAW_H))  # ズーム・パン（ホイール / 中ボタンドラッグ / Home）
+    scene_surface = None  # ズーム中にワールド座標で描く Surface
+    drawn_camera_revision = camera.revision
+    panning = False
+    label_lod = LabelLod()  # 縮小表示で読めないブース文字は省く（config.LOD_*_MIN_PX）
+
+    def add_samples(rects, texts):
+        """空のマップに置く初期サンプル"""
+        if not rects:
+            rects.extend([
+                RotatingRect(name="testA", center=(320,180), size=(25,25)),
+                RotatingRect(name="testB", center=(420,240), size=(25,25), color=(120,180,220)),
+            ])
+        if not texts:
+            texts.extend([
+                TextLabel(text="タイトル（削除不可）", position=(10,20), font_size=20, color=(0,0,0), angle=0, locked=True),
+            ])
+
+    if loader is None:
+        rects, texts = list(rects), list(texts)
+        add_samples(rects, texts)
     if not categories:
         categories = []
     if not polygons:
         polygons = []
 
+    # 変更通知つきリストにして、当たり判定用の空間インデックスを追従させる
+    rects = ObjectList(rects)
+    texts = ObjectList(texts)
+    polygons = ObjectList(polygons)
+    rect_index = SpatialGrid(bulk_bounds=rect_store.bounds)
+    text_index = SpatialGrid(bounds=lambda t: t.get_bounds(font_path))
+    polygon_index = SpatialGrid()
+    rects.add_observer(rect_index)
+    texts.add_observer(text_index)
+    polygons.add_observer(polygon_index)
+    input_recorder.begin_session("map", rects, texts, categories, polygons)  # 入力の記録（--record）
+    if config.EDIT_JOURNAL and full_path and loader is None:
+        edit_journal.open(full_path, rects, texts, categories, polygons)  # 編集ジャーナル（落ちたときの復元用）
+
+    # 使うフォントサイズを先に読み込む（HUD・No・名前・テキスト）
+    fonts.preload(
+        {15, 20}
+        | {r.font_size for r in rects}
+        | {int(r.size[1] * 0.75) for r in rects}
+        | {t.font_size for t in texts}
+    )
+
+    # カテゴリ所属判定の表引き（カテゴリが変わったときだけ作り直す）
+    category_index = CategoryIndex()
+    category_index.sync(categories)
+    in_category = category_index.point_in_category
+
+    # 電力合計は追加・削除・移動・power変更の差分だけ集計
+    power_aggregator = PowerAggregator(in_category)
+    power_aggregator.sync_categories(categories)
+    rects.add_observer(power_aggregator)
+
     active = None
     active_rects = []
     active_true = False
@@ -56,13 +123,14 @@ def run_map_mode(screen, font, rects, texts, categories, polygons, filename):
     ime_warned_message_until = 0 #日本語入力時警告
     export_message_until = 0 # 保存メッセージ表示終了時間
     save_message_until = 0 # 保存メッセージ表示終了時間
+    save_message = "" # 保存メッセージ（保存が終わったときの SAVE_DONE で決まる）
     clicked = False # クリックフラグ
     context_menu = None # コンテキストメニュー(右クリック)
     hit_rect = False
     tent_highlight = False
     show_menu = False
     prev_keys = pygame.key.get_pressed()
-    font_small = pygame.font.Font(font_path, 15)
+    font_small = fonts.get(15)
 
     bg_image_path = load_bg_path()
     bg_image = load_and_resize_bg(bg_image_path) if bg_image_path else None
@@ -70,14 +138,17 @@ def run_map_mode(screen, font, rects, texts, categories, polygons, filename):
     edit_object_window_results = None
 
 
-    # shapes cache
-    shape_layer = pygame.Surface((DRAW_W, DRAW_H), pygame.SRCALPHA)
+    # ネイティブ解像度描画の変換（表示サイズ・表示範囲が変わったらレイヤーごと作り直す）
+    layer_xf = None
 
     # 背景静的表示
     background_layer = pygame.Surface((SCREEN_W, SCREEN_H), pygame.SRCALPHA)
     def redraw_background_layer():
         background_layer.fill((0,0,0,0))
-        if bg_image:
+        if bg_image and layer_xf is not None:
+            view_bg = bg_image.subsurface(camera.view_rect().clip(bg_image.get_rect()))
+            background_layer.blit(pygame.transform.smoothscale(view_bg, background_layer.get_size()), (0, 0))
+        elif bg_image:
             background_layer.blit(bg_image, (0, 0))
         else:
             background_layer.fill((250,250,255))
@@ -94,100 +165,184 @@ def run_map_mode(screen, font, rects, texts, categories, polygons, filename):
             cat.draw_category(
                 category_layer, font,
                 active=False, active_vertex=None,
-                show_names=False, show_vertices=False
+                show_names=False, show_vertices=False,
+                xf=layer_xf
             )
 
     # レイヤー設定
     redraw_background_layer()
     redraw_category_layer()
 
+    # 静的/動的レイヤー合成（オブジェクト変更は差分範囲だけ静的レイヤーを描き直す）
+    compositor = SceneCompositor(
+        (DRAW_W, DRAW_H), rects, polygons, texts, font, font_path,
+        background_layer, category_layer
+    )
+
     ACTION_HANDLERS = {
         "add_rect": add_rect,
         "add_polygon": add_polygon,
         # "add_circle": add_circle,
     }
 
-    # テキストレンダリングキャッシュ
-    text_cache = {}
-    MAX_CACHE_SIZE = 200
+    # 段階的な読み込み（loader があるあいだ、届いたオブジェクトを予算内で足す）
+    next_load_redraw = 0.0  # 次に足した分を描く時刻（perf_counter）
+    def hydrate(budget=None):
+        """
+        届いた分を足す（budget 秒を超えたら次のフレームへ。None なら読み終わるまで待って全部）
+        足した分は LOAD_REDRAW_INTERVAL ごとにまとめて描く（描くたびに全 rect の ALERT 判定などが掛かるので）
+        読み終わったら初期サンプル・編集ジャーナルを読み込み済みのときと同じ状態にする
+        読めなかったら False
+        """
+        nonlocal loader, next_load_redraw
+        start = time.perf_counter()
+        redraw.busy = True
+        for kind, objs in loader.chunks(wait=budget):
+            if kind == "categories":
+                categories.extend(objs)
+                redraw_category_layer()
+                compositor.invalidate()  # カテゴリは静的レイヤーに焼き込んでいる
+            else:
+                {"rects": rects, "texts": texts, "polygons": polygons}[kind].extend(objs)
+                if kind != "polygons":
+                    fonts.preload({o.font_size for o in objs} | {int(o.size[1] * 0.75) for o in objs if kind == "rects"})
+            if budget is not None and time.perf_counter() - start > budget:
+                break
+        if loader.done:
+            if loader.error:
+                return False  # 途中までの内容を編集・保存させない
+            print(f"Hydrated {loader.loaded} objects in {loader.elapsed:.2f}s")
+            loader = None
+            redraw.busy = False
+            add_samples(rects, texts)
+            if config.EDIT_JOURNAL and full_path:
+                edit_journal.open(full_path, rects, texts, categories, polygons)
+            redraw.request()
+        elif start >= next_load_redraw:
+            next_load_redraw = start + config.LOAD_REDRAW_INTERVAL
+            redraw.request()
+        return True
+
+    def finish_loading():
+        """
+        保存・書き出しの前に残りを全部読む（途中までの内容を保存しない）
+        読めなかったら False（呼び出し側は保存しない）
+        """
+        return loader is None or hydrate()
+
+    def draw_screen_overlay(s):
+        """画面座標で描くもの（描いた範囲を返す）"""
+        drawn = []
+        if context_menu:
+            drawn.extend(context_menu.draw(s, font_small) or [])
+        drawn.extend(frame_timer.draw(s, font_small))
+        return drawn
+
+    # 予算を超えたフレームを記録（config.FRAME_WATCHDOG）
+    if config.FRAME_WATCHDOG:
+        frame_watchdog.watch("map", lambda: {
+            "rects": len(rects), "texts": len(texts),
+            "polygons": len(polygons), "categories": len(categories),
+        })
 
     running = True
     while running:
+        # 描画が不要ならイベント or 表示期限まで待機
+        render_frame = redraw.begin_frame(pygame.time.get_ticks() / 1000.0)
+        frame_timer.begin_frame()  # 段階ごとの処理時間（F3 で表示）
+
+        # 読み込み中は届いたオブジェクトを足してから描く（操作はそのまま受け付ける）
+        if loader is not None:
+            if not hydrate(config.LOAD_FRAME_BUDGET_MS / 1000):
+                return "back_to_mode_select"
+            frame_timer.lap("hydrate")
         now = pygame.time.get_ticks() / 1000.0
 
-        # ALERT表示（フレームごとに計算）
-        alert_category_names = []
-        alert_cats = [c for c in categories if c.alert]
-        for r in rects:
-            alert_category_names.extend(categories_name_containing_rect(r.center, alert_cats))
-        show_alert = len(alert_category_names) > 0
-        show_alert_text = ", ".join(alert_category_names) if alert_category_names else ""
-
-        # 背景とカテゴリをまず描画
-        draw_surface.blit(background_layer, (0,0))
-        draw_surface.blit(shape_layer, (0,0))
-
-        if show_category:
-            draw_surface.blit(category_layer, (0,0))
-
-        # 四角形描画
-        dirty = []
-        
-        # すべての rect の dirty を消す
-        for obj in rects:
-            for r in obj.prev_dirty:
-                draw_surface.blit(background_layer, r, r)
-                draw_surface.blit(shape_layer, r, r)
-                if show_category:
-                    draw_surface.blit(category_layer, r, r)
-                dirty.append(r)
-
-        # rect を新しく描画
-        for obj in rects:
-            is_active = (obj == active) or (obj in active_rects)
-            new_dirty = obj.draw_rects(draw_surface, font, is_active=is_active, name_pos_active=obj.name_pos_active, tent_highlight=tent_highlight)
-            dirty.extend(new_dirty)
-            obj.prev_dirty = new_dirty
-
-        
-        # Polygon 描画
-        for poly in polygons:
-            is_active = (poly == active)
-            new_dirty = poly.draw_polygon(
-                draw_surface,
-                is_active=is_active,
-                selected_vertex=selected_vertex,
+        if render_frame:
+            # ALERT表示（alert カテゴリに入っている rect は power_aggregator が差分で持つ）
+            category_index.sync(categories)
+            power_aggregator.sync_categories(categories)
+            alert_category_names = power_aggregator.alert_names(rects)
+            show_alert = len(alert_category_names) > 0
+            show_alert_text = ", ".join(alert_category_names) if alert_category_names else ""
+            frame_timer.lap("alert")
+
+            # 背景・カテゴリ・非アクティブな rect/polygon/text は静的レイヤーから写し、
+            # active・複数選択・ドラッグ中のものだけ毎フレーム描く
+            # ズーム中は表示範囲に掛かるものだけ描き直し、表示範囲を拡大して写す
+            # ネイティブ解像度では表示範囲をそのまま表示サイズのピクセルに描く
+            if native:
+                size = letterbox(screen.get_size(), (DRAW_W, DRAW_H))[:2]
+                if size != draw_surface.get_size():
+                    damage = DamageTracker(size)
+                    draw_surface = DamageSurface(size, damage)
+                xf = camera.pixel_transform(size)
+                if layer_xf is None or xf.key() != layer_xf.key() or size != background_layer.get_size():
+                    layer_xf = xf
+                    background_layer = pygame.Surface(size, pygame.SRCALPHA)
+                    category_layer = pygame.Surface(size, pygame.SRCALPHA)
+                    redraw_background_layer()
+                    redraw_category_layer()
+                    compositor.background_layer = background_layer
+                    compositor.category_layer = category_layer
+                    compositor.set_transform(layer_xf, size)
+            restore = damage.begin_frame()  # 前フレームに上描きした範囲
+            view = None if native or camera.is_identity else camera.view_rect()
+            label_lod.set_scale(camera.zoom * letterbox(screen.get_size(), (DRAW_W, DRAW_H))[0] / DRAW_W)
+            repainted = compositor.update(
+                show_category=show_category,
+                tent_highlight=tent_highlight,
+                active=active,
+                active_rects=active_rects,
+                view=view,
+                lod=label_lod,
             )
-            dirty.extend(new_dirty)
-            poly.prev_dirty = new_dirty
-
-
-        # 画面に反映
-        pygame.display.update(dirty)
-
-        ### 確認用 ###
-        # if isinstance(active, PolygonShape):
-        #     draw_surface.blit(font_small.render(f"active.dragging:, {active.dragging_vertex}", True, (0,0,0)), (10, 300))
-        # draw_surface.blit(font_small.render(f"active:, {active}", True, (0,0,0)), (10, 320))
-        # draw_surface.blit(font_small.render(f"selected_vertex:, {selected_vertex}", True, (0,0,0)), (10, 340))
-
-        # テキスト描画
-        for t in texts:
-            t.draw_texts(draw_surface, font_path, active=(t is active))
-
-        # --- 保存メッセージ表示 ---
-        if now < save_message_until:
-            cache_key = ("save_msg", round(now, 1))
-            if cache_key not in text_cache:
-                text_cache[cache_key] = font.render("Saved all objects.", True, (0, 0, 0))
-            msg_surf = text_cache[cache_key]
-            draw_surface.blit(msg_surf, (DRAW_W - msg_surf.get_width() - 10, 10))
-        if now < export_message_until:
-            cache_key = ("export_msg", round(now, 1))
-            if cache_key not in text_cache:
-                text_cache[cache_key] = font.render("CSV has been exported.", True, (0, 0, 0))
-            msg_surf = text_cache[cache_key]
-            draw_surface.blit(msg_surf, (DRAW_W - msg_surf.get_width() - 10, 10))
+            if camera.revision != drawn_camera_revision:
+                repainted = None  # 表示範囲が変わったら全体を写し直す
+                drawn_camera_revision = camera.revision
+
+            if view is None:
+                with damage.base():
+                    compositor.restore(draw_surface, None if repainted is None else restore + repainted)
+                damage.add_all(compositor.draw_dynamic(
+                    draw_surface,
+                    active=active,
+                    selected_vertex=selected_vertex,
+                    tent_highlight=tent_highlight,
+                    lod=label_lod,
+                ))
+            else:
+                if scene_surface is None:
+                    scene_surface = pygame.Surface((DRAW_W, DRAW_H))
+                compositor.restore(scene_surface, [view])
+                compositor.draw_dynamic(
+                    scene_surface,
+                    active=active,
+                    selected_vertex=selected_vertex,
+                    tent_highlight=tent_highlight,
+                    lod=label_lod,
+                )
+                with damage.base():
+                    camera.render(scene_surface, draw_surface)
+            frame_timer.lap("compose")
+
+            ### 確認用 ###
+            # if isinstance(active, PolygonShape):
+            #     draw_surface.blit(font_small.render(f"active.dragging:, {active.dragging_vertex}", True, (0,0,0)), (10, 300))
+            # draw_surface.blit(font_small.render(f"active:, {active}", True, (0,0,0)), (10, 320))
+            # draw_surface.blit(font_small.render(f"selected_vertex:, {selected_vertex}", True, (0,0,0)), (10, 340))
+
+            # --- 保存メッセージ表示 ---
+            if now < save_message_until:
+                msg_surf = text_surfaces.render(font, save_message, True, (0, 0, 0))
+                draw_surface.blit(msg_surf, (draw_surface.get_width() - msg_surf.get_width() - 10, 10))
+            if now < export_message_until:
+                msg_surf = text_surfaces.render(font, "CSV has been exported.", True, (0, 0, 0))
+                draw_surface.blit(msg_surf, (draw_surface.get_width() - msg_surf.get_width() - 10, 10))
+
+            # --- 読み込みの進み具合 ---
+            if loader is not None:
+                draw_load_progress(draw_surface, font_small, loader)
 
         # イベント処理
         keys = pygame.key.get_pressed()
@@ -221,6 +376,7 @@ def run_map_mode(screen, font, rects, texts, categories, polygons, filename):
                         x, y, now, last_move_time, move_delay,
                         keys, prev_keys, ctrl, shift, step=5, w=SCREEN_W, h=SCREEN_H)
                     polygons[int(pi)].points[vi] = (new_x, new_y)
+                    polygons[int(pi)].mark_dirty("points")
 
                 else:
                     pi = polygons.index(active)
@@ -231,17 +387,21 @@ def run_map_mode(screen, font, rects, texts, categories, polygons, filename):
         elif active_rects:
             last_move_time = move_active_rects(active, active_rects,now, last_move_time, move_delay, keys, prev_keys, ctrl, shift, SCREEN_W, SCREEN_H)
 
+        if active or active_rects:
+            redraw.keep_alive(keys)
         prev_keys = keys
+        frame_timer.lap("input")
 
         # category表示制御
         if not show_category and now > hide_until:
             show_category = True
             need_redraw = True
+            redraw.request()
 
         #操作説明表示制御
         hide_texts = now < hide_until
         hide = True
-        if hide_texts:
+        if hide_texts or not render_frame:
             None
         elif not hide_texts:
 
@@ -263,6 +423,9 @@ def run_map_mode(screen, font, rects, texts, categories, polygons, filename):
                     "Ctrl+P: pngとして保存",
                     "Ctrl+E: csvとしてエクスポート",
                     "Ctrl+H: 操作説明非表示5秒間",
+                    "ホイール / 中ボタンドラッグ: ズーム / 表示移動",
+                    "Home: 表示リセット",
+                    "F3: 処理時間表示",
                 ]
 
             elif isinstance(active, RotatingRect):
@@ -323,46 +486,43 @@ def run_map_mode(screen, font, rects, texts, categories, polygons, filename):
 
             # ALERT描画
             if show_alert:
-                cache_key = ("alert", show_alert_text)
-                if cache_key not in text_cache:
-                    text_cache[cache_key] = pygame.font.Font(font_path, 20).render(f"注意: {show_alert_text}", True, (255, 0, 0))
-                alert_text = text_cache[cache_key]
+                alert_text = text_surfaces.render(fonts.get(20), f"注意: {show_alert_text}", True, (255, 0, 0))
                 w, h = draw_surface.get_size()
                 draw_surface.blit(alert_text, (w - alert_text.get_width() - 10, h - alert_text.get_height() - 10))
 
 
             # --- 描画（左下配置） ---
-            y_offset = DRAW_H - 20 * len(instructions) - 10  # 下端から上にずらす
+            y_offset = draw_surface.get_height() - 20 * len(instructions) - 10  # 下端から上にずらす
             x_offset = 10  # 左端から10px
             for i, line in enumerate(instructions):
-                text_surf = font_small.render(line, True, (0, 0, 0))
+                text_surf = text_surfaces.render(font_small, line, True, (0, 0, 0))
                 draw_surface.blit(text_surf, (x_offset, y_offset + i * 20))
 
             # --- アクティブオブジェクト情報表示 ---
             if isinstance(active, RotatingRect): #単一選択
-                draw_surface.blit(font_small.render(f"no: {active.no}", True, (0,0,0)), (10, 50)) #1行目
+                draw_surface.blit(text_surfaces.render(font_small, f"no: {active.no}", True, (0,0,0)), (10, 50)) #1行目
                 info_name = active.name.replace("\\n","").replace("\n","")
-                draw_surface.blit(font_small.render(f"name: {info_name}", True, (0,0,0)), (10, 70)) #2行目以降
-                draw_surface.blit(font_small.render(f"area:", True, (0,0,0)), (10, 90))
-                draw_surface.blit(font_small.render(f"classification: {active.classification if active else ''}", True, (0,0,0)), (10, 110))
-                draw_surface.blit(font_small.render(f"power [W]: {active.power if active else ''}", True, (0,0,0)), (10, 130))
-                draw_surface.blit(font_small.render(f"rect_size: {active.size if active else ''}", True, (0,0,0)), (10, 150))
-                draw_surface.blit(font_small.render(f"angle: {active.angle if active else ''}", True, (0,0,0)), (10, 170))
-                draw_surface.blit(font_small.render(f"font_size: {active.font_size if active else ''}", True, (0,0,0)), (10, 190))
-                draw_surface.blit(font_small.render(f"name_angle: {active.name_angle if active else ''}", True, (0,0,0)), (10, 210))
-                draw_surface.blit(font_small.render(f"rect_position: {active.center if active else ''}", True, (0,0,0)), (10, 230))
+                draw_surface.blit(text_surfaces.render(font_small, f"name: {info_name}", True, (0,0,0)), (10, 70)) #2行目以降
+                draw_surface.blit(text_surfaces.render(font_small, f"area:", True, (0,0,0)), (10, 90))
+                draw_surface.blit(text_surfaces.render(font_small, f"classification: {active.classification if active else ''}", True, (0,0,0)), (10, 110))
+                draw_surface.blit(text_surfaces.render(font_small, f"power [W]: {active.power if active else ''}", True, (0,0,0)), (10, 130))
+                draw_surface.blit(text_surfaces.render(font_small, f"rect_size: {active.size if active else ''}", True, (0,0,0)), (10, 150))
+                draw_surface.blit(text_surfaces.render(font_small, f"angle: {active.angle if active else ''}", True, (0,0,0)), (10, 170))
+                draw_surface.blit(text_surfaces.render(font_small, f"font_size: {active.font_size if active else ''}", True, (0,0,0)), (10, 190))
+                draw_surface.blit(text_surfaces.render(font_small, f"name_angle: {active.name_angle if active else ''}", True, (0,0,0)), (10, 210))
+                draw_surface.blit(text_surfaces.render(font_small, f"rect_position: {active.center if active else ''}", True, (0,0,0)), (10, 230))
                 name_pos_0 = active.name_pos[0] + active.center[0]
                 name_pos_1 = active.name_pos[1] + active.center[1]
                 name_pos = (name_pos_0, name_pos_1)
-                draw_surface.blit(font_small.render(f"name_position: {name_pos if active else ''}", True, (0,0,0)), (10, 250))
+                draw_surface.blit(text_surfaces.render(font_small, f"name_position: {name_pos if active else ''}", True, (0,0,0)), (10, 250))
 
                 if active:
-                    categories_name_list = categories_name_containing_rect(active.center, categories)
+                    categories_name_list = categories_name_containing_rect(active.center, categories, in_category)
                     if categories_name_list:
                         category_names = ", ".join(map(str, sorted(set(categories_name_list))))
                     else:
                         category_names = "None"
-                    text_surface = font_small.render(category_names, True, (0, 0, 0))
+                    text_surface = text_surfaces.render(font_small, category_names, True, (0, 0, 0))
                     draw_surface.blit(text_surface, (55, 90))
 
             elif active_rects: #複数選択
@@ -375,36 +535,36 @@ def run_map_mode(screen, font, rects, texts, categories, polygons, filename):
                 rect_sizes = ", ".join(sorted(f"{size}"for size in {r.size for r in active_rects}))
                 font_sizes = ", ".join(sorted({str(r.font_size) for r in active_rects}))
 
-                draw_surface.blit(font_small.render(f"no: {ids}", True, (0,0,0)), (10, 50)) #1行目
-                draw_surface.blit(font_small.render(f"name: {names}", True, (0,0,0)), (10, 70)) #2行目以降
-                draw_surface.blit(font_small.render(f"area: ", True, (0,0,0)), (10, 90))
-                draw_surface.blit(font_small.render(f"classification: {classes}", True, (0,0,0)), (10, 110))
-                draw_surface.blit(font_small.render(f"power [W]: {powers}", True, (0,0,0)), (10, 130))
-                draw_surface.blit(font_small.render(f"rect_size: {rect_sizes}", True, (0,0,0)), (10, 150))
-                draw_surface.blit(font_small.render(f"angle: ", True, (0,0,0)), (10, 170))
-                draw_surface.blit(font_small.render(f"font_size: {font_sizes}", True, (0,0,0)), (10, 190))
-                draw_surface.blit(font_small.render(f"name_angle: ", True, (0,0,0)), (10, 210))
-                draw_surface.blit(font_small.render(f"center: ", True, (0,0,0)), (10, 230))
+                draw_surface.blit(text_surfaces.render(font_small, f"no: {ids}", True, (0,0,0)), (10, 50)) #1行目
+                draw_surface.blit(text_surfaces.render(font_small, f"name: {names}", True, (0,0,0)), (10, 70)) #2行目以降
+                draw_surface.blit(text_surfaces.render(font_small, f"area: ", True, (0,0,0)), (10, 90))
+                draw_surface.blit(text_surfaces.render(font_small, f"classification: {classes}", True, (0,0,0)), (10, 110))
+                draw_surface.blit(text_surfaces.render(font_small, f"power [W]: {powers}", True, (0,0,0)), (10, 130))
+                draw_surface.blit(text_surfaces.render(font_small, f"rect_size: {rect_sizes}", True, (0,0,0)), (10, 150))
+                draw_surface.blit(text_surfaces.render(font_small, f"angle: ", True, (0,0,0)), (10, 170))
+                draw_surface.blit(text_surfaces.render(font_small, f"font_size: {font_sizes}", True, (0,0,0)), (10, 190))
+                draw_surface.blit(text_surfaces.render(font_small, f"name_angle: ", True, (0,0,0)), (10, 210))
+                draw_surface.blit(text_surfaces.render(font_small, f"center: ", True, (0,0,0)), (10, 230))
 
                 if active_rects:
                     # --- すべての rect のカテゴリ名を取得 ---
                     all_category_names = [
                         name
                         for r in active_rects
-                        for name in (categories_name_containing_rect(r.center, categories) or [])
+                        for name in (categories_name_containing_rect(r.center, categories, in_category) or [])
                     ]
 
                     category_names = (
                         ", ".join(sorted(set(all_category_names)))
                         if all_category_names else "None"
                     )
-                    text_surface = font_small.render(category_names, True, (0, 0, 0))
+                    text_surface = text_surfaces.render(font_small, category_names, True, (0, 0, 0))
                     draw_surface.blit(text_surface, (55, 90))
 
 
             # 各クラス毎の総数表示（右上）
-            total_counts = count_total_by_classification(rects)
-            base_x = DRAW_W - 10
+            total_counts = power_aggregator.classification_counts()
+            base_x = draw_surface.get_width() - 10
             base_y = 50
             line_h = 20
 
@@ -412,7 +572,7 @@ def run_map_mode(screen, font, rects, texts, categories, polygons, filename):
 
             for key in sorted(total_counts.keys()):
                 text = f"{key}: {total_counts[key]}"
-                text_surf = font_small.render(text, True, (0, 0, 0))
+                text_surf = text_surfaces.render(font_small, text, True, (0, 0, 0))
 
                 x = base_x - text_surf.get_width()  # 右揃え
                 draw_surface.blit(text_surf, (x, y))
@@ -420,8 +580,10 @@ def run_map_mode(screen, font, rects, texts, categories, polygons, filename):
                 y += line_h
 
 
+            frame_timer.lap("hud")
+
             # --- 電力合計表示 ---
-            power_totals, sorted_categories = categories_power_list(rects, categories, point_in_category)
+            power_totals, sorted_categories = power_aggregator.power_list()
 
             base_y, line_h = 290, 20
 
@@ -439,8 +601,9 @@ def run_map_mode(screen, font, rects, texts, categories, polygons, filename):
                     color = (0, 0, 0)     # 黒
 
                 text = f"{name}: {power}[W]/{power_limit}[W]"
-                surf = font_small.render(text, True, color)
+                surf = text_surfaces.render(font_small, text, True, color)
                 draw_surface.blit(surf, (10, y))
+            frame_timer.lap("power")
 
 
         #ウィンドウに描画
@@ -452,17 +615,27 @@ def run_map_mode(screen, font, rects, texts, categories, polygons, filename):
         pygame.key.start_text_input()
 
         # イベント処理
-        for event in pygame.event.get():
+        for event in redraw.get_events():
             if event.type == pygame.QUIT:
                 res = confirm_quit()
                 if res:
-                    DataManager.save_all(rects, texts, categories, polygons, filename)
+                    if finish_loading():
+                        DataManager.save_all_async(rects, texts, categories, polygons, filename)
                     return "back_to_mode_select"
                 elif res is False:
+                    edit_journal.close(discard=True)  # 保存しない編集は復元しない
+                    if loader is not None:
+                        loader.cancel()
                     running = False
                 elif res is None:
                     pass
 
+            # 保存完了（save_service のワーカースレッドから）
+            elif event.type == SAVE_DONE:
+                save_message = SaveService.message(event)
+                save_message_until = now + 3  # 今から3秒後
+                redraw.schedule(save_message_until)
+
             # --- RotatingRect AND TextLabel IS NOT ACTIVE ---
             # ウィンドウリサイズ処理
             elif event.type == pygame.VIDEORESIZE:
@@ -504,18 +677,30 @@ def run_map_mode(screen, font, rects, texts, categories, polygons, filename):
                     if active is None and len(active_rects)==0:
                         res = confirm_quit()
                         if res:
-                            DataManager.save_all(rects, texts, categories, polygons, filename)
+                            if finish_loading():
+                                DataManager.save_all_async(rects, texts, categories, polygons, filename)
                             return "back_to_mode_select"
                         elif res is False:
+                            edit_journal.close(discard=True)
+                            if loader is not None:
+                                loader.cancel()
                             return "back_to_mode_select"
                         elif res is None:
                             pass
 
+                # 表示リセット（ズーム・パン解除）
+                if event.key == pygame.K_HOME:
+                    camera.reset()
+
+                # 処理時間オーバーレイ
+                if event.key == pygame.K_F3:
+                    frame_timer.toggle()
+
                 # SAVE
                 if ctrl and event.key == pygame.K_s:
-                    DataManager.save_all(rects, texts, categories, polygons, filename)
-                    print("Saved all objects.")
-                    save_message_until = now + 3  # 今から3秒後
+                    if not finish_loading():
+                        return "back_to_mode_select"
+                    DataManager.save_all_async(rects, texts, categories, polygons, filename)
                 # ADD NEW RECT
                 if isinstance(active, RotatingRect) or active is None:
                     if event.key == pygame.K_n:
@@ -550,6 +735,8 @@ def run_map_mode(screen, font, rects, texts, categories, polygons, filename):
 
                 # EDIT_ALL_OBJECTS_WINDOW
                 if event.key == pygame.K_o:
+                    if not finish_loading():
+                        return "back_to_mode_select"
                     objs =  edit_all_objects_window(rects)
                     rects = objs
 
@@ -576,6 +763,7 @@ def run_map_mode(screen, font, rects, texts, categories, polygons, filename):
                         hide_until = now + 5
                         need_redraw = True
                         show_category = False
+                        redraw.schedule(hide_until)
 
                     # TENT HIGHLIGHT
                     else:
@@ -588,13 +776,18 @@ def run_map_mode(screen, font, rects, texts, categories, polygons, filename):
                 else:
                     # SHOW_POWER_TABLE_WITH_CATEGORY
                     if event.key == pygame.K_p:
-                        show_power_table_with_category(rects, categories, point_in_category)
+                        if not finish_loading():
+                            return "back_to_mode_select"
+                        show_power_table_with_category(rects, categories, in_category, power_aggregator)
 
                 # EXPORT AS CSV
                 if ctrl and event.key == pygame.K_e:
-                    RotatingRect.save_rects_as_csv(rects, categories, point_in_category)
+                    if not finish_loading():
+                        return "back_to_mode_select"
+                    RotatingRect.save_rects_as_csv(rects, categories)
                     print("CSV has been exported.")
                     export_message_until = now + 3  # 今から3秒後
+                    redraw.schedule(export_message_until)
 
                 # UNDO (ONLY DELETE)
                 if ctrl and event.key == pygame.K_z:
@@ -736,7 +929,7 @@ def run_map_mode(screen, font, rects, texts, categories, polygons, filename):
                 if isinstance(active, TextLabel):
                     if event.key == pygame.K_TAB:
                         # rects を y → x の順でソート（左上から左下方向）
-                        texts = sorted(texts, key=lambda r: (r.position[0], r.position[1]))
+                        texts.sort(key=lambda r: (r.position[0], r.position[1]))
                         # 現在の active のインデックスを特定
                         if active in texts:
                             idx = texts.index(active)
@@ -826,6 +1019,7 @@ def run_map_mode(screen, font, rects, texts, categories, polygons, filename):
                             # 最低2頂点は維持
                             if len(poly.points) > 2:
                                 poly.points.pop(vi)
+                                poly.mark_dirty("points")
 
                                 # 削除後の選択頂点調整
                                 if vi >= len(poly.points):
@@ -853,6 +1047,7 @@ def run_map_mode(screen, font, rects, texts, categories, polygons, filename):
 
                         # 右隣に挿入
                         poly.points.insert(vi + 1, new_point)
+                        poly.mark_dirty("points")
 
                         # 追加した点を選択状態に
                         selected_vertex = (pi, vi + 1)
@@ -894,7 +1089,8 @@ def run_map_mode(screen, font, rects, texts, categories, polygons, filename):
                     internal_pos = screen_to_internal(
                         event.pos,
                         screen.get_size(),
-                        (DRAW_W, DRAW_H)
+                        (DRAW_W, DRAW_H),
+                        camera
                     )
 
                 # ==================================================
@@ -905,19 +1101,19 @@ def run_map_mode(screen, font, rects, texts, categories, polygons, filename):
                     if action:
                         if action == "add_rect":
                             active = None
-                            new = add_rect(rects, active, temporary_pos, screen, context_menu=True)
+                            new = add_rect(rects, active, temporary_pos, screen, context_menu=True, camera=camera)
                             rects.append(new)
                             active = new
 
                         elif action == "add_text":
                             active = None
-                            new = add_text(texts, active, temporary_pos, screen, context_menu=True)
+                            new = add_text(texts, active, temporary_pos, screen, context_menu=True, camera=camera)
                             texts.append(new)
                             active = new
 
                         elif action == "add_polygon":
                             active = None
-                            new = add_polygon(polygons, active, temporary_pos, screen, context_menu=True)
+                            new = add_polygon(polygons, active, temporary_pos, screen, context_menu=True, camera=camera)
                             polygons.append(new)
                             active = new
 
@@ -926,6 +1122,11 @@ def run_map_mode(screen, font, rects, texts, categories, polygons, filename):
 
                     continue
 
+                # 中ボタンドラッグ：表示移動
+                if event.button == 2:
+                    panning = True
+                    continue
+
                 # ==================================================
                 # ③ 右クリック：メニュー生成のみ
                 # ==================================================
@@ -941,7 +1142,7 @@ def run_map_mode(screen, font, rects, texts, categories, polygons, filename):
 
                 # ---- 頂点選択（最優先）----
                 if event.button == 1:
-                    (pi, vi) = get_active_point_index(internal_pos, polygons)
+                    (pi, vi) = get_active_point_index(internal_pos, polygons, radius=10 / camera.zoom)
                     selected_vertex = (pi, vi) if pi is not None and vi is not None else None
                     if selected_vertex is not None:
                         active = polygons[pi]
@@ -951,38 +1152,35 @@ def run_map_mode(screen, font, rects, texts, categories, polygons, filename):
                         clicked = True
                         break
 
-                    # ---- 四角形選択 ----
+                    # ---- 四角形選択（クリック位置のセルの候補だけ判定、前面優先） ----
                     if not clicked:
-                        for r in reversed(rects):
-                            if r.contains_point(internal_pos):
-                                active = r
-                                r.dragging = True
-                                clicked = True
-                                break
+                        r = rect_index.hit_test(internal_pos, rects, lambda r, pos: r.contains_point(pos))
+                        if r is not None:
+                            active = r
+                            r.dragging = True
+                            clicked = True
 
                     # ---- テキスト選択 ----
                     if not clicked:
-                        for t in reversed(texts):
-                            if t.contains_point(internal_pos, font_path):
-                                active = t
-                                t.dragging = True
-                                clicked = True
-                                break
+                        t = text_index.hit_test(internal_pos, texts, lambda t, pos: t.contains_point(pos, font_path))
+                        if t is not None:
+                            active = t
+                            t.dragging = True
+                            clicked = True
 
 
                     # ---- ポリゴン選択 ----
                     if not clicked:
-                        for p in reversed(polygons):
-                            if p.contains_line(internal_pos):
-                                active = p
-                                p.dragging_polygon = True
-                                p.dragging_vertex = False
-                                p.drag_offset = (
-                                    p.points[0][0] - internal_pos[0],
-                                    p.points[0][1] - internal_pos[1]
-                                )
-                                clicked = True
-                                break
+                        p = polygon_index.hit_test(internal_pos, polygons, lambda p, pos: p.contains_line(pos))
+                        if p is not None:
+                            active = p
+                            p.dragging_polygon = True
+                            p.dragging_vertex = False
+                            p.drag_offset = (
+                                p.points[0][0] - internal_pos[0],
+                                p.points[0][1] - internal_pos[1]
+                            )
+                            clicked = True
 
                     # ---- 何も選択されなかった場合のみ解除 ----
                     if not clicked:
@@ -1001,6 +1199,8 @@ def run_map_mode(screen, font, rects, texts, categories, polygons, filename):
 
             elif event.type == pygame.MOUSEBUTTONUP:
                 clicked = False
+                if event.button == 2:
+                    panning = False
                 for r in rects:
                     r.dragging = False
                 for t in texts:
@@ -1009,11 +1209,28 @@ def run_map_mode(screen, font, rects, texts, categories, polygons, filename):
                     p.stop_dragging()
 
 
+            # ホイール：マウス位置を中心にズーム
+            elif event.type == pygame.MOUSEWHEEL:
+                camera.zoom_at(
+                    Camera.ZOOM_STEP ** event.y,
+                    screen_to_internal(pygame.mouse.get_pos(), screen.get_size(), (DRAW_W, DRAW_H))
+                )
+
             elif event.type == pygame.MOUSEMOTION:
+                if panning:
+                    mx, my = screen_to_internal(event.pos, screen.get_size(), (DRAW_W, DRAW_H))
+                    px, py = screen_to_internal(
+                        (event.pos[0] - event.rel[0], event.pos[1] - event.rel[1]),
+                        screen.get_size(), (DRAW_W, DRAW_H)
+                    )
+                    camera.pan(mx - px, my - py)
+                    continue
+
                 internal_pos = screen_to_internal(
                     event.pos,
                     screen.get_size(),
-                    (DRAW_W, DRAW_H)
+                    (DRAW_W, DRAW_H),
+                    camera
                 )
 
                 if isinstance(active, RotatingRect) or isinstance(active, TextLabel):
@@ -1022,13 +1239,15 @@ def run_map_mode(screen, font, rects, texts, categories, polygons, filename):
                             active,
                             event.pos,
                             screen,
-                            SCREEN_W, SCREEN_H
+                            SCREEN_W, SCREEN_H,
+                            camera=camera
                         )
 
                 if isinstance(active, PolygonShape):
                     # ---- 頂点ドラッグ ----
                     if active.dragging_vertex and selected_vertex:
                         active.points[selected_vertex[1]] = internal_pos
+                        active.mark_dirty("points")
                     # ---- ポリゴン全体 ----
                     elif active.dragging_polygon:
                         dx, dy = drag_category_or_polygon(
@@ -1037,46 +1256,39 @@ def run_map_mode(screen, font, rects, texts, categories, polygons, filename):
                             screen,
                             DRAW_W, DRAW_H,
                             SCREEN_W, SCREEN_H,
-                            offset=active.drag_offset
+                            offset=active.drag_offset,
+                            camera=camera
                         )
 
                         active.points = [(x + dx, y + dy) for (x, y) in active.points]
 
 
 
-        # 内部解像度で全て描画したあと
-        sw, sh = screen.get_size()
-        target_aspect = 16 / 9
-        current_aspect = sw / sh
+        frame_timer.lap("events")
 
-        # 16:9維持（黒帯あり）
-        if current_aspect > target_aspect:
-            scaled_h = sh
-            scaled_w = int(sh * target_aspect)
-        else:
-            scaled_w = sw
-            scaled_h = int(sw / target_aspect)
-
-        scaled = pygame.transform.smoothscale(draw_surface, (scaled_w, scaled_h))
-        screen.fill((0, 0, 0))
-        offset_x = (sw - scaled_w) // 2
-        offset_y = (sh - scaled_h) // 2
-        screen.blit(scaled, (offset_x, offset_y))
-
-        # コンテキストメニュー描画
-        if context_menu:
-            context_menu.draw(screen, font_small)
+        # 自動保存（間隔が来たらスナップショットだけ取り、書き込みはワーカースレッド。読み込み中は保存しない）
+        if loader is None:
+            save_service.autosave(now, rects, texts, categories, polygons, filename)
+        edit_journal.flush()
 
+        # 描画不要フレームは画面更新しない（処理時間は記録する。入力で起きた回のダイアログなど）
+        if not render_frame:
+            frame_timer.end_frame(rendered=False)
+            continue
 
-        pygame.display.flip()
-        
-        # テキストキャッシュサイズ制限
-        if len(text_cache) > MAX_CACHE_SIZE:
-            keys_to_delete = list(text_cache.keys())[:50]
-            for k in keys_to_delete:
-                del text_cache[k]
+        # 内部解像度で全て描画したあと、汚れた範囲だけ 16:9維持（黒帯あり）で画面へ
+        # コンテキストメニュー・処理時間は画面座標で上に描く
+        damage.present(
+            screen, draw_surface,
+            draw_overlay=draw_screen_overlay,
+            now=now,
+        )
+        if damage.settle_at is not None:
+            redraw.schedule(damage.settle_at, key="settle")
+        frame_timer.lap("present")
+        frame_timer.end_frame()
 
-        clock.tick(60) # FPS
+        redraw.end_frame(render_frame) # FPS上限
 
 
 
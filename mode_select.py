@@ -4,14 +4,31 @@ import os
 from tkinter import filedialog, messagebox
 from objects import CategoryShape, DataManager, RotatingRect, TextLabel
 from utils import select_background_file, save_bg_path, load_bg_path, select_json_file, load_json_path, save_json_path
-from config import font_path
+from fonts import fonts
+from input_trace import input_recorder
+import config
+
+# -----------------------------
+# マップ表示モードの読み込み
+# -----------------------------
+def load_for_map(json_path):
+    """
+    PROGRESSIVE_LOAD ならワーカースレッドで読み始めてすぐ戻る（最後の要素が IncrementalLoad）
+    入力を記録しているときは最初のモデルを残すため全部読んでから戻る
+    """
+    if config.PROGRESSIVE_LOAD and not input_recorder.enabled:
+        loader, filename, full_path = DataManager.load_incremental(filename=json_path)
+        return "map", [], [], [], [], filename, full_path, loader
+    rects, texts, categories, polygons, filename, full_path = DataManager.load_all(filename=json_path)
+    return "map", rects, texts, categories, polygons, filename, full_path, None
+
 
 # -----------------------------
 # モード選択画面
 # -----------------------------
 def select_mode(screen, font, bg_image_path=None, json_path=None):
-    font_text1 = pygame.font.Font(font_path, 20)
-    font_text2 = pygame.font.Font(font_path, 15)
+    font_text1 = fonts.get(20)
+    font_text2 = fonts.get(15)
 
     # --- UI定数 ---
     BG_COLOR     = (245, 245, 245)
@@ -91,11 +108,10 @@ def select_mode(screen, font, bg_image_path=None, json_path=None):
 
                 if edit_button.collidepoint(event.pos):
                     rects, texts, categories, polygons, filename, full_path = DataManager.load_all(filename=json_path)
-                    return "edit", rects, texts, categories, polygons, filename, full_path
+                    return "edit", rects, texts, categories, polygons, filename, full_path, None
 
                 if map_button.collidepoint(event.pos):
-                    rects, texts, categories, polygons, filename, full_path = DataManager.load_all(filename=json_path)
-                    return "map" , rects, texts, categories, polygons, filename, full_path
+                    return load_for_map(json_path)
                 
                 if clear_button.collidepoint(event.pos):
                     rects, texts, categories, polygons, filename, full_path = [], [], [], [], None, None
@@ -115,11 +131,10 @@ def select_mode(screen, font, bg_image_path=None, json_path=None):
 
                 if event.key == pygame.K_3:
                     rects, texts, categories, polygons, filename, full_path = DataManager.load_all(filename=json_path)
-                    return "edit", rects, texts, categories, polygons, filename, full_path
+                    return "edit", rects, texts, categories, polygons, filename, full_path, None
 
                 if event.key == pygame.K_4:
-                    rects, texts, categories, polygons, filename, full_path = DataManager.load_all(filename=json_path)
-                    return "map", rects, texts, categories, polygons, filename, full_path
+                    return load_for_map(json_path)
 
 
 # def select_mode(screen, font, bg_image_path=None):
@@ -8,6 +8,9 @@ from tkinter import colorchooser
 from tkinter import simpledialog, messagebox
 from objects import RotatingRect, TextLabel
 from config import DRAW_W, DRAW_H, SCREEN_W, SCREEN_H
+from batch_geometry import category_membership
+from rect_store import rect_store
+from tracing import tracer
 
 # -----------------------------
 # 共通関数
@@ -15,6 +18,7 @@ from config import DRAW_W, DRAW_H, SCREEN_W, SCREEN_H
 import tkinter as tk
 from tkinter import messagebox
 
+@tracer.traced(cat="dialog")
 def confirm_quit():
     """
     True  : はい（保存）
@@ -55,6 +59,7 @@ def tk_file_dialog_open(dialog_func, **options):
 # -----------------------------
 # mode_select用関数
 # -----------------------------
+@tracer.traced(cat="dialog")
 def select_year_version(years, versions):
     """年度とバージョンを選択する小ウィンドウを表示して結果を返す"""
     root = tk.Tk()
@@ -94,6 +99,7 @@ def select_year_version(years, versions):
 # --------------------
 # EDIT_OBJECT_WINDOW
 # --------------------
+@tracer.traced(cat="dialog")
 def edit_object_window(obj):
     """オブジェクト編集ウィンドウを表示し、編集結果を辞書で返す"""
     root = tk.Tk()
@@ -280,6 +286,7 @@ def parse_color(value):
 # -------------------------
 # EDIT_ALL_OBJECTS_WINDOW
 # -------------------------
+@tracer.traced(cat="dialog")
 def edit_all_objects_window(objs):
     """全オブジェクト編集ウィンドウを表示し、編集結果を反映する"""
     root = tk.Tk()
@@ -613,12 +620,14 @@ def edit_all_objects_window(objs):
 # -----------------------------
 # POWER計算/表示（全体形式）
 # -----------------------------
-def show_power_table_with_category(rects, categories, point_in_category):
+@tracer.traced(cat="dialog")
+def show_power_table_with_category(rects, categories, point_in_category, power_aggregator=None):
     """
     RotatingRect の power を表形式で表示し、カテゴリごとの power 総計も表示
     rects: RotatingRect のリスト
     categories: カテゴリオブジェクトのリスト
     point_in_category: 矩形がカテゴリ内にあるか判定する関数
+    power_aggregator: PowerAggregator があれば総計はそこから読む（power 編集も差分で反映）
     """
     def categories_name_containing_rect(center, categories):
         """矩形(center)がカテゴリ(cat)内にあるか判定"""
@@ -671,8 +680,8 @@ def show_power_table_with_category(rects, categories, point_in_category):
 
     # Treeviewにデータ挿入
     rect_iid_map = {}
-    for idx, r in enumerate(rects):
-        cats = categories_name_containing_rect(r.center, categories)
+    rect_cats = category_membership(rect_store.centers(rects), categories)
+    for idx, (r, cats) in enumerate(zip(rects, rect_cats)):
         iid = f"rect_{r.no}_{idx}"
         tree.insert("", "end", iid=iid, values=(r.no, r.name, r.power, r.tent, r.light, ", ".join(cats)))
         rect_iid_map[iid] = r
@@ -690,7 +699,12 @@ def show_power_table_with_category(rects, categories, point_in_category):
     totals_label.pack(side="left", fill="y", padx=25, pady=5)
 
 
-    def update_category_totals():
+    def aggregate_category_totals():
+        if power_aggregator is not None:
+            return (power_aggregator.used_totals(),
+                    power_aggregator.no_cat_total,
+                    power_aggregator.total_power)
+
         totals = {}
         no_cat_total = 0
         total_power = 0
@@ -706,8 +720,9 @@ def show_power_table_with_category(rects, categories, point_in_category):
 
         sorted_categories = sorted(unique.values(), key=lambda cc: cc.name)
 
-        # --- rect 処理 ---
-        for r in rects:
+        # --- rect 処理（カテゴリ判定は一括） ---
+        rect_cats = category_membership(rect_store.centers(rects), sorted_categories)
+        for r, cats in zip(rects, rect_cats):
             try:
                 r_power = int(r.power)
             except (ValueError, TypeError):
@@ -715,14 +730,17 @@ def show_power_table_with_category(rects, categories, point_in_category):
 
             total_power += r_power
 
-            cats = categories_name_containing_rect(r.center, sorted_categories)
-
             if not cats:
                 no_cat_total += r_power
             else:
                 for cat_name in cats:
                     totals[cat_name] = totals.get(cat_name, 0) + r_power
 
+        return totals, no_cat_total, total_power
+
+    def update_category_totals():
+        totals, no_cat_total, total_power = aggregate_category_totals()
+
         # --- 表示 ---
         text_lines = [f"各パネル総電力\n電力合計: {total_power} [W]"]
 
@@ -813,6 +831,7 @@ def show_power_table_with_category(rects, categories, point_in_category):
 # -----------------
 # ポリゴン編集ウィンドウ
 # -----------------
+@tracer.traced(cat="dialog")
 def edit_polygon_window(poly):
     root = tk.Tk()
     root.withdraw()
@@ -898,6 +917,7 @@ def edit_polygon_window(poly):
 # ---------------
 # カテゴリモード用
 # ---------------
+@tracer.traced(cat="dialog")
 def edit_category_dialog(cat):
     """カテゴリ編集ウィンドウ（名前 + アラート + カラー）"""
     root = tk.Tk()
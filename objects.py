@@ -2,6 +2,7 @@ import pygame
 import json
 import os
 import math
+import sys
 import csv
 import tkinter as tk
 from abc import ABC, abstractmethod
@@ -11,14 +12,265 @@ from tkinter import colorchooser
 from utils import (get_rotated_rect_points, count_total_by_classification, categories_power_list, point_in_category, convert_mouse_to_draw_coords,
                    point_to_segment_distance, hit_test_polyline)
 from config import CATEGORIES_FILE, RECTS_FILE, font_path, SCREEN_W, SCREEN_H
+from batch_geometry import category_membership
+from fonts import fonts
+from text_cache import text_surfaces
+from sprite_cache import rect_sprites
+from lod import LabelLod
+from tracing import tracer
+from save_service import save_service, take_snapshot, write_snapshot
+from journal import edit_journal, journal_path, apply_journal
+from tcbf_format import is_binary, TcbfReader
+from progressive_load import IncrementalLoad
+from rect_store import rect_store, FLOAT, INT, OTHER
+
+# -----------------------------
+# 変更通知
+# -----------------------------
+class _TrackedAttr:
+    """
+    代入時に obj.mark_dirty(name) を呼ぶ属性
+    値はインスタンス辞書に直接置くので読み取りは通常の属性と同じ速さ
+    intern=True なら文字列を sys.intern して同じ値を1つにまとめる（分類名など繰り返す文字列）
+    """
+    def __init__(self, intern=False):
+        self.intern = intern
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __set__(self, obj, value):
+        if self.intern and type(value) is str:
+            value = sys.intern(value)
+        obj.__dict__[self.name] = value
+        obj.__dict__["_saved_dict"] = None  # 保存用スナップショット（save_service）を作り直す
+        obj.mark_dirty(self.name)
+
+
+class _ColumnAttr(_TrackedAttr):
+    """
+    値を rect_store の列に置く _TrackedAttr（RotatingRect の数値属性。obj._row の行）
+    読み出しは毎回通るので、ストアのメソッドを呼ばずに列を直接読む
+    """
+    def __init__(self, column):
+        super().__init__()
+        self.column = column
+        self.col = rect_store.cols[column]
+        self.kinds = rect_store.kinds[column]
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        row = obj._row
+        kind = self.kinds[row]
+        if kind == FLOAT:
+            return self.col[row]
+        if kind == INT:
+            return int(self.col[row])
+        return rect_store.other[(self.column, row)]
+
+    def __set__(self, obj, value):
+        rect_store.put(self.column, obj._row, value)
+        obj.__dict__["_saved_dict"] = None
+        obj.mark_dirty(self.name)
+
+
+class _PairColumnAttr(_TrackedAttr):
+    """2つの列を (x, y) のタプルとして読み書きする _ColumnAttr（center / size）"""
+    def __init__(self, x, y):
+        super().__init__()
+        self.x, self.y = x, y
+        self.col_x, self.col_y = rect_store.cols[x], rect_store.cols[y]
+        self.kinds_x, self.kinds_y = rect_store.kinds[x], rect_store.kinds[y]
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        row = obj._row
+        kind = self.kinds_x[row]
+        if kind == OTHER:
+            return rect_store.other[(self.x, row)]
+        x, y = self.col_x[row], self.col_y[row]
+        if kind == INT:
+            x = int(x)
+        if self.kinds_y[row] == INT:
+            y = int(y)
+        return (x, y)
+
+    def __set__(self, obj, value):
+        rect_store.put_pair(self.x, self.y, obj._row, value)
+        obj.__dict__["_saved_dict"] = None
+        obj.mark_dirty(self.name)
+
+
+class ObjectList(list):
+    """
+    追加・削除・属性変更を observer に通知するリスト（rects / texts / polygons 用）
+    observer は object_added(obj) / object_removed(obj) / object_changed(obj, attr) を持つ
+    extend では observer が objects_appended(objs) を持てばまとめて渡す（末尾への一括追加用）
+    sort / reverse で並びが変わったら、observer が objects_reordered(objs) を持てば位置の変わったものを渡す
+    """
+    def __init__(self, iterable=()):
+        super().__init__(iterable)
+        self.observers = []
+        for obj in self:
+            obj._owner = self
+
+    def add_observer(self, observer):
+        """
+        observer を登録し、既存オブジェクトを通知
+        observer が attach(objs) を持てばまとめて渡す（一括初期化用）
+        """
+        self.observers.append(observer)
+        if hasattr(observer, "attach"):
+            observer.attach(list(self))
+            return
+        for obj in self:
+            observer.object_added(obj)
+
+    def remove_observer(self, observer):
+        if observer in self.observers:
+            self.observers.remove(observer)
+
+    def object_changed(self, obj, attr):
+        """要素の mark_dirty から呼ばれる"""
+        for observer in self.observers:
+            observer.object_changed(obj, attr)
+
+    def _attach(self, obj):
+        obj._owner = self
+        for observer in self.observers:
+            observer.object_added(obj)
+
+    def _detach(self, obj):
+        if getattr(obj, "_owner", None) is self:
+            obj._owner = None
+        for observer in self.observers:
+            observer.object_removed(obj)
+
+    # --- list の変更操作 ---
+    def append(self, obj):
+        super().append(obj)
+        self._attach(obj)
+
+    def insert(self, index, obj):
+        super().insert(index, obj)
+        self._attach(obj)
+
+    def extend(self, objs):
+        objs = list(objs)
+        super().extend(objs)
+        for obj in objs:
+            obj._owner = self
+        for observer in self.observers:
+            if hasattr(observer, "objects_appended"):
+                observer.objects_appended(objs)
+                continue
+            for obj in objs:
+                observer.object_added(obj)
+
+    def __iadd__(self, objs):
+        self.extend(objs)
+        return self
+
+    def pop(self, index=-1):
+        obj = super().pop(index)
+        self._detach(obj)
+        return obj
+
+    def remove(self, obj):
+        super().remove(obj)
+        self._detach(obj)
+
+    def clear(self):
+        old = list(self)
+        super().clear()
+        for obj in old:
+            self._detach(obj)
+
+    def __delitem__(self, index):
+        old = self[index] if isinstance(index, slice) else [self[index]]
+        super().__delitem__(index)
+        for obj in old:
+            self._detach(obj)
+
+    def __setitem__(self, index, value):
+        old = self[index] if isinstance(index, slice) else [self[index]]
+        new = list(value) if isinstance(index, slice) else [value]
+        super().__setitem__(index, new if isinstance(index, slice) else value)
+        for obj in old:
+            self._detach(obj)
+        for obj in new:
+            self._attach(obj)
+
+    def sort(self, *, key=None, reverse=False):
+        before = list(self)
+        super().sort(key=key, reverse=reverse)
+        self._reordered(before)
+
+    def reverse(self):
+        before = list(self)
+        super().reverse()
+        self._reordered(before)
+
+    def _reordered(self, before):
+        """並び（重なり順・保存順）が変わった要素を通知"""
+        moved = [obj for obj, old in zip(self, before) if obj is not old]
+        if not moved:
+            return
+        for observer in self.observers:
+            if hasattr(observer, "objects_reordered"):
+                observer.objects_reordered(moved)
 
 # -----------------------------
 # データ管理
 # -----------------------------
 class DataManager:
     @classmethod
+    @tracer.traced(cat="io")
     def save_all(cls, rects, texts, categories, polygons, filename=None):
         """rect, text, category をまとめて保存"""
+        filename = cls.ask_save_path(filename)
+        if not filename:
+            print("保存キャンセル")
+            return
+
+        data, seq = cls._snapshot(rects, texts, categories, polygons)
+        write_snapshot(data, filename)
+        edit_journal.saved(filename, seq)
+
+        print("Saved all ->", filename)
+
+    @classmethod
+    def _snapshot(cls, rects, texts, categories, polygons):
+        """
+        保存するスナップショットと、そこまでを含む編集ジャーナルの番号
+        （journal_seq は最後のキーにする。EditJournal が JSON の末尾だけ読んで取り出す）
+        """
+        seq = edit_journal.checkpoint()
+        data = take_snapshot(rects, texts, categories, polygons)
+        if seq is not None:
+            data["journal_seq"] = seq
+        return data, seq
+
+    @classmethod
+    def save_all_async(cls, rects, texts, categories, polygons, filename=None):
+        """
+        save_all の書き込みを save_service のワーカースレッドで行う（フレームを止めない）
+        書き終わると SAVE_DONE が post される。予約した保存先を返す（キャンセルなら None）
+        """
+        filename = cls.ask_save_path(filename)
+        if not filename:
+            print("保存キャンセル")
+            return None
+
+        data, seq = cls._snapshot(rects, texts, categories, polygons)
+        save_service.submit(data, filename, on_saved=lambda path: edit_journal.saved(path, seq))
+        return filename
+
+    @classmethod
+    def ask_save_path(cls, filename=None):
+        """保存先を選ぶ（filename を初期値にする）。キャンセルなら None か空文字"""
         from object_editor import tk_file_dialog_open
 
         if filename is not None:
@@ -26,7 +278,7 @@ class DataManager:
                 filedialog.asksaveasfilename,
                 title="保存先を選択",
                 defaultextension=".json",
-                filetypes=[("JSON files", "*.json"), ("All files", "*.*")],
+                filetypes=[("JSON files", "*.json"), ("TCBF binary", "*.tcbf"), ("All files", "*.*")],
                 initialfile=filename
             )
 
@@ -35,39 +287,19 @@ class DataManager:
                 filedialog.asksaveasfilename,
                 title="保存先を選択",
                 defaultextension=".json",
-                filetypes=[("JSON files", "*.json"), ("All files", "*.*")],
+                filetypes=[("JSON files", "*.json"), ("TCBF binary", "*.tcbf"), ("All files", "*.*")],
                 initialfile=""
             )
-
-        if not filename:
-            print("保存キャンセル")
-            return
-
-        data = {
-            "rects":      [r.to_dict() for r in rects],
-            "texts":      [t.to_dict() for t in texts],
-            "categories": [c.to_dict() for c in categories],
-            "polygons":   [p.to_dict() for p in polygons],
-        }
-
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-
-        print("Saved all ->", filename)
+        return filename
 
     @classmethod
+    @tracer.traced(cat="io")
     def load_all(cls, filename=None):
         """rect, text, category をまとめて読み込み"""
-        from object_editor import tk_file_dialog_open
-
         if filename is None:
-            filename = tk_file_dialog_open(
-                filedialog.askopenfilename,
-                title="読み込むファイルを選択",
-                defaultextension=".json",
-                filetypes=[("JSON files", "*.json"), ("All files", "*.*")]
-            )
+            filename = cls.ask_open_path()
 
+        save_service.flush()  # 書き込み中の保存があれば終わってから読む
 
         if not filename:
             print("読み込みキャンセル")
@@ -77,21 +309,75 @@ class DataManager:
             print("ファイルなし:", filename)
             return [], [], [], [], "", ""
 
-        with open(filename, "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-        print("Loaded all ->", filename)
-
-        rects      = [RotatingRect.from_dict(d)  for d in data.get("rects", [])]
-        texts      = [TextLabel.from_dict(d)     for d in data.get("texts", [])]
-        categories = [CategoryShape.from_dict(d) for d in data.get("categories", [])]
-        polygons   = [PolygonShape.from_dict(d)         for d in data.get("polygons", [])]
+        model = cls._read_model(filename)
+        rects, texts, categories, polygons = model["rects"], model["texts"], model["categories"], model["polygons"]
 
         full_path = filename
         filename = basename(filename)
 
         return rects, texts, categories, polygons, filename, full_path
 
+    @classmethod
+    def ask_open_path(cls):
+        from object_editor import tk_file_dialog_open
+
+        return tk_file_dialog_open(
+            filedialog.askopenfilename,
+            title="読み込むファイルを選択",
+            defaultextension=".json",
+            filetypes=[("JSON files", "*.json"), ("TCBF binary", "*.tcbf"), ("All files", "*.*")]
+        )
+
+    @staticmethod
+    def classes():
+        """種類名 -> クラス（from_dict で作る）"""
+        return {"rects": RotatingRect, "texts": TextLabel, "categories": CategoryShape, "polygons": PolygonShape}
+
+    @classmethod
+    def _read_model(cls, filename):
+        """ファイルを読んで {"rects": [...], ...}（ジャーナルが残っていれば続けて再生する）"""
+        if is_binary(filename):
+            # .tcbf: mmap した列から直接オブジェクトにする（JSON の解析なし）
+            with TcbfReader(filename) as reader:
+                model = {kind: list(reader.objects(kind, c)) for kind, c in cls.classes().items()}
+                journal_seq = reader.meta["top"].get("journal_seq", 0)
+        else:
+            with open(filename, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            model = {kind: [c.from_dict(d) for d in data.get(kind, [])] for kind, c in cls.classes().items()}
+            journal_seq = data.get("journal_seq", 0)
+
+        print("Loaded all ->", filename)
+
+        # 保存していない編集が残っていれば続けて再生（前回落ちたときの復元）
+        if os.path.exists(journal_path(filename)):
+            recovered = apply_journal(journal_path(filename), model, journal_seq, cls.classes())
+            if recovered:
+                print(f"Recovered {recovered} edits <- {journal_path(filename)}")
+        return model
+
+    @classmethod
+    def load_incremental(cls, filename=None):
+        """
+        load_all と同じファイルをワーカースレッドで読む（IncrementalLoad）。
+        戻り値 (loader, filename, full_path)。キャンセル・ファイルなしなら loader は None
+        """
+        if filename is None:
+            filename = cls.ask_open_path()
+
+        save_service.flush()  # 書き込み中の保存があれば終わってから読む
+
+        if not filename:
+            print("読み込みキャンセル")
+            return None, "", ""
+
+        if not os.path.exists(filename):
+            print("ファイルなし:", filename)
+            return None, "", ""
+
+        loader = IncrementalLoad(filename, cls.classes(), cls._read_model)
+        return loader, basename(filename), filename
+
 
 # -----------------------------
 # オブジェクト新規追加メニュー（右クリック）
@@ -124,7 +410,7 @@ class ContextMenu:
 
     def draw(self, screen, font):
         if not self.visible:
-            return
+            return []
 
         x, y = self.pos
         h = len(self.items) * self.item_h
@@ -147,6 +433,8 @@ class ContextMenu:
             txt = font.render(label, True, (0, 0, 0))
             screen.blit(txt, (x + 6, r_y + 4))
 
+        return [pygame.Rect(x, y, self.width, h)]
+
     def handle_event(self, event):
         if not self.visible:
             return None
@@ -204,9 +492,11 @@ class InfoPanel:
         count_total_by_classification,
         categories_power_list,
         point_in_category,
+        power_aggregator=None,
     ):
         """
         内容が変わったときだけ Surface を作り直す
+        power_aggregator: PowerAggregator があれば電力合計はそこから読む
         """
 
         # --- キャッシュキー（最低限でOK） ---
@@ -214,6 +504,7 @@ class InfoPanel:
             id(active),
             tuple(r.no for r in active_rects) if active_rects else None,
             tuple((r.no, r.power, r.classification) for r in rects),
+            power_aggregator.revision if power_aggregator is not None else None,
         )
 
         if key == self._cache_key and not self._dirty:
@@ -234,7 +525,7 @@ class InfoPanel:
 
         def line(text, x=10, color=(0, 0, 0)):
             nonlocal y
-            surf.blit(self.font.render(text, True, color), (x, y))
+            surf.blit(text_surfaces.render(self.font, text, True, color), (x, y))
             y += line_h
 
         if isinstance(active, RotatingRect):
@@ -245,10 +536,10 @@ class InfoPanel:
             line("area:")
 
             categories_name_list = categories_name_containing_rect(
-                active.center, categories
+                active.center, categories, point_in_category
             ) or []
             category_names = ", ".join(sorted(set(categories_name_list))) or "None"
-            surf.blit(self.font.render(category_names, True, (0, 0, 0)), (55, 90))
+            surf.blit(text_surfaces.render(self.font, category_names, True, (0, 0, 0)), (55, 90))
 
             line(f"classification: {active.classification}")
             line(f"power [W]: {active.power}")
@@ -283,10 +574,10 @@ class InfoPanel:
             all_category_names = [
                 name
                 for r in active_rects
-                for name in (categories_name_containing_rect(r.center, categories) or [])
+                for name in (categories_name_containing_rect(r.center, categories, point_in_category) or [])
             ]
             category_names = ", ".join(sorted(set(all_category_names))) or "None"
-            surf.blit(self.font.render(category_names, True, (0, 0, 0)), (55, 90))
+            surf.blit(text_surfaces.render(self.font, category_names, True, (0, 0, 0)), (55, 90))
 
             line(f"classification: {classes}")
             line(f"power [W]: {powers}")
@@ -306,16 +597,19 @@ class InfoPanel:
 
         for key in sorted(total_counts.keys()):
             text = f"{key}: {total_counts[key]}"
-            ts = self.font.render(text, True, (0, 0, 0))
+            ts = text_surfaces.render(self.font, text, True, (0, 0, 0))
             surf.blit(ts, (base_x - ts.get_width(), y))
             y += line_h
 
         # =========================================================
         # 電力合計
         # =========================================================
-        power_totals, sorted_categories = categories_power_list(
-            rects, categories, point_in_category
-        )
+        if power_aggregator is not None:
+            power_totals, sorted_categories = power_aggregator.power_list()
+        else:
+            power_totals, sorted_categories = categories_power_list(
+                rects, categories, point_in_category
+            )
 
         power_limit_map = {c.name: c.power_limit for c in sorted_categories}
 
@@ -326,7 +620,7 @@ class InfoPanel:
             color = (255, 0, 0) if limit > 0 and power > limit else (0, 0, 0)
             text = f"{name}: {power}[W]/{limit}[W]"
             surf.blit(
-                self.font.render(text, True, color),
+                text_surfaces.render(self.font, text, True, color),
                 (10, base_y + i * line_h),
             )
 
@@ -359,16 +653,25 @@ class CategoryShape:
             power_limit=d.get("power_limit", 0),
         )
 
-    def draw_category(self, screen, font, active=False, active_vertex=None, show_names=True, show_vertices=True):
-        """画面に多角形描画"""
+    def get_bounds(self, pad=20):
+        """頂点・頂点番号を含む外接矩形 (x0, y0, x1, y1)（表示範囲外の判定用）"""
+        if not self.points:
+            return (0, 0, 0, 0)
+        xs = [p[0] for p in self.points]
+        ys = [p[1] for p in self.points]
+        return (min(xs) - pad, min(ys) - pad, max(xs) + pad, max(ys) + pad)
+
+    def draw_category(self, screen, font, active=False, active_vertex=None, show_names=True, show_vertices=True, xf=None):
+        """画面に多角形描画（xf: ViewTransform でネイティブ解像度に直接描く）"""
         if not self.points:
             return
+        points = self.points if xf is None else [xf.point(p) for p in self.points]
         col = (255,100,100) if active else self.color
-        pygame.draw.polygon(screen, col, self.points, 3)
+        pygame.draw.polygon(screen, col, points, 3)
         
         # 頂点表示
         if show_vertices:
-            for i,(x,y) in enumerate(self.points):
+            for i,(x,y) in enumerate(points):
                 if active and active_vertex == i:
                     pygame.draw.circle(screen, (255,0,0), (int(x),int(y)), 6)  # 選択頂点赤
                 else:
@@ -376,15 +679,15 @@ class CategoryShape:
         
         # 多角形名を重心付近に表示
         if show_names:
-            cx = sum(p[0] for p in self.points)/len(self.points)
-            cy = sum(p[1] for p in self.points)/len(self.points)
+            cx = sum(p[0] for p in points)/len(points)
+            cy = sum(p[1] for p in points)/len(points)
             name_surf = font.render(self.name, True, (0,0,0))
             rect = name_surf.get_rect(center=(cx, cy))
             screen.blit(name_surf, rect)
 
         if active:
             # 頂点番号表示
-            for i,(x,y) in enumerate(self.points):
+            for i,(x,y) in enumerate(points):
                 no_surf = font.render(str(i), True, (0,0,0))
                 rect = no_surf.get_rect(center=(x, y - 12))
                 screen.blit(no_surf, rect)
@@ -407,7 +710,29 @@ class CategoryShape:
 # テキストクラス
 # -----------------------------
 class TextLabel:
+    # 変更通知つき属性（ObjectList の observer へ通知）
+    no = _TrackedAttr()
+    text = _TrackedAttr()
+    position = _TrackedAttr()
+    font_size = _TrackedAttr()
+    color = _TrackedAttr()
+    angle = _TrackedAttr()
+    locked = _TrackedAttr()
+
+    # 当たり判定範囲に影響する属性
+    BOUNDS_ATTRS = ("text", "position", "font_size", "angle")
+    # 描画結果・外接矩形のキャッシュを無効にする属性
+    RENDER_ATTRS = ("text", "position", "font_size", "color", "angle")
+
+    # 描画キャッシュ（RENDER_ATTRS が変わるたびに _version が進む）
+    _version = 0
+    _render_key = None
+    _render_surf = None
+    _bounds_key = None
+    _bounds_rect = None
+
     def __init__(self, no="0", text="Text", position=(100,100), font_size=20, color=(0,0,0), angle=0, classification="Text", power="0", locked=False):
+        self._owner = None
         self.no = no
         self.text = text
         self.position = tuple(position)
@@ -420,6 +745,12 @@ class TextLabel:
         self.locked = locked
         self.dragging = False
 
+    def mark_dirty(self, attr=None):
+        """属性変更を所属リストに通知（描画に効く属性ならキャッシュも無効化）"""
+        if attr is None or attr in self.RENDER_ATTRS:
+            self._version += 1
+        if self._owner is not None:
+            self._owner.object_changed(self, attr)
 
     def to_dict(self):
         """JSON保存用"""
@@ -446,26 +777,79 @@ class TextLabel:
             locked=d.get("locked", False),
         )
     
-    def draw_texts(self, screen, font_path, active=False):
-        """文字描画"""
+    def draw_texts(self, screen, font_path, active=False, xf=None):
+        """文字描画（xf: ViewTransform でネイティブ解像度に直接描く）"""
         if active:
             text_color = (0,0,255) # 青
         else:
             text_color = self.color
 
-        # フォントキャッシュ
-        cache_key = (font_path, self.font_size)
-        if not hasattr(self, '_font_cache'):
-            self._font_cache = {}
-        
-        if cache_key not in self._font_cache:
-            self._font_cache[cache_key] = pygame.font.Font(font_path, self.font_size)
-        
-        font = self._font_cache[cache_key]
-        text_surf = font.render(self.text, True, text_color)
-        rotated_surf = pygame.transform.rotate(text_surf, -self.angle)
-        rect = rotated_surf.get_rect(midleft=self.position)
+        if xf is not None:
+            font = self._get_font(font_path, xf.font_size(self.font_size))
+            rotated_surf = text_surfaces.render(font, self.text, True, text_color, -self.angle)
+            rect = rotated_surf.get_rect(midleft=xf.point(self.position))
+            screen.blit(rotated_surf, rect)
+            return [rect]
+
+        rotated_surf = self._surface(font_path, text_color)
+        rect = self._rect(font_path)
         screen.blit(rotated_surf, rect)
+        return [rect.copy()]
+
+    def _surface(self, font_path, color):
+        """回転済みの文字 Surface（_version・フォント・色が同じ間は使い回す）"""
+        key = (self._version, font_path, tuple(color))
+        if self._render_key != key:
+            font = self._get_font(font_path)
+            self._render_surf = text_surfaces.render(font, self.text, True, color, -self.angle)
+            self._render_key = key
+        return self._render_surf
+
+    def _rect(self, font_path):
+        """描画範囲の Rect（色によらないので、描画済みの Surface があればその大きさを使う）"""
+        key = (self._version, font_path)
+        if self._bounds_key != key:
+            if self._render_key is not None and self._render_key[:2] == key:
+                surf = self._render_surf
+            else:
+                surf = self._surface(font_path, self.color)
+            self._bounds_rect = surf.get_rect(midleft=self.position)
+            self._bounds_key = key
+        return self._bounds_rect
+
+    def _get_font(self, font_path, size=None):
+        """
+        フォント（FontRegistry で共有、サイズが変わったら持ち替える）
+        size 指定（拡大縮小描画用）は当たり判定用とは別に持つ
+        """
+        if size is not None:
+            cache_key = (font_path, size)
+            if getattr(self, "_xf_font_key", None) != cache_key:
+                if getattr(self, "_xf_font_key", None) is not None:
+                    fonts.release(self._xf_font_key[1], self._xf_font_key[0])
+                self._xf_font = fonts.acquire(size, font_path)
+                self._xf_font_key = cache_key
+            return self._xf_font
+
+        cache_key = (font_path, self.font_size)
+        if getattr(self, "_font_key", None) != cache_key:
+            if getattr(self, "_font_key", None) is not None:
+                fonts.release(self._font_key[1], self._font_key[0])
+            self._font = fonts.acquire(self.font_size, font_path)
+            self._font_key = cache_key
+        return self._font
+
+    def __del__(self):
+        """_get_font で持ったフォントの参照を返す"""
+        for name in ("_font_key", "_xf_font_key"):
+            key = self.__dict__.get(name)
+            if key is not None:
+                fonts.release(key[1], key[0])
+
+    def get_bounds(self, font_path=font_path):
+        """描画範囲の外接矩形 (x0, y0, x1, y1)"""
+        rect = self._rect(font_path)
+        return (rect.left, rect.top, rect.right, rect.bottom)
 
     def edit_properties(self):
         """プロパティ編集ダイアログ表示"""
@@ -525,22 +909,34 @@ class TextLabel:
 
     def contains_point(self, p, font_path):
         """点 p がテキスト内にあるか判定"""
-        # フォント生成
-        font = pygame.font.Font(font_path, self.font_size)
-        # テキストサーフェス作成
-        text_surf = font.render(self.text, True, self.color)
-        # 回転
-        rotated_surf = pygame.transform.rotate(text_surf, -self.angle)
-        # 回転後の矩形取得（中心は self.position）
-        rect = rotated_surf.get_rect(midleft=self.position)
-        # 点が矩形内にあるか判定
-        return rect.collidepoint(p)
+        # 回転後の矩形（描画と共有のキャッシュ、左端中央が self.position）
+        return self._rect(font_path).collidepoint(p)
 
 
 # -----------------------------
 # 回転四角形クラス（マップ上オブジェクト）
 # -----------------------------
 class RotatingRect:
+    # 変更通知つき属性（ObjectList の observer へ通知）
+    # 位置・大きさ・角度と数値の属性は rect_store の列に置き、インスタンスは行番号 _row だけ持つ
+    no = _TrackedAttr()
+    name = _TrackedAttr(intern=True)
+    name_pos = _TrackedAttr()
+    name_color = _TrackedAttr()
+    name_angle = _TrackedAttr()
+    font_size = _TrackedAttr()
+    power = _ColumnAttr("power")
+    center = _PairColumnAttr("cx", "cy")
+    size = _PairColumnAttr("w", "h")
+    color = _TrackedAttr()
+    angle = _ColumnAttr("angle")
+    classification = _TrackedAttr(intern=True)
+    tent = _ColumnAttr("tent")
+    light = _ColumnAttr("light")
+
+    # 当たり判定範囲に影響する属性
+    BOUNDS_ATTRS = ("center", "size", "angle")
+
     def __init__(
             self, 
             no=0, 
@@ -559,6 +955,8 @@ class RotatingRect:
             tent=0,
             light=0,
             ):
+        self._row = rect_store.alloc()
+        self._owner = None
         self.no = no
         self.name = name
         self.name_pos = tuple(name_pos)
@@ -576,24 +974,29 @@ class RotatingRect:
         self.name_pos_active = name_pos_active
         self.tent = tent
         self.light = light
-
-        self._cache_rect_img = None
-        self._cache_rect_angle = None
-        self._cache_rect_color = None
-        self._cache_name_img = None
-        self._cache_name_angle = None
-        self._cache_name_color = None
-        self._cache_name_pos_active = None
-        self._cache_no_font = None
-        self._cache_no_font_size = None
-        self._cache_name_font = None
-        self._cache_name_font_size = None
-        self._cache_categories = None
-        self._cache_center = None
-        self._cache_categories = None
-        self._cache_center = None
-        self._cache_categories = None
-        self.prev_dirty = []
+        # 描画・カテゴリのキャッシュ（_cache_*）は使うときに作る
+
+    def __del__(self):
+        row = self.__dict__.get("_row")
+        if row is not None:
+            rect_store.release(row)
+        # 持っているフォントの参照を返す（参照が無くなったサイズは FontRegistry から外れる）
+        if self.__dict__.get("_cache_no_font") is not None:
+            fonts.release(self._cache_no_font_size)
+        if self.__dict__.get("_cache_name_font") is not None:
+            fonts.release(self._cache_name_font_size)
+
+    def mark_dirty(self, attr=None):
+        """属性変更を所属リストに通知"""
+        if self._owner is not None:
+            self._owner.object_changed(self, attr)
+
+    def get_bounds(self):
+        """回転後の四角形の外接矩形 (x0, y0, x1, y1)"""
+        pts = get_rotated_rect_points(self.center, self.size, self.angle)
+        xs = [p[0] for p in pts]
+        ys = [p[1] for p in pts]
+        return (min(xs), min(ys), max(xs), max(ys))
 
     def to_dict(self):
         """JSON保存用"""
@@ -621,6 +1024,7 @@ class RotatingRect:
             no=d.get("no",0),  # 番号
             name=d.get("name","rect"),  # 名前
             name_pos=tuple(d.get("name_pos",(0,0))), # 名前位置
+            name_color=tuple(d.get("name_color",(0,0,0))), # 名前の色
             name_angle=d.get("name_angle",0), # 名前角度
             font_size=d.get("font_size",0), #フォントサイズ
             power=d.get("power",0),  # パワー
@@ -634,10 +1038,17 @@ class RotatingRect:
         )
 
     @classmethod
-    def save_rects_as_csv(cls, rects, categories, point_in_category, output_csv_path="rects_for_input.csv"):
-        """rects に category を追加して CSV に保存"""
-        for r in rects:
-            cats = [cat.name for cat in categories if point_in_category(r.center, cat)]
+    @tracer.traced(cat="io")
+    def save_rects_as_csv(cls, rects, categories, point_in_category=None, output_csv_path="rects_for_input.csv"):
+        """
+        rects に category を追加して CSV に保存
+        point_in_category 省略時は batch_geometry で一括判定
+        """
+        if point_in_category is None:
+            cats_list = category_membership(rect_store.centers(rects), categories)
+        else:
+            cats_list = [[cat.name for cat in categories if point_in_category(r.center, cat)] for r in rects]
+        for r, cats in zip(rects, cats_list):
             r.category = ", ".join(cats) if cats else ""
 
         # CSV 出力
@@ -665,8 +1076,21 @@ class RotatingRect:
         print(f"Saved CSV -> {output_csv_path}")
 
 
-    def draw_rects(self, screen, font, is_active=False, name_pos_active=False, tent_highlight=False):
+    def draw_rects(self, screen, font, is_active=False, name_pos_active=False, tent_highlight=False, lod=None, xf=None):
+        """
+        ブース描画（本体・No・名前・枠）。戻り値は描画範囲のリスト
+        lod: LabelLod（縮小表示で読めない No・名前は描かない）
+        xf : ViewTransform（ネイティブ解像度描画。位置・大きさ・文字を拡大縮小して描く）
+        """
         dirty = []
+        tier = lod.tier(self) if lod is not None else LabelLod.FULL
+        if xf is None:
+            center, size, name_pos, name_font_size = self.center, self.size, self.name_pos, self.font_size
+        else:
+            center = xf.point(self.center)
+            size = xf.size(self.size)
+            name_pos = xf.size(self.name_pos)
+            name_font_size = xf.font_size(self.font_size)
 
         # --- rect の色決定 ---
         comp_color = (255 - self.color[0], 255 - self.color[1], 255 - self.color[2])
@@ -677,127 +1101,113 @@ class RotatingRect:
         else:
             rect_color = self.color   # 通常 → 元の色
 
-        # --- 四角形画像キャッシュ ---
-        angle_changed = (self.angle != self._cache_rect_angle)
-        size_changed = (self.size != getattr(self, "_cache_size", None))
-        prev = getattr(self, "_cache_rect_color", None)
-        color_changed = (rect_color != prev)
-
-        if self._cache_rect_img is None or angle_changed or size_changed or color_changed:
-            base = pygame.Surface(self.size, pygame.SRCALPHA)
-            base.fill(rect_color)
-            rotated = pygame.transform.rotate(base, -self.angle)
-            
-            self._cache_rect_img = rotated
-            self._cache_rect_angle = self.angle
-            self._cache_size = self.size
-            self._cache_rect_color = rect_color
-
-        rect = self._cache_rect_img.get_rect(center=self.center)
-        screen.blit(self._cache_rect_img, rect)
+        # --- 四角形画像（同じ size / 色 / 角度のブースで共有） ---
+        angle = self.angle  # degree（center / size / angle は rect_store の列から読むので1回だけ）
+        sprite = rect_sprites.get(size, rect_color, angle)
+        rect = sprite.get_rect(center=center)
+        screen.blit(sprite, rect)
         dirty.append(rect)
         self._last_rect = rect
 
 
-        # --- No テキストは毎フレームでOK（軽量） ---
-        brightness = sum(self.color)/3
-        no_color = (0,0,0) if brightness > 128 else (255,255,255)
-
-        # no_font = pygame.font.Font(font_path, int(self.size[1] * 0.75))
-        # no_text = no_font.render(str(self.no), True, no_color)
-
-        # --- No フォントキャッシュ ---
-        no_font_size = int(self.size[1] * 0.75)
-
-        if (
-            not hasattr(self, "_cache_no_font")
-            or self._cache_no_font is None
-            or self._cache_no_font_size != no_font_size
-        ):
-            self._cache_no_font = pygame.font.Font(font_path, no_font_size)
-            self._cache_no_font_size = no_font_size
+        if tier >= LabelLod.NUMBER:
+            # --- No テキストは毎フレームでOK（軽量） ---
+            brightness = sum(self.color)/3
+            no_color = (0,0,0) if brightness > 128 else (255,255,255)
 
-        no_text = self._cache_no_font.render(str(self.no), True, no_color)
+            # no_font = pygame.font.Font(font_path, int(self.size[1] * 0.75))
+            # no_text = no_font.render(str(self.no), True, no_color)
 
-        no_text_rect = no_text.get_rect(center=self.center)
-        screen.blit(no_text, no_text_rect)
-        dirty.append(no_text_rect)
+            # --- No フォントキャッシュ ---
+            no_font_size = int(size[1] * 0.75)
 
-
-        # --- 名前ブロック画像キャッシュ ---
-        name_changed = (
-            self.name != getattr(self, "_cache_name_txt", None)
-            or self.font_size != getattr(self, "_cache_font_size", None)
-            or name_pos_active != getattr(self, "_cache_name_pos_active", None)
-            or self.name_angle != self._cache_name_angle
-        )
-
-        # 色設定
-        if is_active and name_pos_active:
-            name_color = (0, 0, 255) # →青
-        else:
-            name_color = self.name_color
-
-        # --- 名前テキスト画像キャッシュ判定 ---
-        name_changed = (
-            self._cache_name_img is None
-            or name_color != getattr(self, "_cache_name_color", None)
-            or self.name != getattr(self, "_cache_name_text", None)
-            or self.font_size != getattr(self, "_cache_name_font_size", None)
-            or name_pos_active != getattr(self, "_cache_name_pos_active", None)
-        )
-
-        # 生成
-        # if name_changed:
-        #     name_font = pygame.font.Font(font_path, self.font_size)
-        #     name_str = self.name.replace("\\n", "\n")
-        #     lines = name_str.split("\n")
-        #     surfaces = [name_font.render(line, True, name_color) for line in lines]
-        if name_changed:
-            # --- name フォントキャッシュ ---
             if (
-                not hasattr(self, "_cache_name_font")
-                or self._cache_name_font is None
-                or self._cache_name_font_size != self.font_size
+                not hasattr(self, "_cache_no_font")
+                or self._cache_no_font is None
+                or self._cache_no_font_size != no_font_size
             ):
-                self._cache_name_font = pygame.font.Font(font_path, self.font_size)
-                self._cache_name_font_size = self.font_size
-
-            name_font = self._cache_name_font
-
-            name_str = self.name.replace("\\n", "\n")
-            lines = name_str.split("\n")
-            surfaces = [name_font.render(line, True, name_color) for line in lines]
+                if getattr(self, "_cache_no_font", None) is not None:
+                    fonts.release(self._cache_no_font_size)
+                self._cache_no_font = fonts.acquire(no_font_size)
+                self._cache_no_font_size = no_font_size
 
-            line_spacing = int(self.font_size * -0.5)
-            w = max(s.get_width() for s in surfaces)
-            h = sum(s.get_height() for s in surfaces) + line_spacing * (len(lines)-1)
+            no_text = text_surfaces.render(self._cache_no_font, str(self.no), True, no_color)
 
-            block = pygame.Surface((w, h), pygame.SRCALPHA)
-            y = 0
-            for s in surfaces:
-                block.blit(s, (0, y))
-                y += s.get_height() + line_spacing
+            no_text_rect = no_text.get_rect(center=center)
+            screen.blit(no_text, no_text_rect)
+            dirty.append(no_text_rect)
 
-            rotated_block = pygame.transform.rotate(block, self.name_angle)
 
-            self._cache_name_img = rotated_block
-            self._cache_name_txt = self.name
-            self._cache_font_size = self.font_size
-            self._cache_name_angle = self.name_angle
-            self._cache_name_pos_active = name_pos_active
-
-
-        if getattr(self, "_cache_name_img", None):
-            block_rect = self._cache_name_img.get_rect(
-                topleft=(self.center[0] + self.name_pos[0], self.center[1] + self.name_pos[1])
+        if tier >= LabelLod.FULL:
+            # 色設定
+            if is_active and name_pos_active:
+                name_color = (0, 0, 255) # →青
+            else:
+                name_color = self.name_color
+
+            # --- 名前テキスト画像キャッシュ判定 ---
+            name_changed = (
+                getattr(self, "_cache_name_img", None) is None
+                or name_color != getattr(self, "_cache_name_color", None)
+                or self.name != getattr(self, "_cache_name_txt", None)
+                or name_font_size != getattr(self, "_cache_font_size", None)
+                or self.name_angle != getattr(self, "_cache_name_angle", None)
             )
-            screen.blit(self._cache_name_img, block_rect)
-            dirty.append(block_rect)
-            self._last_name_rect = block_rect
+
+            # 生成
+            # if name_changed:
+            #     name_font = pygame.font.Font(font_path, self.font_size)
+            #     name_str = self.name.replace("\\n", "\n")
+            #     lines = name_str.split("\n")
+            #     surfaces = [name_font.render(line, True, name_color) for line in lines]
+            if name_changed:
+                # --- name フォントキャッシュ ---
+                if (
+                    not hasattr(self, "_cache_name_font")
+                    or self._cache_name_font is None
+                    or self._cache_name_font_size != name_font_size
+                ):
+                    if getattr(self, "_cache_name_font", None) is not None:
+                        fonts.release(self._cache_name_font_size)
+                    self._cache_name_font = fonts.acquire(name_font_size)
+                    self._cache_name_font_size = name_font_size
+
+                name_font = self._cache_name_font
+
+                name_str = self.name.replace("\\n", "\n")
+                lines = name_str.split("\n")
+                surfaces = [text_surfaces.render(name_font, line, True, name_color) for line in lines]
+
+                line_spacing = int(name_font_size * -0.5)
+                w = max(s.get_width() for s in surfaces)
+                h = sum(s.get_height() for s in surfaces) + line_spacing * (len(lines)-1)
+
+                block = pygame.Surface((w, h), pygame.SRCALPHA)
+                y = 0
+                for s in surfaces:
+                    block.blit(s, (0, y))
+                    y += s.get_height() + line_spacing
+
+                rotated_block = pygame.transform.rotate(block, self.name_angle)
+
+                self._cache_name_img = rotated_block
+                self._cache_name_txt = self.name
+                self._cache_font_size = name_font_size
+                self._cache_name_angle = self.name_angle
+                self._cache_name_color = name_color
+
+
+            if getattr(self, "_cache_name_img", None):
+                block_rect = self._cache_name_img.get_rect(
+                    topleft=(center[0] + name_pos[0], center[1] + name_pos[1])
+                )
+                screen.blit(self._cache_name_img, block_rect)
+                dirty.append(block_rect)
+                self._last_name_rect = block_rect
 
         # --- テント枠描画（tent > is_active > 通常） ---
-        if getattr(self, "tent", 0) and int(self.tent) > 0 and tent_highlight:
+        tent = getattr(self, "tent", 0)
+        if tent and int(tent) > 0 and tent_highlight:
             outline_color = (255, 0, 0)
             outline_width = 3
         elif is_active:
@@ -809,9 +1219,7 @@ class RotatingRect:
 
         # --- 回転枠描画 ---
         if outline_color is not None:
-            # 回転前サイズを保持している前提
-            size = self.size            # (w, h)
-            angle = self.angle          # degree
+            # 回転前サイズを保持している前提（size は拡大縮小後）
             center = rect.center        # blit後の中心
 
             points = get_rotated_rect_points(center, size, angle)
@@ -833,6 +1241,8 @@ class RotatingRect:
 
     def contains_point(self, p):
         """内部座標系での四角形クリック判定（回転対応）"""
+        if rect_store.plain(self._row):
+            return rect_store.contains_point(self._row, p)  # 列から直接（同じ計算）
         px, py = p
         cx, cy = self.center
         w, h = self.size
@@ -857,7 +1267,7 @@ class RotatingRect:
         """
         Rect が属するカテゴリ名リストを返す（キャッシュあり）
         """
-        if self._cache_center == self.center:
+        if getattr(self, "_cache_center", None) == self.center:
             return self._cache_categories
 
         cats = [
@@ -920,9 +1330,7 @@ class RotatingRect:
 
         for r in rects:
             # --- 本体描画（回転） ---
-            surf = pygame.Surface(r.size, pygame.SRCALPHA)
-            surf.fill(r.color)
-            rot_surf = pygame.transform.rotate(surf, -r.angle)
+            rot_surf = rect_sprites.get(r.size, r.color, r.angle)
             rect = rot_surf.get_rect(center=r.center)
             screen.blit(rot_surf, rect)
             dirty.append(rect)
@@ -948,14 +1356,8 @@ class RotatingRect:
 
             # --- 名前描画 ---
             if r.name:
-                key = (r.font_size, r.name, r.name_color)
-                if key not in font_cache:
-                    font = pygame.font.SysFont(None, r.font_size)
-                    font_cache[key] = font.render(r.name, True, r.name_color)
-
-                name_surf = font_cache[key]
-                if r.name_angle != 0:
-                    name_surf = pygame.transform.rotate(name_surf, -r.name_angle)
+                font = fonts.get(r.font_size, None)
+                name_surf = text_surfaces.render(font, r.name, True, r.name_color, -r.name_angle)
 
                 name_rect = name_surf.get_rect(
                     center=(r.center[0] + r.name_pos[0],
@@ -970,6 +1372,16 @@ class RotatingRect:
 # ポリゴンクラス（マップ上オブジェクト）
 # -----------------------------
 class PolygonShape:
+    # 変更通知つき属性（ObjectList の observer へ通知）
+    # points をその場で書き換えたときは mark_dirty("points") を呼ぶ
+    points = _TrackedAttr()
+    color = _TrackedAttr()
+    width = _TrackedAttr()
+    show_vertices = _TrackedAttr()
+
+    # 当たり判定範囲に影響する属性
+    BOUNDS_ATTRS = ("points", "width")
+
     def __init__(
         self,
         points=[(100,200), (200,100)],
@@ -977,6 +1389,7 @@ class PolygonShape:
         width=3,
         show_vertices=True,
     ):
+        self._owner = None
         self.points = list(points)        # [(x, y), ...]
         self.color = tuple(color)
         self.width = width
@@ -994,6 +1407,20 @@ class PolygonShape:
         self.visible = True
         self.prev_dirty = []
 
+    def mark_dirty(self, attr=None):
+        """属性変更を所属リストに通知"""
+        if self._owner is not None:
+            self._owner.object_changed(self, attr)
+
+    def get_bounds(self, tolerance=6):
+        """辺クリック判定範囲の外接矩形 (x0, y0, x1, y1)"""
+        if not self.points:
+            return (0, 0, 0, 0)
+        xs = [p[0] for p in self.points]
+        ys = [p[1] for p in self.points]
+        pad = tolerance + self.width
+        return (min(xs) - pad, min(ys) - pad, max(xs) + pad, max(ys) + pad)
+
     def stop_dragging(self):
         self.dragging = False
         self.dragging_polygon = False
@@ -1027,6 +1454,7 @@ class PolygonShape:
         selected_vertex=None,
         show_vertices=None,
         show_vertex_index=False,
+        xf=None,
     ):
         if not self.visible or not self.points:
             return []
@@ -1034,11 +1462,18 @@ class PolygonShape:
         if show_vertices is None:
             show_vertices = self.show_vertices
 
+        # ネイティブ解像度描画（ViewTransform）では頂点・線幅を拡大縮小
+        if xf is None:
+            points, width = self.points, self.width
+        else:
+            points = [xf.point(p) for p in self.points]
+            width = xf.width(self.width)
+
         dirty = []
 
         # --- 描画範囲算出 ---
-        xs = [p[0] for p in self.points]
-        ys = [p[1] for p in self.points]
+        xs = [p[0] for p in points]
+        ys = [p[1] for p in points]
         min_x, max_x = min(xs), max(xs)
         min_y, max_y = min(ys), max(ys)
 
@@ -1056,8 +1491,8 @@ class PolygonShape:
             draw_surface,
             col,
             False,
-            self.points,
-            self.width
+            points,
+            width
         )
 
         # --- 頂点描画 ---
@@ -1066,7 +1501,7 @@ class PolygonShape:
             if selected_vertex:
                 pi, selected_vi = selected_vertex
 
-            for i, (x, y) in enumerate(self.points):
+            for i, (x, y) in enumerate(points):
                 # 色決定
                 if selected_vi is not None and i == selected_vi:
                     color = (255, 0, 0)  # 選択頂点：赤
@@ -1083,7 +1518,7 @@ class PolygonShape:
 
         # --- active 時の頂点番号 ---
         if is_active and show_vertex_index:
-            for i, (x, y) in enumerate(self.points):
+            for i, (x, y) in enumerate(points):
                 no_surf = font_path.render(str(i), True, (0, 0, 0))
                 rect = no_surf.get_rect(center=(x, y - 12))
                 draw_surface.blit(no_surf, rect)
@@ -1110,7 +1545,7 @@ class PolygonShape:
 #-----------------------
 # 新規オブジェクト追加関数 右クリックウィンドウからの追加用
 #-----------------------
-def add_rect(rects, active, pos, screen, context_menu=False):
+def add_rect(rects, active, pos, screen, context_menu=False, camera=None):
     name = f"Rect{len(rects)+1}"
 
     if active is None:
@@ -1121,7 +1556,7 @@ def add_rect(rects, active, pos, screen, context_menu=False):
                 size=(25, 25)
             )
         if context_menu:
-            mx, my = convert_mouse_to_draw_coords(pos, screen)
+            mx, my = convert_mouse_to_draw_coords(pos, screen, camera)
 
             new = RotatingRect(
                 name=name,
@@ -1144,10 +1579,10 @@ def add_rect(rects, active, pos, screen, context_menu=False):
     new.name_pos_active = False
     return new
 
-def add_polygon(polygons, active, pos, screen, context_menu=False):
+def add_polygon(polygons, active, pos, screen, context_menu=False, camera=None):
     name = f"Polygon{len(polygons)+1}"
 
-    mx, my = convert_mouse_to_draw_coords(pos, screen)
+    mx, my = convert_mouse_to_draw_coords(pos, screen, camera)
 
     if active is None:
         points = [(mx, my), (mx+100, my+100)]
@@ -1160,11 +1595,11 @@ def add_polygon(polygons, active, pos, screen, context_menu=False):
 
     return new
 
-def add_text(texts, active, pos, screen, context_menu=False):
+def add_text(texts, active, pos, screen, context_menu=False, camera=None):
     no = len(texts)+1
     name = f"Text{len(texts)+1}"
 
-    mx, my = convert_mouse_to_draw_coords(pos, screen)
+    mx, my = convert_mouse_to_draw_coords(pos, screen, camera)
 
     new = TextLabel(
         no=no,
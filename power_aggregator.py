@@ -0,0 +1,240 @@
+from utils import point_in_category as exact_point_in_category
+from batch_geometry import points_in_polygons
+from rect_store import rect_store
+
+
+def parse_power(value):
+    """power を int に変換（変換できなければ 0）"""
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return 0
+
+
+# -----------------------------
+# 電力合計の差分集計
+# -----------------------------
+class PowerAggregator:
+    """
+    カテゴリ別電力合計・カテゴリなし合計・総電力を保持し、
+    rect の移動（カテゴリ変更）・power 変更・追加・削除の差分だけ反映する。
+    categories_power_list と同じ結果を毎フレーム O(変更数) で返す。
+    あわせて alert カテゴリに入っている rect（ALERT 表示）と classification ごとの数
+    （count_total_by_classification）も同じ差分で持つ。
+
+    rects（ObjectList）の observer として登録して使う:
+        agg = PowerAggregator(point_in_category)
+        agg.sync_categories(categories)
+        rects.add_observer(agg)
+    """
+
+    WATCH_ATTRS = ("center", "power", "classification")
+
+    def __init__(self, point_in_category=exact_point_in_category):
+        self.point_in_category = point_in_category
+
+        self.sorted_categories = []
+        self.power_totals = {}   # カテゴリ名 -> 電力合計
+        self.counts = {}         # カテゴリ名 -> rect 数
+        self.no_cat_total = 0
+        self.total_power = 0
+        self.revision = 0        # 集計が変わるたびに +1
+
+        self.alert_categories = []
+        self.alerts = {}         # rect -> 入っている alert カテゴリ名tuple（入っていない rect は持たない）
+        self.alert_revision = 0  # alerts が変わるたびに +1
+        self.class_counts = {}   # classification -> rect 数
+
+        self._contrib = {}       # rect -> (power, カテゴリ名tuple)
+        self._class = {}         # rect -> classification
+        self._alert_cache = (None, [])  # (alert_revision, alert_names の結果)
+        self._cat_signature = None
+
+    # -----------------------------
+    # カテゴリ
+    # -----------------------------
+    @staticmethod
+    def _category_signature(categories):
+        return tuple(
+            (id(c), c.name, c.power_limit, bool(c.alert), tuple(tuple(p) for p in c.points))
+            for c in categories
+        )
+
+    def sync_categories(self, categories):
+        """カテゴリが変わっていたら全体を集計し直す"""
+        signature = self._category_signature(categories)
+        if signature == self._cat_signature:
+            return False
+        self._cat_signature = signature
+
+        # categories_power_list と同じ: alert 除外、(name, power_limit) で重複排除、name 順
+        unique = {}
+        for cc in categories:
+            if getattr(cc, "alert", False):
+                continue
+            key = (cc.name, cc.power_limit)
+            if key not in unique:
+                unique[key] = cc
+        self.sorted_categories = sorted(unique.values(), key=lambda cc: cc.name)
+        self.alert_categories = [cc for cc in categories if getattr(cc, "alert", False)]
+
+        self.rebuild(list(self._contrib))
+        return True
+
+    # -----------------------------
+    # 集計
+    # -----------------------------
+    def rebuild(self, rects):
+        """全 rect をまとめて集計し直す（カテゴリ判定は batch_geometry で一括）"""
+        rects = list(rects)
+        self.power_totals = {cc.name: 0 for cc in self.sorted_categories}
+        self.counts = {cc.name: 0 for cc in self.sorted_categories}
+        self.no_cat_total = 0
+        self.total_power = 0
+        self.alerts = {}
+        self.class_counts = {}
+        self._contrib = {}
+        self._class = {}
+
+        names = [cc.name for cc in self.sorted_categories]
+        alert_names = [cc.name for cc in self.alert_categories]
+        matrix = points_in_polygons(rect_store.centers(rects), self.sorted_categories + self.alert_categories)
+        for r, row in zip(rects, matrix):
+            row = list(row)
+            contrib = (parse_power(r.power), tuple(n for n, hit in zip(names, row) if hit))
+            self._contrib[r] = contrib
+            self._apply(contrib, +1)
+            alerts = tuple(n for n, hit in zip(alert_names, row[len(names):]) if hit)
+            if alerts:
+                self.alerts[r] = alerts
+            self._count_class(r)
+        self.revision += 1
+        self.alert_revision += 1
+
+    def _contribution(self, r):
+        names = tuple(
+            cc.name for cc in self.sorted_categories
+            if self.point_in_category(r.center, cc)
+        )
+        return parse_power(r.power), names
+
+    def _alert_names(self, r):
+        return tuple(cc.name for cc in self.alert_categories if self.point_in_category(r.center, cc))
+
+    def _set_alerts(self, r, alerts):
+        if alerts == self.alerts.get(r, ()):
+            return
+        if alerts:
+            self.alerts[r] = alerts
+        else:
+            del self.alerts[r]
+        self.alert_revision += 1
+
+    def _count_class(self, r):
+        """空の classification は数えない（count_total_by_classification と同じ）"""
+        key = r.classification
+        self._class[r] = key
+        if key:
+            self.class_counts[key] = self.class_counts.get(key, 0) + 1
+
+    def _uncount_class(self, r):
+        key = self._class.pop(r, None)
+        if key:
+            self.class_counts[key] -= 1
+            if not self.class_counts[key]:
+                del self.class_counts[key]
+
+    def _apply(self, contrib, sign):
+        power, names = contrib
+        self.total_power += sign * power
+        if not names:
+            self.no_cat_total += sign * power
+        else:
+            for name in names:
+                self.power_totals[name] += sign * power
+                self.counts[name] += sign
+
+    def _add(self, r):
+        contrib = self._contribution(r)
+        self._contrib[r] = contrib
+        self._apply(contrib, +1)
+        self._set_alerts(r, self._alert_names(r))
+        self._count_class(r)
+
+    def _remove(self, r):
+        if r in self.alerts:
+            del self.alerts[r]
+            self.alert_revision += 1
+        self._uncount_class(r)
+        contrib = self._contrib.pop(r, None)
+        if contrib is not None:
+            self._apply(contrib, -1)
+
+    # -----------------------------
+    # ObjectList observer
+    # -----------------------------
+    def attach(self, rects):
+        """登録時の初期集計（ObjectList.add_observer から呼ばれる）"""
+        self.rebuild(rects)
+
+    def object_added(self, r):
+        self._remove(r)
+        self._add(r)
+        self.revision += 1
+
+    def object_removed(self, r):
+        self._remove(r)
+        self.revision += 1
+
+    def object_changed(self, r, attr):
+        if attr is not None and attr not in self.WATCH_ATTRS:
+            return
+        old = self._contrib.get(r)
+        if old is None:
+            return
+        if attr in (None, "center"):
+            self._set_alerts(r, self._alert_names(r))
+        if attr in (None, "classification") and r.classification != self._class.get(r):
+            self._uncount_class(r)
+            self._count_class(r)
+            self.revision += 1
+        if attr == "classification":
+            return
+        new = self._contribution(r)
+        if new == old:
+            return
+        self._apply(old, -1)
+        self._apply(new, +1)
+        self._contrib[r] = new
+        self.revision += 1
+
+    def objects_reordered(self, rects):
+        """ALERT 表示はリストの並び順なので、alert に入っている rect が動いたら作り直す"""
+        if any(r in self.alerts for r in rects):
+            self.alert_revision += 1
+
+    # -----------------------------
+    # 参照
+    # -----------------------------
+    def power_list(self):
+        """categories_power_list と同じ形 (power_totals, sorted_categories)"""
+        return dict(self.power_totals), list(self.sorted_categories)
+
+    def alert_names(self, rects):
+        """
+        ALERT 表示のカテゴリ名リスト（rects の順に、入っている alert カテゴリ名を並べる。従来の毎フレームの計算と同じ）
+        alerts が変わったときだけ作り直す
+        """
+        revision, names = self._alert_cache
+        if revision != self.alert_revision:
+            names = [] if not self.alerts else [n for r in rects for n in self.alerts.get(r, ())]
+            self._alert_cache = (self.alert_revision, names)
+        return names
+
+    def classification_counts(self):
+        """count_total_by_classification と同じ形"""
+        return dict(self.class_counts)
+
+    def used_totals(self):
+        """rect が1つ以上あるカテゴリだけの合計（電力表用）"""
+        return {name: power for name, power in self.power_totals.items() if self.counts.get(name)}
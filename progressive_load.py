@@ -0,0 +1,210 @@
+import json
+import os
+import queue
+import re
+import threading
+import time
+
+import config
+from journal import journal_path
+from tcbf_format import is_binary, TcbfReader
+
+
+# 先に届ける順（操作に要る categories のあとは描く重なり順。足した分を上から描き足すだけで済む）
+KIND_ORDER = ("categories", "rects", "polygons", "texts")
+
+_WS = re.compile(r"[ \t\n\r]*")
+_decoder = json.JSONDecoder()
+
+
+# -----------------------------
+# JSON を前から少しずつ読む
+# -----------------------------
+def iter_json_sections(text, chunk):
+    """
+    最上位が {"キー": [...], ...} の JSON を前から読み、(キー, 値のリスト, 読んだ位置) を返す。
+    リストは chunk 個ずつに分けて返す（要素ごとに raw_decode するので、
+    json.loads と違って途中でほかのスレッドに GIL を渡せる）。リストでない値は [値] で返す
+    """
+    def skip(pos):
+        return _WS.match(text, pos).end()
+
+    def expect(pos, char):
+        if text[pos:pos + 1] != char:
+            raise json.JSONDecodeError(f"Expecting '{char}'", text, pos)
+        return skip(pos + 1)
+
+    pos = expect(skip(0), "{")
+    if text[pos:pos + 1] == "}":
+        return
+    while True:
+        key, pos = _decoder.raw_decode(text, pos)
+        pos = expect(skip(pos), ":")
+        if text[pos:pos + 1] != "[":
+            value, pos = _decoder.raw_decode(text, pos)
+            yield key, [value], pos
+        else:
+            pos = skip(pos + 1)
+            items = []
+            if text[pos:pos + 1] == "]":
+                pos = skip(pos + 1)
+            else:
+                while True:
+                    value, pos = _decoder.raw_decode(text, pos)
+                    items.append(value)
+                    pos = skip(pos)
+                    if len(items) >= chunk:
+                        yield key, items, pos
+                        items = []
+                    if text[pos:pos + 1] == "]":
+                        pos = skip(pos + 1)
+                        break
+                    pos = expect(pos, ",")
+            yield key, items, pos
+        pos = skip(pos)
+        if text[pos:pos + 1] == "}":
+            return
+        pos = expect(pos, ",")
+
+
+# -----------------------------
+# 段階的な読み込み
+# -----------------------------
+class IncrementalLoad:
+    """
+    ワーカースレッドでマップファイルを読み、オブジェクトを chunk 個ずつキューに入れる
+    （DataManager.load_incremental が作る）。
+
+    map_mode は毎フレーム chunks() で届いた分を受け取って ObjectList に足す。
+    categories を先に届けるので、揃った時点で操作できる。そのあとは rects / polygons / texts の
+    重なり順（DataManager の保存はこの順に書く。古い並びの JSON でも届いた順に足せば同じ結果になる）。
+
+    progress : 0.0 - 1.0（JSON は読んだバイト数、.tcbf は行数の割合）
+    loaded   : chunks() で渡したオブジェクトの数
+    done     : 全部渡し終えた
+    ジャーナルが残っているとき（前回落ちた）は再生が全体に掛かるので、全部読んでから同じ順に渡す。
+    """
+
+    def __init__(self, path, classes, read_model, chunk=None):
+        self.path = path
+        self.classes = classes          # {"rects": RotatingRect, ...}
+        self.read_model = read_model    # path -> {"rects": [...], ...}（ジャーナルの再生込み）
+        self.chunk = config.LOAD_CHUNK if chunk is None else chunk
+        self.progress = 0.0
+        self.loaded = 0
+        self.done = False
+        self.error = None
+        self._queue = queue.Queue()
+        self._cancelled = False
+        self._finished = object()  # ワーカーの終わりの印
+        self._started = time.perf_counter()
+
+        # 計測用
+        self.elapsed = None
+
+        self._thread = threading.Thread(target=self._run, name="IncrementalLoad", daemon=True)
+        self._thread.start()
+
+    # -----------------------------
+    # フレームスレッド側
+    # -----------------------------
+    def chunks(self, wait=0.0):
+        """
+        届いている (kind, objs) を順に返す。次が届いていなければ wait 秒まで待つ
+        （None なら読み終わるまで待って全部返す）。途中でやめても残りは次の呼び出しで返す
+        """
+        deadline = None if wait is None else time.perf_counter() + wait
+        while not self.done:
+            try:
+                if deadline is None:
+                    item = self._queue.get()
+                else:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.perf_counter()))
+            except queue.Empty:
+                return
+            if item is self._finished:
+                self.done = True
+                self.elapsed = time.perf_counter() - self._started
+                return
+            self.loaded += len(item[1])
+            yield item
+
+    def cancel(self):
+        """モードを抜けたとき（読み終わっていなくてもワーカーを止める）"""
+        self._cancelled = True
+
+    # -----------------------------
+    # ワーカー
+    # -----------------------------
+    def _put(self, kind, records):
+        cls = self.classes[kind]
+        self._queue.put((kind, [cls.from_dict(d) for d in records]))
+
+    def _run(self):
+        try:
+            if os.path.exists(journal_path(self.path)):
+                self._run_model(self.read_model(self.path))
+            elif is_binary(self.path):
+                self._run_tcbf()
+            else:
+                self._run_json()
+            print("Loaded all ->", self.path)
+        except (OSError, ValueError) as e:
+            self.error = str(e)
+            print("読み込み失敗:", self.path, e)
+        finally:
+            self.progress = 1.0
+            self._queue.put(self._finished)
+
+    def _run_model(self, model):
+        for kind in KIND_ORDER:
+            objs = model.get(kind, [])
+            for i in range(0, len(objs), self.chunk):
+                if self._cancelled:
+                    return
+                self._queue.put((kind, objs[i:i + self.chunk]))
+
+    def _run_tcbf(self):
+        with TcbfReader(self.path) as reader:
+            total = sum(reader.count(kind) for kind in KIND_ORDER) or 1
+            done = 0
+            for kind in KIND_ORDER:
+                batch = []
+                for record in reader.records(kind):
+                    batch.append(record)
+                    if len(batch) >= self.chunk:
+                        if self._cancelled:
+                            return
+                        self._put(kind, batch)
+                        done += len(batch)
+                        self.progress = done / total
+                        batch = []
+                if batch:
+                    self._put(kind, batch)
+                    done += len(batch)
+                    self.progress = done / total
+
+    def _run_json(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            text = f.read()
+        size = len(text) or 1
+        for key, items, pos in iter_json_sections(text, self.chunk):
+            if self._cancelled:
+                return
+            if key in self.classes and items:
+                self._put(key, items)
+            self.progress = pos / size
+
+
+# -----------------------------
+# 進み具合の表示
+# -----------------------------
+def draw_load_progress(surface, font, loader, width=240):
+    """左下に進み具合のバーと、足し終えたオブジェクトの数を描く"""
+    x, y = 10, surface.get_height() - 20
+    surface.fill((200, 200, 200), (x, y, width, 6))
+    filled = int(width * loader.progress)
+    if filled > 0:
+        surface.fill((60, 120, 220), (x, y, filled, 6))
+    label = font.render(f"Loading... {int(loader.progress * 100)}%  ({loader.loaded:,} objects)", True, (0, 0, 0))
+    surface.blit(label, (x, y - label.get_height() - 2))
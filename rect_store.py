@@ -0,0 +1,224 @@
+import math
+import threading
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # NumPy が無ければ array のまま Python で計算
+    np = None
+
+
+# 列（RotatingRect の center / size / angle / power / tent / light）
+COLUMNS = ("cx", "cy", "w", "h", "angle", "power", "tent", "light")
+
+# 行ごとの値の型（読み出したときに代入したときと同じ型で返す）
+FLOAT, INT, OTHER = 0, 1, 2
+
+_EXACT_INT = 2 ** 53  # これを超える int は float で表せないので OTHER
+
+
+# -----------------------------
+# 四角形の列ストア
+# -----------------------------
+class RectStore:
+    """
+    RotatingRect の数値属性を列（array('d')）にまとめて持つ。
+    RotatingRect は行番号（_row）だけを持ち、属性の読み書きはこの列を通す（objects._ColumnAttr / _PairColumnAttr）。
+
+    cols  : 列名 -> array('d')（行の並びはオブジェクトの作成順。リストの並びとは関係ない）
+    kinds : 列名 -> array('B')（FLOAT / INT / OTHER）
+    other : (列名, 行) -> 値（数値でない値や bool・タプルでない center など。そのまま返す）
+
+    行は alloc で取り、RotatingRect が消えたら release で返す（空き行は使い回す）。
+    centers / bounds などの一括版は列をそのまま読むので、オブジェクトごとの属性読み出しが要らない。
+    NumPy があれば ndarray で、無ければ list で計算する（結果は同じ）。
+    """
+
+    def __init__(self):
+        self.cols = {name: array("d") for name in COLUMNS}
+        self.kinds = {name: array("B") for name in COLUMNS}
+        self.other = {}
+        self._free = []
+        # 列を伸ばす間と、列を ndarray で参照している間（伸ばせない）を排他にする
+        # （段階的な読み込みのワーカーも行を取る）
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        """使用中の行数"""
+        return len(self.cols["cx"]) - len(self._free)
+
+    # -----------------------------
+    # 行
+    # -----------------------------
+    def alloc(self):
+        try:
+            return self._free.pop()
+        except IndexError:
+            pass
+        with self._lock:
+            row = len(self.cols["cx"])
+            for col in self.cols.values():
+                col.append(0.0)
+            for kinds in self.kinds.values():
+                kinds.append(FLOAT)
+        return row
+
+    def release(self, row):
+        for name, kinds in self.kinds.items():
+            if kinds[row] == OTHER:
+                self.other.pop((name, row), None)
+                kinds[row] = FLOAT
+        self._free.append(row)
+
+    # -----------------------------
+    # 1つの値
+    # -----------------------------
+    def get(self, name, row):
+        kind = self.kinds[name][row]
+        if kind == FLOAT:
+            return self.cols[name][row]
+        if kind == INT:
+            return int(self.cols[name][row])
+        return self.other[(name, row)]
+
+    def put(self, name, row, value):
+        kinds = self.kinds[name]
+        if kinds[row] == OTHER:
+            del self.other[(name, row)]
+        kind = _kind(value)
+        if kind == OTHER:
+            self.other[(name, row)] = value
+            value = 0.0
+        self.cols[name][row] = value
+        kinds[row] = kind
+
+    def get_pair(self, x, y, row):
+        """(x, y) のタプル（タプルで代入されなかった値は other にそのまま置いてある）"""
+        kind = self.kinds[x][row]
+        if kind == OTHER:
+            return self.other[(x, row)]
+        vx = self.cols[x][row]
+        vy = self.cols[y][row]
+        return (vx if kind == FLOAT else int(vx), vy if self.kinds[y][row] == FLOAT else int(vy))
+
+    def put_pair(self, x, y, row, value):
+        kinds_x = self.kinds[x]
+        if kinds_x[row] == OTHER:
+            del self.other[(x, row)]
+        if type(value) is tuple and len(value) == 2:
+            kx, ky = _kind(value[0]), _kind(value[1])
+            if kx != OTHER and ky != OTHER:
+                self.cols[x][row], self.cols[y][row] = value
+                kinds_x[row] = kx
+                self.kinds[y][row] = ky
+                return
+        self.other[(x, row)] = value
+        kinds_x[row] = OTHER
+
+    # -----------------------------
+    # 一括（rects は RotatingRect のリスト）
+    # -----------------------------
+    @staticmethod
+    def rows(rects):
+        return [r._row for r in rects]
+
+    def _gather(self, names, rows):
+        """
+        names の列の rows 行を (len(names), N) の float64 配列で返す。
+        あわせて、どれかの列が OTHER（列の値が使えない）の位置のリストも返す
+        """
+        index = np.asarray(rows, dtype=np.intp)
+        with self._lock:  # frombuffer で参照している間は列を伸ばせない
+            values = np.stack([np.frombuffer(self.cols[name], dtype=np.float64)[index] for name in names])
+            other = np.zeros(len(index), dtype=bool)
+            for name in names:
+                other |= np.frombuffer(self.kinds[name], dtype=np.uint8)[index] == OTHER
+        return values, np.flatnonzero(other).tolist()
+
+    def centers(self, rects):
+        """[r.center for r in rects] の一括版（NumPy があれば (N,2) 配列）"""
+        rects = list(rects)
+        if np is None or not rects:
+            return [r.center for r in rects]
+        values, other = self._gather(("cx", "cy"), self.rows(rects))
+        out = values.T.copy()
+        for i in other:
+            out[i] = rects[i].center
+        return out
+
+    def translate(self, rects, dx, dy):
+        """
+        各 rect の center を (dx, dy) ずらす（r.center = (x + dx, y + dy) と同じ値・型・通知）。
+        列に直接書き、タプルを作らない（複数選択の移動）
+        """
+        cx, cy = self.cols["cx"], self.cols["cy"]
+        kx, ky = self.kinds["cx"], self.kinds["cy"]
+        for r in rects:
+            row = r._row
+            if kx[row] == OTHER:
+                x, y = r.center
+                r.center = (x + dx, y + dy)
+                continue
+            x = self.get("cx", row) + dx
+            y = self.get("cy", row) + dy
+            kinds = (_kind(x), _kind(y))
+            if OTHER in kinds:
+                r.center = (x, y)
+                continue
+            cx[row], cy[row] = x, y
+            kx[row], ky[row] = kinds
+            r.__dict__["_saved_dict"] = None
+            r.mark_dirty("center")
+
+    def contains_point(self, row, p):
+        """RotatingRect.contains_point を列から直接（タプルを作らない）"""
+        px, py = p
+        cols = self.cols
+        angle = -math.radians(cols["angle"][row])
+        dx = px - cols["cx"][row]
+        dy = py - cols["cy"][row]
+        rx = dx * math.cos(angle) - dy * math.sin(angle)
+        ry = dx * math.sin(angle) + dy * math.cos(angle)
+        w, h = cols["w"][row], cols["h"][row]
+        return -w / 2 <= rx <= w / 2 and -h / 2 <= ry <= h / 2
+
+    def plain(self, row):
+        """contains_point / bounds を列から計算できる行か（center / size / angle が数値）"""
+        kinds = self.kinds
+        return kinds["cx"][row] != OTHER and kinds["w"][row] != OTHER and kinds["angle"][row] != OTHER
+
+    def bounds(self, rects):
+        """
+        [r.get_bounds() for r in rects] の一括版（SpatialGrid の bulk_bounds）。
+        sin / cos は math で求め、残りを同じ計算順で配列にするので値は get_bounds と一致する
+        """
+        rects = list(rects)
+        if np is None or not rects:
+            return [r.get_bounds() for r in rects]
+        (cx, cy, w, h, angle_deg), other = self._gather(("cx", "cy", "w", "h", "angle"), self.rows(rects))
+        angle = [math.radians(a) for a in angle_deg.tolist()]
+        cos_a = np.array([math.cos(a) for a in angle])
+        sin_a = np.array([math.sin(a) for a in angle])
+        hw, hh = w / 2, h / 2
+        xs = [x * cos_a - y * sin_a + cx for x, y in ((-hw, -hh), (hw, -hh), (hw, hh), (-hw, hh))]
+        ys = [x * sin_a + y * cos_a + cy for x, y in ((-hw, -hh), (hw, -hh), (hw, hh), (-hw, hh))]
+        out = list(zip(
+            np.minimum.reduce(xs).tolist(), np.minimum.reduce(ys).tolist(),
+            np.maximum.reduce(xs).tolist(), np.maximum.reduce(ys).tolist(),
+        ))
+        for i in other:
+            out[i] = rects[i].get_bounds()
+        return out
+
+
+def _kind(value):
+    t = type(value)
+    if t is float:
+        return FLOAT
+    if t is int and -_EXACT_INT <= value <= _EXACT_INT:
+        return INT
+    return OTHER  # bool / str / numpy の数値などは型ごとそのまま持つ
+
+
+# プロセス共通
+rect_store = RectStore()
@@ -0,0 +1,119 @@
+import math
+import pygame
+import config
+
+# 押しっぱなしで連続移動するキー（押している間は描画を続ける）
+HELD_MOVE_KEYS = (pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP, pygame.K_DOWN)
+
+
+# -----------------------------
+# 再描画スケジューラ
+# -----------------------------
+class RedrawScheduler:
+    """
+    入力・オブジェクト変更・表示期限（保存メッセージ等）があったときだけ
+    フレームを描画し、それ以外は pygame.event.wait でブロックする。
+    continuous=True のときは従来通り毎フレーム描画する（比較用）。
+
+    使い方:
+        render = scheduler.begin_frame(now)   # True のときだけ描画
+        for event in scheduler.get_events():  # イベントがあれば次フレームを描画
+            ...
+        scheduler.end_frame(render)
+    """
+
+    def __init__(self, continuous=None, fps=None, idle_timeout=None):
+        self.continuous = config.CONTINUOUS_REDRAW if continuous is None else continuous
+        self.fps = config.MAX_FPS if fps is None else fps
+        self.idle_timeout = config.IDLE_WAIT_TIMEOUT if idle_timeout is None else idle_timeout
+        self.clock = pygame.time.Clock()
+
+        self._dirty = True          # 最初のフレームは必ず描画
+        self._deadlines = []        # 再描画予約時刻（秒）
+        self._keyed = {}            # key -> 再描画予約時刻（同じ key は上書き）
+        self._pending = []          # wait で受け取ったイベント
+        self.busy = False           # フレームごとに少しずつ進める処理があるあいだ（段階的な読み込み）は待機しない
+
+        # 計測用
+        self.rendered_frames = 0
+        self.idle_waits = 0
+
+    def request(self):
+        """次のフレームで再描画する"""
+        self._dirty = True
+
+    def schedule(self, deadline, key=None):
+        """
+        deadline（秒, get_ticks基準）を過ぎたら再描画する
+        key を指定すると同じ key の予約を置き換える（延長される予約用）
+        """
+        if key is None:
+            self._deadlines.append(deadline)
+        else:
+            self._keyed[key] = deadline
+
+    def keep_alive(self, keys):
+        """移動キー押しっぱなし中は描画を続ける（キーリピートはイベントが来ないため）"""
+        if any(keys[k] for k in HELD_MOVE_KEYS):
+            self._dirty = True
+
+    def _expire(self, now):
+        """期限切れの予約を消化し、あれば True"""
+        expired = [d for d in self._deadlines if now > d]
+        expired_keys = [k for k, d in self._keyed.items() if now > d]
+        if not expired and not expired_keys:
+            return False
+        self._deadlines = [d for d in self._deadlines if now <= d]
+        for k in expired_keys:
+            del self._keyed[k]
+        return True
+
+    def begin_frame(self, now):
+        """このフレームを描画するかどうかを返す（不要ならイベントが来るまで待つ）"""
+        if self.continuous:
+            self.rendered_frames += 1
+            return True
+
+        if self._expire(now):
+            self._dirty = True
+
+        if self._dirty:
+            self._dirty = False
+            self.rendered_frames += 1
+            return True
+
+        if self.busy:
+            return False
+
+        # --- 次の予約時刻 or イベントまでブロック ---
+        timeout = self.idle_timeout
+        deadlines = self._deadlines + list(self._keyed.values())
+        if deadlines:
+            timeout = min(timeout, min(deadlines) - now)
+        timeout_ms = max(1, int(math.ceil(timeout * 1000)) + 1)
+
+        self.idle_waits += 1
+        event = pygame.event.wait(timeout_ms)
+        if event.type != pygame.NOEVENT:
+            # イベントは今フレームで処理し、その結果を次フレームで描画する
+            self._pending.append(event)
+            return False
+
+        now = pygame.time.get_ticks() / 1000.0
+        if self._expire(now):
+            self.rendered_frames += 1
+            return True
+        return False
+
+    def get_events(self):
+        """待機中に受け取ったイベント + キュー内のイベント"""
+        events = self._pending + pygame.event.get()
+        self._pending = []
+        if events:
+            self._dirty = True
+        return events
+
+    def end_frame(self, rendered):
+        """描画したフレームだけ FPS 上限で待つ"""
+        if rendered:
+            self.clock.tick(self.fps)
@@ -0,0 +1,191 @@
+import atexit
+import json
+import os
+import threading
+import time
+
+import pygame
+
+import config
+from tracing import tracer
+from tcbf_format import is_binary, write_tcbf
+
+
+# 保存が終わったときに post するイベント
+# dict: path, ok, error, autosave, ms
+SAVE_DONE = pygame.event.custom_type()
+
+CHUNK = 500  # 1回の json.dumps で書く要素数（ワーカーが GIL を長く握らないように）
+
+
+# -----------------------------
+# スナップショット
+# -----------------------------
+def _shared_record(obj):
+    """
+    to_dict の結果をオブジェクトに持たせて使い回す（構造共有）。
+    RotatingRect / TextLabel は保存する属性がすべて _TrackedAttr で、
+    代入されると _saved_dict が捨てられるので、変わっていない要素は前回の辞書をそのまま使える。
+    辞書は書き込み専用として扱い、作ったあとは変更しない。
+    """
+    record = obj.__dict__.get("_saved_dict")
+    if record is None:
+        record = obj.to_dict()
+        obj.__dict__["_saved_dict"] = record
+    return record
+
+
+def take_snapshot(rects, texts, categories, polygons):
+    """
+    DataManager.save_all と同じ形の辞書。フレームスレッドで呼び、以後は別スレッドから読むだけ
+    categories を先に書き、そのあとは描く重なり順（段階的な読み込み progressive_load の届く順）
+    """
+    return {
+        "categories": [c.to_dict() for c in categories],  # 頂点をその場で書き換えるので毎回作る
+        "rects":      [_shared_record(r) for r in rects],
+        "polygons":   [p.to_dict() for p in polygons],
+        "texts":      [_shared_record(t) for t in texts],
+    }
+
+
+@tracer.traced(cat="io")
+def write_snapshot(data, path):
+    """
+    一時ファイルに書いてから置き換える（途中で落ちても元のファイルは壊れない）。
+    1要素1行で、要素ごとに C 実装の json.dumps を使う（indent つきの json.dump より速い）
+    拡張子が .tcbf ならバイナリ形式（tcbf_format）で書く
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    if is_binary(path):
+        write_tcbf(data, path)
+        return
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write("{")
+        for k, (key, items) in enumerate(data.items()):
+            f.write(("," if k else "") + "\n" + json.dumps(key) + ": ")
+            if not isinstance(items, list):
+                f.write(json.dumps(items, ensure_ascii=False))
+                continue
+            f.write("[")
+            for i in range(0, len(items), CHUNK):
+                lines = ",\n".join(json.dumps(d, ensure_ascii=False) for d in items[i:i + CHUNK])
+                f.write(("," if i else "") + "\n" + lines)
+            f.write("\n]" if items else "]")
+        f.write("\n}\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+# -----------------------------
+# 保存サービス
+# -----------------------------
+class SaveService:
+    """
+    保存の書き込みをワーカースレッドで行い、フレームを止めない。
+
+    save(rects, texts, categories, polygons, path) : スナップショットを取り書き込みを予約
+    autosave(now, rects, texts, categories, polygons, filename)
+        : interval 秒ごとに AUTOSAVE_DIR へ保存（前回から変わっていなければ書かない）
+    flush()  : 予約中・書き込み中の保存が終わるまで待つ（読み込み前・終了時）
+
+    同じ path への予約が溜まったら最新の1つだけ書く。書き終わると SAVE_DONE を post する。
+    """
+
+    def __init__(self, interval=None, autosave_dir=None):
+        self.interval = config.AUTOSAVE_INTERVAL if interval is None else interval
+        self.autosave_dir = config.AUTOSAVE_DIR if autosave_dir is None else autosave_dir
+        self._pending = {}          # path -> (data, autosave, on_saved)
+        self._busy = False
+        self._cond = threading.Condition()
+        self._thread = None
+        self._last_autosave = None  # 前回 autosave した時刻（秒, get_ticks基準）
+        self._last_autosave_data = None
+
+        # 計測用
+        self.saved = 0
+        self.failed = 0
+
+    def _ensure_worker(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="SaveService", daemon=True)
+            self._thread.start()
+            atexit.register(self.flush)
+
+    # -----------------------------
+    # 予約
+    # -----------------------------
+    def save(self, rects, texts, categories, polygons, path, autosave=False):
+        self.submit(take_snapshot(rects, texts, categories, polygons), path, autosave)
+
+    def submit(self, data, path, autosave=False, on_saved=None):
+        """on_saved(path) は書き終えたあとワーカースレッドで呼ぶ（失敗したときは呼ばない）"""
+        with self._cond:
+            self._ensure_worker()
+            self._pending[path] = (data, autosave, on_saved)
+            self._cond.notify()
+
+    def autosave(self, now, rects, texts, categories, polygons, filename):
+        if not self.interval:
+            return
+        if self._last_autosave is None:
+            self._last_autosave = now
+            return
+        if now - self._last_autosave < self.interval:
+            return
+        self._last_autosave = now
+        data = take_snapshot(rects, texts, categories, polygons)
+        if data == self._last_autosave_data:  # 共有した辞書は同一なので比較は速い
+            return
+        self._last_autosave_data = data
+        self.submit(data, os.path.join(self.autosave_dir, os.path.basename(filename or "untitled.json")), autosave=True)
+
+    def flush(self, timeout=None):
+        """書き込みが全部終われば True"""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._busy, timeout)
+
+    # -----------------------------
+    # ワーカー
+    # -----------------------------
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending)
+                path, (data, autosave, on_saved) = self._pending.popitem()
+                self._busy = True
+            start = time.perf_counter()
+            error = None
+            try:
+                write_snapshot(data, path)
+                if on_saved is not None:
+                    on_saved(path)
+                self.saved += 1
+                print(("Autosaved ->" if autosave else "Saved all ->"), path)
+            except Exception as e:  # 書けない値や on_saved の失敗でもワーカーを止めない（止まると以後の保存と flush が返らない）
+                error = f"{type(e).__name__}: {e}"
+                self.failed += 1
+                print("保存失敗:", path, error)
+            finally:
+                ms = (time.perf_counter() - start) * 1000
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+            try:
+                pygame.event.post(pygame.event.Event(
+                    SAVE_DONE, path=path, ok=error is None, error=error, autosave=autosave, ms=ms))
+            except pygame.error:
+                pass  # 画面を閉じたあと（終了時の flush）は通知しない
+
+    @staticmethod
+    def message(event):
+        """SAVE_DONE に対応するバナーの文言"""
+        if not event.ok:
+            return "Save failed!"
+        return "Autosaved." if event.autosave else "Saved all objects."
+
+
+# プロセス共通
+save_service = SaveService()
@@ -0,0 +1,187 @@
+import math
+
+# -----------------------------
+# 一様グリッド空間インデックス
+# -----------------------------
+class SpatialGrid:
+    """
+    オブジェクトの外接矩形をグリッドのセルに登録し、
+    クリック位置のセルにある候補だけを当たり判定する。
+
+    ObjectList.add_observer(grid) で登録すると
+    追加・削除・移動/サイズ変更/回転に自動で追従する。
+
+    bounds   : obj -> (x0, y0, x1, y1)（省略時は obj.get_bounds()）
+    max_cells: これより多くのセルにまたがる大きなオブジェクトは
+               常に候補として扱う（長いポリラインなど）
+    bulk_bounds: objs -> [bounds, ...]（まとめて登録するときの一括版。rect_store.bounds など）
+    """
+
+    def __init__(self, cell_size=64, bounds=None, max_cells=256, pad=1, bulk_bounds=None):
+        self.cell_size = cell_size
+        self.max_cells = max_cells
+        self.pad = pad  # 境界上の点を取りこぼさないための余白
+        self._bounds_func = bounds if bounds is not None else (lambda obj: obj.get_bounds())
+        self._bulk_bounds = bulk_bounds
+
+        self._cells = {}       # (cx, cy) -> set(obj)
+        self._obj_cells = {}   # obj -> tuple((cx, cy), ...)
+        self._obj_bounds = {}  # obj -> (x0, y0, x1, y1)
+        self._large = set()    # セル登録しない大きなオブジェクト
+
+    def __len__(self):
+        return len(self._obj_bounds)
+
+    def __contains__(self, obj):
+        return obj in self._obj_bounds
+
+    # -----------------------------
+    # 登録・削除
+    # -----------------------------
+    def _cell_range(self, bounds):
+        x0, y0, x1, y1 = bounds
+        cs = self.cell_size
+        pad = self.pad
+        return (
+            math.floor((x0 - pad) / cs), math.floor((y0 - pad) / cs),
+            math.floor((x1 + pad) / cs), math.floor((y1 + pad) / cs),
+        )
+
+    def insert(self, obj, bounds=None):
+        if obj in self._obj_bounds:
+            self.remove(obj)
+
+        if bounds is None:
+            bounds = self._bounds_func(obj)
+        self._obj_bounds[obj] = bounds
+
+        cx0, cy0, cx1, cy1 = self._cell_range(bounds)
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > self.max_cells:
+            self._large.add(obj)
+            self._obj_cells[obj] = ()
+            return
+
+        keys = tuple((cx, cy) for cx in range(cx0, cx1 + 1) for cy in range(cy0, cy1 + 1))
+        cells = self._cells
+        for key in keys:
+            bucket = cells.get(key)
+            if bucket is None:
+                cells[key] = bucket = set()
+            bucket.add(obj)
+        self._obj_cells[obj] = keys
+
+    def remove(self, obj):
+        keys = self._obj_cells.pop(obj, None)
+        if keys is None:
+            return
+        self._obj_bounds.pop(obj, None)
+        self._large.discard(obj)
+        cells = self._cells
+        for key in keys:
+            bucket = cells.get(key)
+            if bucket is not None:
+                bucket.discard(obj)
+                if not bucket:
+                    del cells[key]
+
+    def update(self, obj):
+        """位置・形状が変わったオブジェクトを登録し直す"""
+        if obj not in self._obj_bounds:
+            return
+        bounds = self._bounds_func(obj)
+        if bounds == self._obj_bounds[obj]:
+            return
+        self.insert(obj)
+
+    def insert_many(self, objs):
+        """まとめて登録（bulk_bounds があれば外接矩形を一括で求める）"""
+        objs = list(objs)
+        if self._bulk_bounds is None:
+            for obj in objs:
+                self.insert(obj)
+            return
+        for obj, bounds in zip(objs, self._bulk_bounds(objs)):
+            self.insert(obj, bounds)
+
+    def rebuild(self, objs):
+        self.clear()
+        self.insert_many(objs)
+
+    def clear(self):
+        self._cells.clear()
+        self._obj_cells.clear()
+        self._obj_bounds.clear()
+        self._large.clear()
+
+    def bounds_of(self, obj):
+        """登録済みの外接矩形（未登録なら None）"""
+        return self._obj_bounds.get(obj)
+
+    # -----------------------------
+    # ObjectList observer
+    # -----------------------------
+    def attach(self, objs):
+        self.insert_many(objs)
+
+    def objects_appended(self, objs):
+        self.insert_many(objs)
+
+    def object_added(self, obj):
+        self.insert(obj)
+
+    def object_removed(self, obj):
+        self.remove(obj)
+
+    def object_changed(self, obj, attr):
+        watch = getattr(obj, "BOUNDS_ATTRS", None)
+        if attr is None or watch is None or attr in watch:
+            self.update(obj)
+
+    # -----------------------------
+    # 検索
+    # -----------------------------
+    def candidates_at(self, pos):
+        """pos のセルに登録されている候補集合"""
+        cs = self.cell_size
+        key = (math.floor(pos[0] / cs), math.floor(pos[1] / cs))
+        bucket = self._cells.get(key)
+        if bucket is None:
+            return set(self._large)
+        return bucket | self._large
+
+    def query(self, rect):
+        """rect (x0, y0, x1, y1) と外接矩形が重なる候補集合"""
+        x0, y0, x1, y1 = rect
+        cx0, cy0, cx1, cy1 = self._cell_range(rect)
+        found = set()
+        cells = self._cells
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    found |= bucket
+        found |= self._large
+        obj_bounds = self._obj_bounds
+        return {
+            obj for obj in found
+            if not (obj_bounds[obj][2] < x0 or obj_bounds[obj][0] > x1
+                    or obj_bounds[obj][3] < y0 or obj_bounds[obj][1] > y1)
+        }
+
+    def hit_test(self, pos, objs, contains):
+        """
+        pos を含む最前面（objs の後ろほど前面）のオブジェクトを返す
+        contains(obj, pos) -> bool は候補だけに呼ばれる
+        先に contains で絞ってから並びを調べる（objs.index はリスト長に比例するので、
+        含むものだけにする。たいてい1つ）
+        """
+        hits = [obj for obj in self.candidates_at(pos) if contains(obj, pos)]
+        best, best_index = None, -1
+        for obj in hits:
+            try:
+                index = objs.index(obj)
+            except ValueError:
+                continue  # リスト外（念のため）
+            if index > best_index:
+                best, best_index = obj, index
+        return best
@@ -0,0 +1,84 @@
+from collections import OrderedDict
+import pygame
+
+
+# -----------------------------
+# 回転矩形スプライトの共有キャッシュ（フライウェイト）
+# -----------------------------
+class RectSpriteCache:
+    """
+    塗りつぶした回転矩形（RotatingRect の本体）を (size, color, 角度) で共有する LRU キャッシュ。
+    同じ大きさ・色・向きのブースは1枚の Surface を使い回す。
+    アクティブ時の補色などハイライト状態は塗り色として key に入る。
+
+    角度は ANGLE_STEP 度単位に丸める（表示上の差は出ない程度）。
+    Surface の推定バイト数の合計が max_bytes を超えたら最も長く使われていないものから捨てる。
+    """
+
+    ANGLE_STEP = 0.1
+
+    def __init__(self, max_bytes=16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (Surface, bytes)
+        self.bytes = 0
+
+        # 計測用
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _quantize(self, angle):
+        return round(round((angle % 360) / self.ANGLE_STEP) * self.ANGLE_STEP, 6) % 360
+
+    def get(self, size, color, angle):
+        """回転済みの矩形 Surface（中心を合わせて blit する）"""
+        size = (int(size[0]), int(size[1]))
+        angle = self._quantize(angle)
+        key = (size, tuple(color), angle)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        base = pygame.Surface(size, pygame.SRCALPHA)
+        base.fill(color)
+        sprite = pygame.transform.rotate(base, -angle)
+
+        nbytes = sprite.get_width() * sprite.get_height() * sprite.get_bytesize()
+        self._entries[key] = (sprite, nbytes)
+        self.bytes += nbytes
+        self._evict()
+        return sprite
+
+    def _evict(self):
+        while self.bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, nbytes) = self._entries.popitem(last=False)
+            self.bytes -= nbytes
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hit_rate(), 3),
+        }
+
+
+# プロセス共通のキャッシュ
+rect_sprites = RectSpriteCache()
@@ -0,0 +1,512 @@
+"""
+バイナリのプロジェクト形式（.tcbf）
+
+JSON（DataManager.save_all の形）と同じ内容を列ごとの固定幅の配列で持ち、mmap で読む。
+読み込み時に JSON の解析が要らず、開いただけでは行を辞書やオブジェクトにしない（使うときに作る）。
+
+  ヘッダ   : "TCBF", 版, セクション数, セクション表（タグ, 位置, 長さ）
+  META     : JSON。上位の他のキー（journal_seq など）と、列に入らない値（extras）
+  STRS     : 文字列表（名前・分類・テキストなど。同じ文字列は1つにまとめる）
+  VERT     : 頂点バッファ（x, y の f64 と、整数だったかの印）
+  RECT / TEXT / CATS / POLY : 行数と、フィールドごとの列（下の SCHEMAS の順）
+
+数値は f64 に入れ、もとが int だったかを行ごとのビットで持つので JSON に戻しても同じ値・同じ型になる。
+列の型に合わない値（文字列の no、RGBA の色など）や知らないキーは META の extras に JSON のまま入れる。
+JSON ⇔ .tcbf の変換は可逆（python -m tcbf_format to-tcbf / to-json）。
+"""
+import argparse
+import json
+import mmap
+import operator
+import os
+import struct
+import sys
+from array import array
+from functools import reduce
+
+MAGIC = b"TCBF"
+VERSION = 1
+EXTENSION = ".tcbf"
+
+_HEADER = struct.Struct("<4sHHI")     # magic, version, reserved, セクション数
+_ENTRY = struct.Struct("<4sQQ")       # タグ, 位置, 長さ
+_ALIGN = 8
+_LITTLE = sys.byteorder == "little"
+
+# 種類ごとの列（to_dict と同じキーの順）。型: num / str / rgb / bool / pts、数値は (num, 要素数)
+SCHEMAS = {
+    "rects": (b"RECT", [
+        ("no", "num", 1), ("name", "str", 1), ("name_pos", "num", 2), ("name_color", "rgb", 3),
+        ("name_angle", "num", 1), ("font_size", "num", 1), ("power", "num", 1), ("center", "num", 2),
+        ("size", "num", 2), ("color", "rgb", 3), ("angle", "num", 1), ("classification", "str", 1),
+        ("tent", "num", 1), ("light", "num", 1),
+    ]),
+    "texts": (b"TEXT", [
+        ("no", "str", 1), ("text", "str", 1), ("position", "num", 2), ("font_size", "num", 1),
+        ("color", "rgb", 3), ("angle", "num", 1), ("locked", "bool", 1),
+    ]),
+    "categories": (b"CATS", [
+        ("name", "str", 1), ("color", "rgb", 3), ("points", "pts", 1), ("alert", "bool", 1),
+        ("power_limit", "num", 1),
+    ]),
+    "polygons": (b"POLY", [
+        ("points", "pts", 1), ("color", "rgb", 3), ("width", "num", 1), ("show_vertices", "bool", 1),
+    ]),
+}
+
+
+def is_binary(path):
+    """拡張子で判定（.tcbf ならバイナリ）"""
+    return str(path).lower().endswith(EXTENSION)
+
+
+# -----------------------------
+# 値の判定
+# -----------------------------
+def _num_ok(v):
+    if isinstance(v, bool) or not isinstance(v, (int, float)):
+        return False
+    return not isinstance(v, int) or (abs(v) < 2 ** 53)
+
+
+def _fits(kind, arity, v):
+    if kind == "num":
+        if arity == 1:
+            return _num_ok(v)
+        return isinstance(v, (list, tuple)) and len(v) == arity and all(_num_ok(x) for x in v)
+    if kind == "str":
+        return isinstance(v, str)
+    if kind == "bool":
+        return isinstance(v, bool)
+    if kind == "rgb":
+        return (isinstance(v, (list, tuple)) and len(v) == 3
+                and all(isinstance(x, int) and not isinstance(x, bool) and 0 <= x <= 255 for x in v))
+    if kind == "pts":
+        return isinstance(v, (list, tuple)) and all(
+            isinstance(p, (list, tuple)) and len(p) == 2 and all(_num_ok(x) for x in p) for p in v)
+    return False
+
+
+def _column_layout(fields, n):
+    """列の (名前, typecode, 長さ) を並び順に返す。present / ints は行ごとのビット"""
+    cols = [("present", "I", n), ("ints", "I", n)]
+    for key, kind, arity in fields:
+        if kind == "num":
+            cols += [(f"{key}.{j}", "d", n) for j in range(arity)]
+        elif kind == "str":
+            cols.append((key, "I", n))
+        elif kind == "rgb":
+            cols.append((key, "B", n * 3))
+        elif kind == "bool":
+            cols.append((key, "B", n))
+        elif kind == "pts":
+            cols += [(key + ".off", "I", n), (key + ".len", "I", n)]
+    return cols
+
+
+def _num_bits(fields):
+    """数値の要素ごとの ints ビット位置"""
+    bits, bit = {}, 0
+    for key, kind, arity in fields:
+        if kind == "num":
+            for j in range(arity):
+                bits[(key, j)] = bit
+                bit += 1
+    return bits
+
+
+def _pad(n):
+    return (-n) % _ALIGN
+
+
+# -----------------------------
+# 書き込み
+# -----------------------------
+class _Strings:
+    """文字列表（同じ文字列は1つ）"""
+
+    def __init__(self):
+        self.index = {}
+        self.items = []
+
+    def add(self, s):
+        i = self.index.get(s)
+        if i is None:
+            i = self.index[s] = len(self.items)
+            self.items.append(s)
+        return i
+
+    def encode(self):
+        blobs = [s.encode("utf-8") for s in self.items]
+        offsets = array("I", [0])
+        for b in blobs:
+            offsets.append(offsets[-1] + len(b))
+        return _le(array("I", [len(blobs)])) + _le(offsets) + b"".join(blobs)
+
+
+def _le(arr):
+    """リトルエンディアンのバイト列"""
+    if not _LITTLE:
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def _encode_kind(records, fields, strings, verts, vflags):
+    n = len(records)
+    bits = _num_bits(fields)
+    cols = {name: array(tc, bytes(array(tc).itemsize * length)) for name, tc, length in _column_layout(fields, n)}
+    extras = {}
+    known = {key for key, _, _ in fields}
+    for i, record in enumerate(records):
+        present = ints = 0
+        extra = {}
+        for f, (key, kind, arity) in enumerate(fields):
+            if key not in record:
+                continue
+            v = record[key]
+            if not _fits(kind, arity, v):
+                extra[key] = v
+                continue
+            present |= 1 << f
+            if kind == "num":
+                values = [v] if arity == 1 else v
+                for j, x in enumerate(values):
+                    cols[f"{key}.{j}"][i] = x
+                    if isinstance(x, int):
+                        ints |= 1 << bits[(key, j)]
+            elif kind == "str":
+                cols[key][i] = strings.add(v)
+            elif kind == "rgb":
+                cols[key][i * 3:i * 3 + 3] = array("B", v)
+            elif kind == "bool":
+                cols[key][i] = int(v)
+            elif kind == "pts":
+                cols[key + ".off"][i] = len(vflags)
+                cols[key + ".len"][i] = len(v)
+                for x, y in v:
+                    verts.extend((x, y))
+                    vflags.append(isinstance(x, int) | (isinstance(y, int) << 1))
+        for key in record:
+            if key not in known:
+                extra[key] = record[key]
+        cols["present"][i] = present
+        cols["ints"][i] = ints
+        if extra or list(record) != [key for key, _, _ in fields if key in record]:
+            extra["#order"] = list(record)  # キーの並びも戻す
+            extras[str(i)] = extra
+
+    out = bytearray(struct.pack("<I", n))
+    out += bytes(_pad(len(out)))
+    for name, _, _ in _column_layout(fields, n):
+        out += _le(cols[name])
+        out += bytes(_pad(len(out)))
+    return bytes(out), extras
+
+
+def encode(data):
+    """JSON の形の辞書 -> .tcbf のバイト列"""
+    strings = _Strings()
+    verts = array("d")
+    vflags = array("B")
+    sections = []
+    extras = {}
+    for kind, (tag, fields) in SCHEMAS.items():
+        blob, kind_extras = _encode_kind(data.get(kind, []), fields, strings, verts, vflags)
+        sections.append((tag, blob))
+        if kind_extras:
+            extras[kind] = kind_extras
+    meta = {
+        "keys": list(data),  # 上位のキーの並び
+        "top": {k: v for k, v in data.items() if k not in SCHEMAS},
+        "extras": extras,
+    }
+    vert_blob = struct.pack("<I", len(vflags)) + bytes(4) + _le(verts) + vflags.tobytes()
+    sections = [
+        (b"META", json.dumps(meta, ensure_ascii=False).encode("utf-8")),
+        (b"STRS", strings.encode()),
+        (b"VERT", vert_blob),
+    ] + sections
+
+    offset = _HEADER.size + _ENTRY.size * len(sections)
+    offset += _pad(offset)
+    table, body = [], bytearray()
+    for tag, blob in sections:
+        table.append(_ENTRY.pack(tag, offset + len(body), len(blob)))
+        body += blob + bytes(_pad(len(blob)))
+    head = _HEADER.pack(MAGIC, VERSION, 0, len(sections)) + b"".join(table)
+    return head + bytes(_pad(len(head))) + bytes(body)
+
+
+def write_tcbf(data, path):
+    """一時ファイルに書いてから置き換える"""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(encode(data))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+# -----------------------------
+# 読み込み
+# -----------------------------
+class LazyObjects:
+    """
+    行を使うときにオブジェクトにする読み取り専用の並び（作ったものは覚えておく）
+    list(lazy) で全部作る
+    """
+
+    def __init__(self, reader, kind, cls):
+        self.reader = reader
+        self.kind = kind
+        self.cls = cls
+        self._objs = [None] * reader.count(kind)
+
+    def __len__(self):
+        return len(self._objs)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        obj = self._objs[i]
+        if obj is None:
+            obj = self._objs[i] = self.cls.from_dict(self.reader.record(self.kind, i))
+        return obj
+
+    def __iter__(self):
+        if None in self._objs:  # 全部なめるなら列ごとにまとめて作る
+            for i, record in enumerate(self.reader.records(self.kind)):
+                if self._objs[i] is None:
+                    self._objs[i] = self.cls.from_dict(record)
+        return iter(self._objs)
+
+
+class TcbfReader:
+    """
+    .tcbf を mmap して列を memoryview で参照する（コピーしない）。
+
+    count(kind)             : 行数
+    record(kind, i)         : i 行目を JSON と同じ形の辞書で返す
+    records(kind)           : 全行の辞書（イテレータ）
+    objects(kind, cls)      : LazyObjects（使うときに cls.from_dict で作る）
+    to_data()               : ファイル全体を JSON の形の辞書に戻す
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mm)
+
+        magic, version, _, count = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"not a tcbf file: {path}")
+        if version != VERSION:
+            raise ValueError(f"unsupported tcbf version {version}: {path}")
+        self._sections = {}
+        for k in range(count):
+            tag, offset, length = _ENTRY.unpack_from(self._mm, _HEADER.size + _ENTRY.size * k)
+            self._sections[tag] = (offset, length)
+
+        self.meta = json.loads(bytes(self._section(b"META")).decode("utf-8"))
+        self._load_strings()
+        self._load_vertices()
+        self._kinds = {kind: self._load_kind(tag, fields) for kind, (tag, fields) in SCHEMAS.items()}
+
+    def close(self):
+        self._kinds = {}
+        self._strings = self._string_offsets = self._verts = self._vflags = None
+        self._view.release()
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- 参照 ---
+    def _section(self, tag):
+        offset, length = self._sections[tag]
+        return self._view[offset:offset + length]
+
+    def _array(self, view, typecode, length):
+        """リトルエンディアンの列。同じ並びの環境ではコピーせず cast する"""
+        itemsize = array(typecode).itemsize
+        view = view[:itemsize * length]
+        if _LITTLE:
+            return view.cast(typecode)
+        arr = array(typecode, view.tobytes())
+        arr.byteswap()
+        return arr
+
+    def _load_strings(self):
+        view = self._section(b"STRS")
+        n = struct.unpack_from("<I", view, 0)[0]
+        self._string_offsets = self._array(view[4:], "I", n + 1)
+        self._strings = view[4 + 4 * (n + 1):]
+        self._string_cache = {}
+
+    def _string(self, i):
+        s = self._string_cache.get(i)
+        if s is None:
+            s = self._string_cache[i] = str(self._strings[self._string_offsets[i]:self._string_offsets[i + 1]], "utf-8")
+        return s
+
+    def _load_vertices(self):
+        view = self._section(b"VERT")
+        m = struct.unpack_from("<I", view, 0)[0]
+        self._verts = self._array(view[8:], "d", 2 * m)
+        self._vflags = view[8 + 16 * m:8 + 17 * m]
+
+    def _load_kind(self, tag, fields):
+        view = self._section(tag)
+        n = struct.unpack_from("<I", view, 0)[0]
+        pos = 4 + _pad(4)
+        cols = {}
+        for name, typecode, length in _column_layout(fields, n):
+            size = array(typecode).itemsize * length
+            cols[name] = self._array(view[pos:], typecode, length)
+            pos += size + _pad(size)
+        return n, fields, _num_bits(fields), cols
+
+    # --- 行 ---
+    def count(self, kind):
+        return self._kinds[kind][0]
+
+    def record(self, kind, i):
+        n, fields, bits, cols = self._kinds[kind]
+        if not 0 <= i < n:
+            raise IndexError(i)
+        present, ints = cols["present"][i], cols["ints"][i]
+        extra = self.meta["extras"].get(kind, {}).get(str(i))
+        out = {}
+        for f, (key, ftype, arity) in enumerate(fields):
+            if not present >> f & 1:
+                if extra is not None and key in extra:
+                    out[key] = extra[key]
+                continue
+            if ftype == "num":
+                values = []
+                for j in range(arity):
+                    x = cols[f"{key}.{j}"][i]
+                    values.append(int(x) if ints >> bits[(key, j)] & 1 else x)
+                out[key] = values[0] if arity == 1 else values
+            elif ftype == "str":
+                out[key] = self._string(cols[key][i])
+            elif ftype == "rgb":
+                out[key] = list(cols[key][i * 3:i * 3 + 3])
+            elif ftype == "bool":
+                out[key] = bool(cols[key][i])
+            elif ftype == "pts":
+                out[key] = self._points(cols[key + ".off"][i], cols[key + ".len"][i])
+        if extra is not None:
+            for key, value in extra.items():
+                if key != "#order" and key not in out:
+                    out[key] = value
+            out = {key: out[key] for key in extra["#order"] if key in out}
+        return out
+
+    def records(self, kind):
+        """
+        全行をまとめて作る。列ごとに tolist で取り出して組み立てる（record を行ごとに呼ぶより速い）。
+        欠けたキーや extras のある行だけ record で作る
+        """
+        n, fields, _, cols = self._kinds[kind]
+        keys = [key for key, _, _ in fields]
+        full = (1 << len(fields)) - 1
+        extras = self.meta["extras"].get(kind, {})
+        present = cols["present"].tolist()
+        for i, row in enumerate(zip(*self._columns(kind))):
+            if present[i] == full and str(i) not in extras:
+                yield dict(zip(keys, row))
+            else:
+                yield self.record(kind, i)
+
+    def _columns(self, kind):
+        """フィールドごとの全行の値（リスト）。present でない行の値は使わない"""
+        n, fields, bits, cols = self._kinds[kind]
+        ints = cols["ints"].tolist()
+        all_int, any_int = reduce(operator.and_, ints, -1), reduce(operator.or_, ints, 0)
+        out = []
+        for key, ftype, arity in fields:
+            if ftype == "num":
+                parts = []
+                for j in range(arity):
+                    bit = 1 << bits[(key, j)]
+                    values = cols[f"{key}.{j}"].tolist()
+                    if all_int & bit:    # 列がすべて int（よくある）ならまとめて変換
+                        values = list(map(int, values))
+                    elif any_int & bit:
+                        values = [int(x) if m & bit else x for x, m in zip(values, ints)]
+                    parts.append(values)
+                out.append(parts[0] if arity == 1 else list(map(list, zip(*parts))))
+            elif ftype == "str":
+                out.append([self._string(s) for s in cols[key].tolist()])
+            elif ftype == "rgb":
+                flat = cols[key].tolist()
+                out.append([flat[i:i + 3] for i in range(0, 3 * n, 3)])
+            elif ftype == "bool":
+                out.append([bool(x) for x in cols[key].tolist()])
+            elif ftype == "pts":
+                out.append([self._points(off, length) for off, length in
+                            zip(cols[key + ".off"].tolist(), cols[key + ".len"].tolist())])
+        return out
+
+    def _points(self, off, length):
+        points = []
+        for v in range(off, off + length):
+            x, y, flag = self._verts[2 * v], self._verts[2 * v + 1], self._vflags[v]
+            points.append([int(x) if flag & 1 else x, int(y) if flag & 2 else y])
+        return points
+
+    def objects(self, kind, cls):
+        return LazyObjects(self, kind, cls)
+
+    def to_data(self):
+        data = {}
+        for key in self.meta["keys"]:
+            data[key] = list(self.records(key)) if key in SCHEMAS else self.meta["top"][key]
+        return data
+
+
+def read_tcbf(path):
+    """.tcbf 全体を JSON の形の辞書で返す"""
+    with TcbfReader(path) as reader:
+        return reader.to_data()
+
+
+# -----------------------------
+# 変換ツール
+# -----------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m tcbf_format", description="JSON と .tcbf の相互変換")
+    sub = parser.add_subparsers(dest="command", required=True)
+    to_tcbf = sub.add_parser("to-tcbf", help="JSON -> .tcbf")
+    to_tcbf.add_argument("src")
+    to_tcbf.add_argument("dst", nargs="?")
+    to_json = sub.add_parser("to-json", help=".tcbf -> JSON")
+    to_json.add_argument("src")
+    to_json.add_argument("dst", nargs="?")
+    args = parser.parse_args(argv)
+
+    from save_service import write_snapshot  # JSON は保存と同じ書き方
+
+    stem = os.path.splitext(args.src)[0]
+    if args.command == "to-tcbf":
+        dst = args.dst or stem + EXTENSION
+        with open(args.src, encoding="utf-8") as f:
+            data = json.load(f)
+        write_tcbf(data, dst)
+        if read_tcbf(dst) != data:
+            raise SystemExit(f"変換結果が一致しない: {dst}")
+    else:
+        dst = args.dst or stem + ".json"
+        write_snapshot(read_tcbf(args.src), dst)
+    print(f"{args.src} ({os.path.getsize(args.src)} bytes) -> {dst} ({os.path.getsize(dst)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+from collections import OrderedDict
+import pygame
+
+
+# -----------------------------
+# 文字描画 Surface の共有キャッシュ
+# -----------------------------
+class TextSurfaceCache:
+    """
+    font.render（+ 回転）の結果を (font, text, antialias, color, angle) で共有する LRU キャッシュ。
+    Surface の推定バイト数（幅 x 高さ x 画素バイト数）の合計が max_bytes を超えたら
+    最も長く使われていないものから捨てる。
+
+    render の引数順は pygame.font.Font.render と同じ:
+        text_surfaces.render(font_small, "no: 1", True, (0, 0, 0))
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (Surface, bytes)
+        self.bytes = 0
+
+        # 計測用
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def render(self, font, text, antialias, color, angle=0):
+        key = (font, text, antialias, tuple(color), angle)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        surf = font.render(text, antialias, color)
+        if angle:
+            surf = pygame.transform.rotate(surf, angle)
+
+        size = surf.get_width() * surf.get_height() * surf.get_bytesize()
+        self._entries[key] = (surf, size)
+        self.bytes += size
+        self._evict()
+        return surf
+
+    def _evict(self):
+        while self.bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, size) = self._entries.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hit_rate(), 3),
+        }
+
+
+# プロセス共通のキャッシュ
+text_surfaces = TextSurfaceCache()
@@ -0,0 +1,162 @@
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from frame_timing import frame_timer
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    def __init__(self, tracer, name, cat, args):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.complete(self.name, self.cat, self.start, time.perf_counter(), self.args)
+        return False
+
+
+# -----------------------------
+# トレース出力（Chrome / Perfetto）
+# -----------------------------
+class Tracer:
+    """
+    区間を Trace Event Format の JSON に書き出す（ui.perfetto.dev / chrome://tracing で開く）。
+
+    span(name, cat)    : with で囲んだ区間を記録
+    traced(name, cat)  : 関数全体を記録するデコレータ
+    start(path)        : 記録開始（frame_timer の段階もフレームごとに記録する）
+    save()             : path に書き出す（start 後は終了時にも自動で書き出す）
+
+    イベントは capacity 件のリングバッファに溜めるので、長時間記録しても
+    メモリは増え続けない（古いものから捨てる）。
+    enabled が False のあいだ span は何もしない共有オブジェクトを返す。
+    """
+
+    def __init__(self, capacity=200_000):
+        self.enabled = False
+        self.path = None
+        self.events = deque(maxlen=capacity)
+        self._t0 = time.perf_counter()
+        self._pid = os.getpid()
+        self._threads = {}  # tid -> スレッド名
+        self._frame_start = None
+        self._lock = threading.Lock()
+
+    def start(self, path, capacity=None):
+        if capacity is not None:
+            self.events = deque(maxlen=capacity)
+        if not self.enabled:
+            atexit.register(self.save)
+            frame_timer.add_observer(self)
+        self.path = path
+        self.enabled = True
+
+    def stop(self):
+        if self.enabled:
+            frame_timer.remove_observer(self)
+            self.enabled = False
+
+    # -----------------------------
+    # 記録
+    # -----------------------------
+    def _us(self, t):
+        return round((t - self._t0) * 1_000_000, 3)
+
+    def complete(self, name, cat, start, end, args=None):
+        """perf_counter の start〜end の区間を1件記録"""
+        if not self.enabled:
+            return
+        thread = threading.current_thread()
+        event = {
+            "name": name, "cat": cat, "ph": "X",
+            "ts": self._us(start), "dur": round((end - start) * 1_000_000, 3),
+            "pid": self._pid, "tid": thread.ident,
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            self._threads[thread.ident] = thread.name
+            self.events.append(event)
+
+    def span(self, name, cat="app", **args):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, cat, args)
+
+    def traced(self, name=None, cat="app"):
+        def decorator(func):
+            label = name or func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with _Span(self, label, cat, None):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    # -----------------------------
+    # frame_timer observer（段階は lap の順に隙間なく並ぶ）
+    # 描かなかった回（入力処理やダイアログだけ）も frame として残し、args に rendered: false をつける
+    # -----------------------------
+    def frame_begin(self, timer):
+        self._frame_start = time.perf_counter()
+
+    def frame_end(self, timer):
+        if self._frame_start is None:
+            return
+        start = self._frame_start
+        args = None if timer.last_rendered else {"rendered": False}
+        self.complete("frame", "frame", start, start + timer.last_total / 1000, args)
+        for name, ms in timer.last_stages.items():
+            end = start + ms / 1000
+            self.complete(name, "frame", start, end)
+            start = end
+        self._frame_start = None
+
+    # -----------------------------
+    # 書き出し
+    # -----------------------------
+    def save(self, path=None):
+        path = path or self.path
+        if not path:
+            return None
+        with self._lock:
+            events = list(self.events)
+            threads = dict(self._threads)
+        meta = [
+            {"name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid, "args": {"name": tname}}
+            for tid, tname in threads.items()
+        ]
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": meta + events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        print("Trace ->", path, f"({len(events)} events)")
+        return path
+
+
+# プロセス共通
+tracer = Tracer()
@@ -6,10 +6,12 @@ import json, csv
 import config
 from tkinter import ttk, simpledialog, filedialog, messagebox
 from config import DRAW_W, DRAW_H, SCREEN_W, SCREEN_H
+from tracing import tracer
+from rect_store import rect_store
 
 
-def convert_mouse_to_draw_coords(pos, screen):
-    """マウス座標を描画用座標に変換"""
+def convert_mouse_to_draw_coords(pos, screen, camera=None):
+    """マウス座標を描画用座標に変換（camera があればワールド座標まで）"""
     sw, sh = screen.get_size()
     scale_x = config.DRAW_W / sw
     scale_y = config.DRAW_H / sh
@@ -18,6 +20,8 @@ def convert_mouse_to_draw_coords(pos, screen):
     mx *= scale_x
     my *= scale_y
 
+    if camera is not None:
+        return camera.to_world((mx, my))
     return mx, my
 
 # -----------------------------
@@ -48,15 +52,18 @@ def point_in_category(pt, cat):
     
     return inside
 
-def categories_name_containing_rect(center, categories):
-    """矩形(rect)がカテゴリ(cat)内にあるか判定"""
+def categories_name_containing_rect(center, categories, point_in_category=point_in_category):
+    """
+    矩形(rect)がカテゴリ(cat)内にあるか判定
+    point_in_category: 判定関数（CategoryIndex.point_in_category で表引きにできる）
+    """
     category_list = []
     for cat in categories:
         if point_in_category(center, cat):
             category_list.append(cat.name)
     return category_list
 
-def drag_object(obj, mouse_pos, screen, SCREEN_W, SCREEN_H):
+def drag_object(obj, mouse_pos, screen, SCREEN_W, SCREEN_H, camera=None):
     """ドラッグ中オブジェクト（Rect/Text）を移動させる共通関数"""
     if not getattr(obj, "dragging", False):
         return
@@ -69,7 +76,7 @@ def drag_object(obj, mouse_pos, screen, SCREEN_W, SCREEN_H):
     # mx *= scale_x
     # my *= scale_y
 
-    mx, my = convert_mouse_to_draw_coords(mouse_pos, screen)
+    mx, my = convert_mouse_to_draw_coords(mouse_pos, screen, camera)
 
     ox, oy = obj.drag_offset
 
@@ -120,6 +127,7 @@ def delete_object(obj, objs):
 # -----------------------------
 # PNG保存
 # -----------------------------
+@tracer.traced(cat="io")
 def save_as_png(draw_surface):
     """PNG保存ダイアログを開いてPNG保存を行う"""
     try:
@@ -197,10 +205,8 @@ def move_active_rects(active, active_rects, now, last_move_time, move_delay, key
         dx = x_new - x0
         dy = y_new - y0
 
-        # 全メンバーに同じ移動量を適用
-        for r in active_rects:
-            rx, ry = r.center
-            r.center = (rx + dx, ry + dy)
+        # 全メンバーに同じ移動量を適用（列に直接書く）
+        rect_store.translate(active_rects, dx, dy)
 
         return last_move_time
 
@@ -224,6 +230,7 @@ def move_active_rects(active, active_rects, now, last_move_time, move_delay, key
 BG_FILE = "BG_FILE.json"
 
 # 背景画像パス保存/読込
+@tracer.traced(cat="dialog")
 def select_background_file():
     root = tk.Tk()
     root.withdraw()
@@ -259,6 +266,7 @@ def save_bg_path(path):
     with open(BG_FILE, "w", encoding="utf-8") as f:
         json.dump({"path": path}, f, ensure_ascii=False, indent=2)
 
+@tracer.traced(cat="io")
 def load_and_resize_bg(bg_image_path):
     try:
         print("Loading background:", bg_image_path)
@@ -391,7 +399,7 @@ def handle_category_movement(category, now, last_move_time, move_delay,
     return last_move_time
 
 
-def drag_category_or_polygon(category, mouse_pos, screen, DRAW_W, DRAW_H, SCREEN_W, SCREEN_H, offset):
+def drag_category_or_polygon(category, mouse_pos, screen, DRAW_W, DRAW_H, SCREEN_W, SCREEN_H, offset, camera=None):
     """
     カテゴリ多角形全体のドラッグ移動量(dx, dy)を返す。
     """
@@ -411,6 +419,8 @@ def drag_category_or_polygon(category, mouse_pos, screen, DRAW_W, DRAW_H, SCREEN
     mx, my = mouse_pos
     mx *= scale_x
     my *= scale_y
+    if camera is not None:
+        mx, my = camera.to_world((mx, my))
 
     nx = max(0, min(SCREEN_W, mx + ox))
     ny = max(0, min(SCREEN_H, my + oy))
@@ -420,7 +430,7 @@ def drag_category_or_polygon(category, mouse_pos, screen, DRAW_W, DRAW_H, SCREEN
 
     return dx, dy
 
-def drag_vertex(polygon, vi, mouse_pos, screen, DRAW_W, DRAW_H, SCREEN_W, SCREEN_H, offset):
+def drag_vertex(polygon, vi, mouse_pos, screen, DRAW_W, DRAW_H, SCREEN_W, SCREEN_H, offset, camera=None):
     """
     単一頂点のドラッグ移動量(dx, dy)を返す。
     convert_mouse_to_draw_coords を使わず、drag_object と同じ変換方式。
@@ -441,6 +451,8 @@ def drag_vertex(polygon, vi, mouse_pos, screen, DRAW_W, DRAW_H, SCREEN_W, SCREEN
     mx, my = mouse_pos
     mx *= scale_x
     my *= scale_y
+    if camera is not None:
+        mx, my = camera.to_world((mx, my))
 
     # --- 新しい位置 ---
     nx = max(0, min(SCREEN_W, mx + ox))
@@ -453,11 +465,12 @@ def drag_vertex(polygon, vi, mouse_pos, screen, DRAW_W, DRAW_H, SCREEN_W, SCREEN
     return dx, dy
 
 
-def screen_to_internal(pos, screen_size, draw_size):
+def screen_to_internal(pos, screen_size, draw_size, camera=None):
     """
     pos         : (screen_x, screen_y)
     screen_size : (window_w, window_h)
     draw_size   : (DRAW_W, DRAW_H)
+    camera      : Camera（ズーム・パン中はワールド座標を返す）
 
     return (internal_x, internal_y)
     """
@@ -472,6 +485,8 @@ def screen_to_internal(pos, screen_size, draw_size):
     ix = (sx - offset_x) / scale
     iy = (sy - offset_y) / scale
 
+    if camera is not None:
+        return camera.to_world((ix, iy))
     return ix, iy
 
 def calc_vertex_drag_offset(vertex_pos, mouse_pos_internal):
@@ -497,6 +512,7 @@ def calc_category_or_polygon_drag_offset(category, mouse_pos_internal):
 # -----------------
 JSON_FILE = "JSON_FILE.json"
 
+@tracer.traced(cat="dialog")
 def select_json_file():
     root = tk.Tk()
     root.withdraw()